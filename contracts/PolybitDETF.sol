@@ -165,24 +165,18 @@ contract PolybitDETF {
     }
 
     function updateOwnedAssetsForRebalance(
-        address[] memory adjustToSellList,
-        address[] memory adjustToBuyList,
+        address[] memory adjustList,
         address[] memory buyList
     ) internal {
         // Reset ownedAssets to be an empty array
         delete ownedAssets;
 
-        // Add assets in adjustToSellList to ownedAssets
-        for (uint256 i = 0; i < adjustToSellList.length; i++) {
-            if (adjustToSellList[i] != address(0)) {
-                ownedAssets.push(adjustToSellList[i]);
-            }
-        }
-
-        // Add assets in adjustToBuyList to ownedAssets
-        for (uint256 i = 0; i < adjustToBuyList.length; i++) {
-            if (adjustToBuyList[i] != address(0)) {
-                ownedAssets.push(adjustToBuyList[i]);
+        // Add assets in adjustList to ownedAssets, including those an
+        // incremental rebalance left out of adjustToSellList and
+        // adjustToBuyList for being within tolerance
+        for (uint256 i = 0; i < adjustList.length; i++) {
+            if (adjustList[i] != address(0)) {
+                ownedAssets.push(adjustList[i]);
             }
         }
 
@@ -381,8 +375,7 @@ contract PolybitDETF {
             }
         }
         updateOwnedAssetsForRebalance(
-            orderData[0].adjustToSellList,
-            orderData[0].adjustToBuyList,
+            orderData[0].adjustList,
             orderData[0].buyList
         );
     }
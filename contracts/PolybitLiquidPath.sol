@@ -23,6 +23,217 @@ contract PolybitLiquidPath is PolybitRouterImmutables {
         return WETH_ADDRESS;
     }
 
+    /**
+     * @notice Pairs and reserves looked up during one call, so orders that
+     * share a token do not ask the factories and pairs for them again.
+     * @dev An open addressing hash table keyed by (factory, token0, token1).
+     */
+    struct PairTable {
+        bytes32[] keys;
+        address[] pairs;
+        uint256[] reserves0;
+        uint256[] reserves1;
+        uint256 count;
+    }
+
+    // Pairs one order can look up across all three factories: on each, the
+    // direct pair and the two pairs of each of its two tri paths, so
+    // 3 * (1 + 2 * 2). This already counts every factory; it is not per factory
+    uint256 internal constant PAIRS_PER_ORDER = 15;
+
+    function newPairTable(
+        uint256 orderCount
+    ) internal pure returns (PairTable memory table) {
+        // At most half full, so probes stay short
+        uint256 size = 64;
+        while (size < orderCount * PAIRS_PER_ORDER * 2) {
+            size = size * 2;
+        }
+        table.keys = new bytes32[](size);
+        table.pairs = new address[](size);
+        table.reserves0 = new uint256[](size);
+        table.reserves1 = new uint256[](size);
+    }
+
+    function readPair(
+        address factory,
+        address token0,
+        address token1
+    ) internal view returns (address pair, uint256 reserve0, uint256 reserve1) {
+        pair = PolybitSwapLibrary.pairFor(factory, token0, token1);
+        if (pair != address(0)) {
+            try IPolybitSwapPair(pair).getReserves() returns (
+                uint112 _reserve0,
+                uint112 _reserve1,
+                uint32 /*blockTimestampLast*/
+            ) {
+                reserve0 = _reserve0;
+                reserve1 = _reserve1;
+            } catch (bytes memory /*lowLevelData*/) {}
+        }
+    }
+
+    /**
+     * @return pair as factory.getPair, and the reserves of tokenA and tokenB,
+     * read once per table.
+     */
+    function getTablePair(
+        PairTable memory table,
+        address factory,
+        address tokenA,
+        address tokenB
+    ) internal view returns (address pair, uint256 reserveA, uint256 reserveB) {
+        if (tokenA == tokenB) {
+            return (address(0), 0, 0);
+        }
+        (address token0, address token1) = tokenA < tokenB
+            ? (tokenA, tokenB)
+            : (tokenB, tokenA);
+        bytes32 key = keccak256(abi.encodePacked(factory, token0, token1));
+        uint256 mask = table.keys.length - 1;
+        uint256 slot = uint256(key) & mask;
+        while (table.keys[slot] != bytes32(0) && table.keys[slot] != key) {
+            slot = (slot + 1) & mask;
+        }
+
+        uint256 reserve0;
+        uint256 reserve1;
+        if (table.keys[slot] == key) {
+            pair = table.pairs[slot];
+            reserve0 = table.reserves0[slot];
+            reserve1 = table.reserves1[slot];
+        } else {
+            (pair, reserve0, reserve1) = readPair(factory, token0, token1);
+            // Leaves a free slot so probes always end
+            if (table.count < table.keys.length - 1) {
+                table.keys[slot] = key;
+                table.pairs[slot] = pair;
+                table.reserves0[slot] = reserve0;
+                table.reserves1[slot] = reserve1;
+                table.count++;
+            }
+        }
+        (reserveA, reserveB) = tokenA == token0
+            ? (reserve0, reserve1)
+            : (reserve1, reserve0);
+    }
+
+    function tablePairExists(
+        PairTable memory table,
+        address factory,
+        address tokenA,
+        address tokenB
+    ) internal view returns (bool) {
+        (address pair, , ) = getTablePair(table, factory, tokenA, tokenB);
+        return pair != address(0);
+    }
+
+    /**
+     * @return success is false where PolybitSwapLibrary.getAmountOut would
+     * revert, else true with its amountOut.
+     */
+    function tryGetAmountOut(
+        uint256 amountIn,
+        uint256 reserveIn,
+        uint256 reserveOut
+    ) internal pure returns (bool success, uint256 amountOut) {
+        if (amountIn == 0 || reserveIn == 0 || reserveOut == 0) {
+            return (false, 0);
+        }
+        uint256 amountInWithFee;
+        uint256 numerator;
+        uint256 denominator;
+        (success, amountInWithFee) = SafeMath.tryMul(amountIn, 997);
+        if (!success) return (false, 0);
+        (success, numerator) = SafeMath.tryMul(amountInWithFee, reserveOut);
+        if (!success) return (false, 0);
+        (success, denominator) = SafeMath.tryAdd(
+            reserveIn * 1000,
+            amountInWithFee
+        );
+        if (!success) return (false, 0);
+        return (true, numerator / denominator);
+    }
+
+    /**
+     * @return success is false where PolybitSwapLibrary.getAmountIn would
+     * revert, else true with its amountIn.
+     */
+    function tryGetAmountIn(
+        uint256 amountOut,
+        uint256 reserveIn,
+        uint256 reserveOut
+    ) internal pure returns (bool success, uint256 amountIn) {
+        if (amountOut == 0 || reserveIn == 0 || reserveOut == 0) {
+            return (false, 0);
+        }
+        uint256 numerator;
+        (success, numerator) = SafeMath.tryMul(reserveIn, amountOut);
+        if (!success) return (false, 0);
+        (success, numerator) = SafeMath.tryMul(numerator, 1000);
+        if (!success) return (false, 0);
+        if (amountOut >= reserveOut) {
+            // Underflow, or division by zero where they are equal
+            return (false, 0);
+        }
+        uint256 denominator = (reserveOut - amountOut) * 997;
+        return SafeMath.tryAdd(numerator / denominator, 1);
+    }
+
+    /**
+     * @return success, amount as POLYBIT_SWAP_ROUTER.getAmountsOut(...)[last]
+     * for an exact amount in, or getAmountsIn(...)[0] for an exact amount
+     * out, with success false where the router call would revert.
+     */
+    function getTableAmount(
+        PairTable memory table,
+        address factory,
+        uint256 tokenAmount,
+        address[] memory path,
+        uint8 amountType
+    ) internal view returns (bool success, uint256 amount) {
+        if (path.length < 2) {
+            return (false, 0);
+        }
+        amount = tokenAmount;
+        for (uint256 i = 0; i < path.length - 1; i++) {
+            // Hops in swap order for an exact amount in, reversed for out
+            uint256 hop = amountType == 0 ? i : path.length - 2 - i;
+            if (
+                path[hop] == path[hop + 1] ||
+                path[hop] == address(0) ||
+                path[hop + 1] == address(0)
+            ) {
+                return (false, 0);
+            }
+            (
+                address pair,
+                uint256 reserveIn,
+                uint256 reserveOut
+            ) = getTablePair(table, factory, path[hop], path[hop + 1]);
+            if (pair == address(0)) {
+                return (false, 0);
+            }
+            if (amountType == 0) {
+                (success, amount) = tryGetAmountOut(
+                    amount,
+                    reserveIn,
+                    reserveOut
+                );
+            } else {
+                (success, amount) = tryGetAmountIn(
+                    amount,
+                    reserveIn,
+                    reserveOut
+                );
+            }
+            if (!success) {
+                return (false, 0);
+            }
+        }
+        return (true, amount);
+    }
+
     struct FactoryBestPathParameters {
         address[] dualPath;
         uint256 dualPathAmount;
@@ -31,9 +242,12 @@ contract PolybitLiquidPath is PolybitRouterImmutables {
         address[] bestPath;
         uint256 bestAmount;
         address[] bestTriPath;
+        bool success;
+        uint256 amount;
     }
 
     function getFactoryBestPath(
+        PairTable memory table,
         address factory,
         address tokenIn,
         address tokenOut,
@@ -43,50 +257,21 @@ contract PolybitLiquidPath is PolybitRouterImmutables {
     ) internal view returns (address[] memory, uint256) {
         FactoryBestPathParameters memory params;
 
-        if (
-            PolybitSwapLibrary.pairFor(factory, tokenIn, tokenOut) != address(0)
-        ) {
+        if (tablePairExists(table, factory, tokenIn, tokenOut)) {
             params.dualPath = new address[](2);
             params.dualPath[0] = address(tokenIn);
             params.dualPath[1] = address(tokenOut);
 
-            if (amountType == 0) {
-                bool success;
-                uint256[] memory amountsOut;
-                try
-                    POLYBIT_SWAP_ROUTER.getAmountsOut(
-                        factory,
-                        tokenAmount,
-                        params.dualPath
-                    )
-                returns (uint256[] memory amounts) {
-                    amountsOut = amounts;
-                    success = true;
-                } catch (bytes memory /*lowLevelData*/) {
-                    success = false;
-                }
-                if (success == true) {
-                    params.dualPathAmount = amountsOut[1];
-                }
-            }
-
-            if (amountType == 1) {
-                bool success;
-                uint256[] memory amountsIn;
-                try
-                    POLYBIT_SWAP_ROUTER.getAmountsIn(
-                        factory,
-                        tokenAmount,
-                        params.dualPath
-                    )
-                returns (uint256[] memory amounts) {
-                    amountsIn = amounts;
-                    success = true;
-                } catch (bytes memory /*lowLevelData*/) {
-                    success = false;
-                }
-                if (success == true) {
-                    params.dualPathAmount = amountsIn[0];
+            if (amountType == 0 || amountType == 1) {
+                (params.success, params.amount) = getTableAmount(
+                    table,
+                    factory,
+                    tokenAmount,
+                    params.dualPath,
+                    amountType
+                );
+                if (params.success == true) {
+                    params.dualPathAmount = params.amount;
                 }
             }
         }
@@ -100,59 +285,42 @@ contract PolybitLiquidPath is PolybitRouterImmutables {
             }
 
             for (uint256 i = 1; i < baseTokens.length; i++) {
-                if (
-                    PolybitSwapLibrary.pairFor(factory, baseTokens[i], token) !=
-                    address(0)
-                ) {
+                if (tablePairExists(table, factory, baseTokens[i], token)) {
                     params.triPath = new address[](3);
                     params.triPath[0] = address(tokenIn);
                     params.triPath[1] = address(baseTokens[i]);
                     params.triPath[2] = address(tokenOut);
 
                     if (amountType == 0) {
-                        bool success;
-                        uint256[] memory amountsOut;
-                        try
-                            POLYBIT_SWAP_ROUTER.getAmountsOut(
-                                factory,
-                                tokenAmount,
-                                params.triPath
-                            )
-                        returns (uint256[] memory amounts) {
-                            amountsOut = amounts;
-                            success = true;
-                        } catch (bytes memory /*lowLevelData*/) {
-                            success = false;
-                        }
+                        (params.success, params.amount) = getTableAmount(
+                            table,
+                            factory,
+                            tokenAmount,
+                            params.triPath,
+                            amountType
+                        );
                         if (
-                            success == true &&
-                            amountsOut[2] > params.triPathAmount
+                            params.success == true &&
+                            params.amount > params.triPathAmount
                         ) {
-                            params.triPathAmount = amountsOut[2];
+                            params.triPathAmount = params.amount;
                             params.bestTriPath = params.triPath;
                         }
                     }
                     if (amountType == 1) {
-                        bool success;
-                        uint256[] memory amountsIn;
-                        try
-                            POLYBIT_SWAP_ROUTER.getAmountsIn(
-                                factory,
-                                tokenAmount,
-                                params.triPath
-                            )
-                        returns (uint256[] memory amounts) {
-                            amountsIn = amounts;
-                            success = true;
-                        } catch (bytes memory /*lowLevelData*/) {
-                            success = false;
-                        }
+                        (params.success, params.amount) = getTableAmount(
+                            table,
+                            factory,
+                            tokenAmount,
+                            params.triPath,
+                            amountType
+                        );
                         if (
-                            success == true &&
-                            amountsIn[0] > 0 &&
-                            amountsIn[0] < params.triPathAmount
+                            params.success == true &&
+                            params.amount > 0 &&
+                            params.amount < params.triPathAmount
                         ) {
-                            params.triPathAmount = amountsIn[0];
+                            params.triPathAmount = params.amount;
                             params.bestTriPath = params.triPath;
                         }
                     }
@@ -203,6 +371,23 @@ contract PolybitLiquidPath is PolybitRouterImmutables {
         uint256 tokenAmount,
         uint8 amountType
     ) public view returns (address, address[] memory, uint256) {
+        return
+            getTableLiquidPath(
+                newPairTable(1),
+                tokenIn,
+                tokenOut,
+                tokenAmount,
+                amountType
+            );
+    }
+
+    function getTableLiquidPath(
+        PairTable memory table,
+        address tokenIn,
+        address tokenOut,
+        uint256 tokenAmount,
+        uint8 amountType
+    ) internal view returns (address, address[] memory, uint256) {
         LiquidPathParameters memory params;
 
         /* //PolybitSwap
@@ -227,6 +412,7 @@ contract PolybitLiquidPath is PolybitRouterImmutables {
             address[] memory pancakeswapPath,
             uint256 pancakeswapAmount
         ) = getFactoryBestPath(
+                table,
                 PANCAKESWAP_V2_FACTORY,
                 tokenIn,
                 tokenOut,
@@ -245,6 +431,7 @@ contract PolybitLiquidPath is PolybitRouterImmutables {
             address[] memory sushiswapPath,
             uint256 sushiswapAmount
         ) = getFactoryBestPath(
+                table,
                 SUSHISWAP_V2_FACTORY,
                 tokenIn,
                 tokenOut,
@@ -272,6 +459,7 @@ contract PolybitLiquidPath is PolybitRouterImmutables {
             address[] memory biswapPath,
             uint256 biswapAmount
         ) = getFactoryBestPath(
+                table,
                 BISWAP_FACTORY,
                 tokenIn,
                 tokenOut,
@@ -325,13 +513,17 @@ contract PolybitLiquidPath is PolybitRouterImmutables {
             swapOrders[0].swapOrder.length
         );
 
+        // Shared by every order, so each pair is read once per call
+        PairTable memory table = newPairTable(swapOrders[0].swapOrder.length);
+
         uint256 index = 0;
         for (uint256 i = 0; i < swapOrders[0].swapOrder.length; i++) {
             (
                 address factory,
                 address[] memory path,
                 uint256 amountsOut
-            ) = getLiquidPath(
+            ) = getTableLiquidPath(
+                    table,
                     swapOrders[0].swapOrder[i].tokenIn,
                     swapOrders[0].swapOrder[i].tokenOut,
                     swapOrders[0].swapOrder[i].tokenAmount,
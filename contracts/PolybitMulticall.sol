@@ -1,9 +1,12 @@
 // SPDX-License-Identifier: UNLICENSED
 pragma solidity >=0.8.7;
 
+import "./interfaces/IERC20.sol";
 import "./interfaces/IPolybitConfig.sol";
 import "./interfaces/IPolybitDETF.sol";
 import "./interfaces/IPolybitDETFFactory.sol";
+import "./interfaces/IPolybitSwapFactory.sol";
+import "./interfaces/IPolybitSwapPair.sol";
 
 contract PolybitMulticall {
     address public polybitConfigAddress;
@@ -38,6 +41,120 @@ contract PolybitMulticall {
         return tokenBalancesInWeth;
     }
 
+    struct DETFBalanceSnapshot {
+        address[] ownedAssets;
+        address[] tokens;
+        uint256[] tokenBalances;
+        uint8[] tokenDecimals;
+        uint256 wethBalance;
+        uint256 ethBalance;
+    }
+
+    /**
+     * @notice Reads every balance needed to plan a rebalance in one call.
+     * @param _detfAddress is the address of the DETF.
+     * @param _tokenAddresses are tokens to read in addition to the owned assets.
+     * @return snapshot is the owned assets, then the balance and decimals of
+     * each owned asset followed by each of _tokenAddresses, and the WETH and
+     * ETH balances of the DETF.
+     */
+    function getDETFBalanceSnapshot(
+        address _detfAddress,
+        address[] memory _tokenAddresses
+    ) public view returns (DETFBalanceSnapshot memory) {
+        DETFBalanceSnapshot memory data;
+        data.ownedAssets = IPolybitDETF(_detfAddress).getOwnedAssets();
+        uint256 length = data.ownedAssets.length + _tokenAddresses.length;
+        data.tokens = new address[](length);
+        data.tokenBalances = new uint256[](length);
+        data.tokenDecimals = new uint8[](length);
+
+        for (uint256 i = 0; i < length; i++) {
+            if (i < data.ownedAssets.length) {
+                data.tokens[i] = data.ownedAssets[i];
+            } else {
+                data.tokens[i] = _tokenAddresses[i - data.ownedAssets.length];
+            }
+            data.tokenBalances[i] = IERC20(data.tokens[i]).balanceOf(
+                _detfAddress
+            );
+            data.tokenDecimals[i] = IERC20(data.tokens[i]).decimals();
+        }
+        data.wethBalance = IPolybitDETF(_detfAddress).getWethBalance();
+        data.ethBalance = IPolybitDETF(_detfAddress).getEthBalance();
+        return data;
+    }
+
+    struct PairReserves {
+        address pair;
+        uint256 reserveA;
+        uint256 reserveB;
+        uint32 blockTimestampLast;
+    }
+
+    /**
+     * @notice Resolves and reads many pairs in one call, for off-chain routers
+     * and pricers.
+     * @param _factories, _tokenA, _tokenB are the factory and tokens of each
+     * pair.
+     * @return reserves is the pair of each entry, with its reserves of tokenA
+     * and tokenB and its blockTimestampLast. Entries whose factory has no pair,
+     * or whose factory or pair cannot be read, have a zero address pair and
+     * zero reserves.
+     */
+    function getReservesBatch(
+        address[] memory _factories,
+        address[] memory _tokenA,
+        address[] memory _tokenB
+    ) public view returns (PairReserves[] memory) {
+        require(
+            _factories.length == _tokenA.length &&
+                _factories.length == _tokenB.length,
+            "Factory and token lengths do not match"
+        );
+
+        PairReserves[] memory reserves = new PairReserves[](_factories.length);
+        for (uint256 i = 0; i < _factories.length; i++) {
+            reserves[i] = readPairReserves(
+                _factories[i],
+                _tokenA[i],
+                _tokenB[i]
+            );
+        }
+        return reserves;
+    }
+
+    function readPairReserves(
+        address factory,
+        address tokenA,
+        address tokenB
+    ) internal view returns (PairReserves memory data) {
+        // Calls to addresses without code revert outside the try
+        if (tokenA == tokenB || factory.code.length == 0) {
+            return data;
+        }
+        try IPolybitSwapFactory(factory).getPair(tokenA, tokenB) returns (
+            address pair
+        ) {
+            if (pair == address(0) || pair.code.length == 0) {
+                return data;
+            }
+            try IPolybitSwapPair(pair).getReserves() returns (
+                uint112 reserve0,
+                uint112 reserve1,
+                uint32 blockTimestampLast
+            ) {
+                data.pair = pair;
+                if (tokenA < tokenB) {
+                    (data.reserveA, data.reserveB) = (reserve0, reserve1);
+                } else {
+                    (data.reserveA, data.reserveB) = (reserve1, reserve0);
+                }
+                data.blockTimestampLast = blockTimestampLast;
+            } catch (bytes memory /*lowLevelData*/) {}
+        } catch (bytes memory /*lowLevelData*/) {}
+    }
+
     struct DETFAccountDetail {
         address detfAddress;
         uint256 status;
@@ -149,6 +149,33 @@ contract PolybitRebalancer {
         return (data.adjustList, data.adjustListWeights, data.adjustListPrices);
     }
 
+    /**
+     * @notice Used to check whether an adjustment is too small to be worth
+     * its swap.
+     * @param totalBalance is the total balance of the DETF in WETH.
+     * @param tokenBalancePercentage is the balance of the token as a
+     * percentage of totalBalance.
+     * @param tokenTargetPercentage is the target weight of the token.
+     * @param driftToleranceBps is the smallest drift from target to adjust, in
+     * basis points of the DETF balance.
+     * @param minWethNotional is the smallest adjustment to make, in WETH.
+     * @return withinTolerance is true if the adjustment should be skipped.
+     */
+    function isWithinDriftTolerance(
+        uint256 totalBalance,
+        uint256 tokenBalancePercentage,
+        uint256 tokenTargetPercentage,
+        uint256 driftToleranceBps,
+        uint256 minWethNotional
+    ) public pure returns (bool) {
+        uint256 drift = tokenBalancePercentage > tokenTargetPercentage
+            ? tokenBalancePercentage - tokenTargetPercentage
+            : tokenTargetPercentage - tokenBalancePercentage;
+        return
+            drift < driftToleranceBps * 10 ** 4 ||
+            (drift * totalBalance) / 10 ** 8 < minWethNotional;
+    }
+
     struct AdjustToSellData {
         address[] adjustToSellList;
         uint256[] adjustToSellWeights;
@@ -178,6 +205,41 @@ contract PolybitRebalancer {
         external
         view
         returns (address[] memory, uint256[] memory, uint256[] memory)
+    {
+        return
+            createAdjustToSellListWithTolerance(
+                detfAddress,
+                totalBalance,
+                adjustList,
+                adjustListWeights,
+                adjustListPrices,
+                0,
+                0
+            );
+    }
+
+    /**
+     * @notice Used to split the tokens that need to be adjusted by selling,
+     * leaving out tokens that have drifted less than the tolerance.
+     * @param detfAddress is the address of the DETF.
+     * @param adjustList is the list of tokens to adjust.
+     * @param driftToleranceBps is the smallest drift from target to adjust, in
+     * basis points of the DETF balance.
+     * @param minWethNotional is the smallest adjustment to make, in WETH.
+     * @return adjustToSellList is the list of tokens to adjust by selling.
+     */
+    function createAdjustToSellListWithTolerance(
+        address detfAddress,
+        uint256 totalBalance,
+        address[] memory adjustList,
+        uint256[] memory adjustListWeights,
+        uint256[] memory adjustListPrices,
+        uint256 driftToleranceBps,
+        uint256 minWethNotional
+    )
+        public
+        view
+        returns (address[] memory, uint256[] memory, uint256[] memory)
     {
         require(
             adjustList.length == adjustListPrices.length,
@@ -207,7 +269,16 @@ contract PolybitRebalancer {
                     totalBalance;
                 data.tokenTargetPercentage = adjustListWeights[i];
 
-                if (data.tokenBalancePercentage > data.tokenTargetPercentage) {
+                if (
+                    data.tokenBalancePercentage > data.tokenTargetPercentage &&
+                    !isWithinDriftTolerance(
+                        totalBalance,
+                        data.tokenBalancePercentage,
+                        data.tokenTargetPercentage,
+                        driftToleranceBps,
+                        minWethNotional
+                    )
+                ) {
                     data.adjustToSellList[index] = adjustList[i];
                     data.adjustToSellWeights[index] = adjustListWeights[i];
                     data.adjustToSellPrices[index] = adjustListPrices[i];
@@ -276,6 +347,41 @@ contract PolybitRebalancer {
         external
         view
         returns (address[] memory, uint256[] memory, uint256[] memory)
+    {
+        return
+            createAdjustToBuyListWithTolerance(
+                detfAddress,
+                totalBalance,
+                adjustList,
+                adjustListWeights,
+                adjustListPrices,
+                0,
+                0
+            );
+    }
+
+    /**
+     * @notice Used to split the tokens that need to be adjusted by buying,
+     * leaving out tokens that have drifted less than the tolerance.
+     * @param detfAddress is the address of the DETF.
+     * @param adjustList is the list of tokens to adjust.
+     * @param driftToleranceBps is the smallest drift from target to adjust, in
+     * basis points of the DETF balance.
+     * @param minWethNotional is the smallest adjustment to make, in WETH.
+     * @return adjustToBuyList is the list of tokens to adjust by buying.
+     */
+    function createAdjustToBuyListWithTolerance(
+        address detfAddress,
+        uint256 totalBalance,
+        address[] memory adjustList,
+        uint256[] memory adjustListWeights,
+        uint256[] memory adjustListPrices,
+        uint256 driftToleranceBps,
+        uint256 minWethNotional
+    )
+        public
+        view
+        returns (address[] memory, uint256[] memory, uint256[] memory)
     {
         require(
             adjustList.length == adjustListWeights.length,
@@ -305,7 +411,16 @@ contract PolybitRebalancer {
                     totalBalance;
                 data.tokenTargetPercentage = adjustListWeights[i];
 
-                if (data.tokenTargetPercentage > data.tokenBalancePercentage) {
+                if (
+                    data.tokenTargetPercentage > data.tokenBalancePercentage &&
+                    !isWithinDriftTolerance(
+                        totalBalance,
+                        data.tokenBalancePercentage,
+                        data.tokenTargetPercentage,
+                        driftToleranceBps,
+                        minWethNotional
+                    )
+                ) {
                     data.adjustToBuyList[index] = adjustList[i];
                     data.adjustToBuyWeights[index] = adjustListWeights[i];
                     data.adjustToBuyPrices[index] = adjustListPrices[i];
@@ -52,6 +52,40 @@ interface IPolybitRebalancer {
             uint256[] memory
         );
 
+    function createAdjustToSellListWithTolerance(
+        address detfAddress,
+        uint256 totalBalance,
+        address[] memory adjustList,
+        uint256[] memory adjustListWeights,
+        uint256[] memory adjustListPrices,
+        uint256 driftToleranceBps,
+        uint256 minWethNotional
+    )
+        external
+        view
+        returns (
+            address[] memory,
+            uint256[] memory,
+            uint256[] memory
+        );
+
+    function createAdjustToBuyListWithTolerance(
+        address detfAddress,
+        uint256 totalBalance,
+        address[] memory adjustList,
+        uint256[] memory adjustListWeights,
+        uint256[] memory adjustListPrices,
+        uint256 driftToleranceBps,
+        uint256 minWethNotional
+    )
+        external
+        view
+        returns (
+            address[] memory,
+            uint256[] memory,
+            uint256[] memory
+        );
+
     function createBuyList(
         address[] memory ownedAssetsList,
         address[] memory targetAssetsList,
@@ -0,0 +1,61 @@
+// SPDX-License-Identifier: UNLICENSED
+pragma solidity >=0.8.7;
+
+import "../interfaces/IERC20.sol";
+
+/**
+ * @notice Holds tokens and answers the balance views of PolybitDETF, so that
+ * PolybitRebalancer can be exercised against arbitrary balances in tests.
+ */
+contract MockDETF {
+    address public wethAddress;
+    address[] internal ownedAssets;
+
+    constructor(address _wethAddress) {
+        wethAddress = _wethAddress;
+    }
+
+    receive() external payable {}
+
+    function setOwnedAssets(address[] memory _ownedAssets) external {
+        ownedAssets = _ownedAssets;
+    }
+
+    function getOwnedAssets() external view returns (address[] memory) {
+        return ownedAssets;
+    }
+
+    function getEthBalance() public view returns (uint256) {
+        return address(this).balance;
+    }
+
+    function getWethBalance() public view returns (uint256) {
+        return IERC20(wethAddress).balanceOf(address(this));
+    }
+
+    function getTokenBalance(
+        address tokenAddress,
+        uint256 tokenPrice
+    ) public view returns (uint256, uint256) {
+        IERC20 token = IERC20(tokenAddress);
+        uint256 tokenBalance = token.balanceOf(address(this));
+        uint256 tokenDecimals = token.decimals();
+        uint256 tokenBalanceInWeth = (tokenBalance * tokenPrice) /
+            10 ** tokenDecimals;
+        return (tokenBalance, tokenBalanceInWeth);
+    }
+
+    function getTotalBalanceInWeth(
+        uint256[] memory ownedAssetsPrices
+    ) public view returns (uint256) {
+        uint256 tokenBalances = 0;
+        for (uint256 x = 0; x < ownedAssets.length; x++) {
+            (, uint256 tokenBalanceInWeth) = getTokenBalance(
+                ownedAssets[x],
+                ownedAssetsPrices[x]
+            );
+            tokenBalances = tokenBalances + tokenBalanceInWeth;
+        }
+        return tokenBalances + getEthBalance() + getWethBalance();
+    }
+}
@@ -0,0 +1,49 @@
+// SPDX-License-Identifier: UNLICENSED
+pragma solidity >=0.8.7;
+
+import "./MockSwapPair.sol";
+
+/**
+ * @notice A UniswapV2 style factory that deploys MockSwapPairs with CREATE2,
+ * for local chain tests.
+ */
+contract MockSwapFactory {
+    bytes32 public constant INIT_CODE_PAIR_HASH =
+        keccak256(abi.encodePacked(type(MockSwapPair).creationCode));
+
+    mapping(address => mapping(address => address)) public getPair;
+    address[] public allPairs;
+
+    event PairCreated(
+        address indexed token0,
+        address indexed token1,
+        address pair,
+        uint256
+    );
+
+    function allPairsLength() external view returns (uint256) {
+        return allPairs.length;
+    }
+
+    function createPair(
+        address tokenA,
+        address tokenB
+    ) external returns (address pair) {
+        require(tokenA != tokenB, "MockSwapFactory: IDENTICAL_ADDRESSES");
+        (address token0, address token1) = tokenA < tokenB
+            ? (tokenA, tokenB)
+            : (tokenB, tokenA);
+        require(token0 != address(0), "MockSwapFactory: ZERO_ADDRESS");
+        require(
+            getPair[token0][token1] == address(0),
+            "MockSwapFactory: PAIR_EXISTS"
+        );
+        bytes32 salt = keccak256(abi.encodePacked(token0, token1));
+        pair = address(new MockSwapPair{salt: salt}());
+        MockSwapPair(pair).initialize(token0, token1);
+        getPair[token0][token1] = pair;
+        getPair[token1][token0] = pair;
+        allPairs.push(pair);
+        emit PairCreated(token0, token1, pair, allPairs.length);
+    }
+}
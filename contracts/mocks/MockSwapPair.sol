@@ -0,0 +1,43 @@
+// SPDX-License-Identifier: UNLICENSED
+pragma solidity >=0.8.7;
+
+/**
+ * @notice A pair with settable reserves, for local chain tests.
+ */
+contract MockSwapPair {
+    address public factory;
+    address public token0;
+    address public token1;
+    uint112 internal reserve0;
+    uint112 internal reserve1;
+    uint32 internal blockTimestampLast;
+
+    event Sync(uint112 reserve0, uint112 reserve1);
+
+    constructor() {
+        factory = msg.sender;
+    }
+
+    function initialize(address _token0, address _token1) external {
+        require(msg.sender == factory, "MockSwapPair: FORBIDDEN");
+        token0 = _token0;
+        token1 = _token1;
+    }
+
+    function getReserves()
+        external
+        view
+        returns (uint112 _reserve0, uint112 _reserve1, uint32 _blockTimestampLast)
+    {
+        _reserve0 = reserve0;
+        _reserve1 = reserve1;
+        _blockTimestampLast = blockTimestampLast;
+    }
+
+    function setReserves(uint112 _reserve0, uint112 _reserve1) external {
+        reserve0 = _reserve0;
+        reserve1 = _reserve1;
+        blockTimestampLast = uint32(block.timestamp % 2 ** 32);
+        emit Sync(reserve0, reserve1);
+    }
+}
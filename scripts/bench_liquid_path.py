@@ -0,0 +1,112 @@
+"""
+Measures the eth_call gas of PolybitLiquidPath.getLiquidPaths against basket
+size on a local chain of mock factories and pairs, for rebalances with a buy
+and an adjust leg of each asset, and the gas of routing the same orders with
+one getLiquidPath call each, which share no pair lookups.
+
+Run with `brownie run scripts/bench_liquid_path.py` and, to compare revisions,
+save the results of one run with output_path and pass them to the next as
+baseline_path.
+"""
+
+import json
+from brownie import (
+    accounts,
+    MockERC20,
+    MockSwapFactory,
+    MockSwapPair,
+    PolybitLiquidPath,
+    PolybitSwapRouter,
+)
+from scripts.utils.dex import (
+    AMOUNT_TYPE_EXACT_IN,
+    AMOUNT_TYPE_EXACT_OUT,
+    BUSD_ADDRESS,
+    USDC_ADDRESS,
+    USDT_ADDRESS,
+)
+
+BASKET_SIZES = [1, 5, 10, 20, 40]
+E18 = 10**18
+
+
+def create_pool(owner, factory, token_a, token_b, reserve_a, reserve_b):
+    factory.createPair(token_a, token_b, {"from": owner}).wait(1)
+    pair = MockSwapPair.at(factory.getPair(token_a, token_b))
+    if pair.token0().lower() == str(token_a).lower():
+        pair.setReserves(reserve_a, reserve_b, {"from": owner})
+    else:
+        pair.setReserves(reserve_b, reserve_a, {"from": owner})
+
+
+def deploy_market(owner, asset_count):
+    """
+    @return weth, assets, liquid_path where every asset has a WETH pair and a
+    USDT pair on each factory, and WETH has a pair with each base token.
+    """
+    weth = MockERC20.deploy("Wrapped BNB", "WBNB", 18, {"from": owner}).address
+    factories = [MockSwapFactory.deploy({"from": owner}) for i in range(0, 3)]
+    swap_router = PolybitSwapRouter.deploy(weth, {"from": owner})
+    liquid_path = PolybitLiquidPath.deploy(
+        [weth, swap_router.address] + [f.address for f in factories],
+        {"from": owner},
+    )
+    for factory in factories:
+        for base_token in [BUSD_ADDRESS, USDT_ADDRESS, USDC_ADDRESS]:
+            create_pool(owner, factory, weth, base_token, 1000 * E18, 300000 * E18)
+
+    assets = []
+    for i in range(0, asset_count):
+        asset = MockERC20.deploy(f"Asset {i}", f"A{i}", 18, {"from": owner}).address
+        for j, factory in enumerate(factories):
+            create_pool(owner, factory, asset, weth, (1000 + j) * E18, 10 * E18)
+            create_pool(owner, factory, USDT_ADDRESS, asset, 3000 * E18, 1000 * E18)
+        assets.append(asset)
+    return weth, assets, liquid_path
+
+
+def rebalance_orders(weth, assets):
+    """
+    @return orders buying each asset with an exact amount of WETH and buying
+    an exact amount of it to adjust its weight.
+    """
+    orders = []
+    for asset in assets:
+        orders.append([weth, asset, E18 // 10, AMOUNT_TYPE_EXACT_IN])
+        orders.append([weth, asset, E18, AMOUNT_TYPE_EXACT_OUT])
+    return orders
+
+
+def measure(liquid_path, weth, assets):
+    orders = rebalance_orders(weth, assets)
+    batch_gas = liquid_path.getLiquidPaths.estimate_gas([[orders]])
+    single_gas = sum(liquid_path.getLiquidPath.estimate_gas(*order) for order in orders)
+    return {"orders": len(orders), "batch_gas": batch_gas, "single_gas": single_gas}
+
+
+def main(basket_sizes=BASKET_SIZES, output_path=None, baseline_path=None):
+    owner = accounts[0]
+    weth, assets, liquid_path = deploy_market(owner, max(basket_sizes))
+    baseline = {}
+    if baseline_path is not None:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    results = {}
+    print("assets", "orders", "getLiquidPaths gas", "getLiquidPath gas", "baseline")
+    for size in basket_sizes:
+        result = measure(liquid_path, weth, assets[0:size])
+        results[str(size)] = result
+        before = baseline.get(str(size), {}).get("batch_gas", "-")
+        print(
+            size,
+            result["orders"],
+            result["batch_gas"],
+            result["single_gas"],
+            before,
+        )
+
+    if output_path is not None:
+        with open(output_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
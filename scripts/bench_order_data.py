@@ -0,0 +1,172 @@
+"""
+Compares encoding a 50 asset rebalance from nested orderData lists for each of
+eth_estimateGas, eth_call and the transaction, with encoding the SwapOrders
+model once, and reports the calldata compaction saves on a 20 asset rebalance.
+Run with `python -m scripts.bench_order_data`.
+"""
+
+import random
+import timeit
+import tracemalloc
+from eth_abi import encode_abi
+from scripts.utils.dex import WETH_ADDRESS
+from scripts.utils.order_builder import compact_order_data
+from scripts.utils.order_data import (
+    SWAP_ORDERS_TYPE,
+    SwapOrder,
+    SwapOrders,
+    encode_rebalance_detf,
+    report_calldata,
+)
+
+BASKET_SIZE = 50
+COMPACTION_BASKET_SIZE = 20
+FACTORY = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+# eth_estimateGas, eth_call and the transaction
+USES = 3
+REPEAT = 20
+ORDERS_IN_MEMORY = 200
+
+
+def random_swap_order(rng, tokens, sell):
+    swap_order = SwapOrder.empty()
+    for token in tokens:
+        path = [token, WETH_ADDRESS] if sell else [WETH_ADDRESS, token]
+        swap_order.append(FACTORY, path, rng.randint(1, 10**24), rng.randint(1, 10**24))
+    return swap_order
+
+
+def random_order_data(rng, size):
+    """
+    @return order_data selling a quarter of the basket, adjusting half and
+    buying a quarter.
+    """
+    from web3 import Web3
+
+    tokens = [
+        Web3.toChecksumAddress("0x%040x" % rng.getrandbits(160)) for i in range(0, size)
+    ]
+    quarter = size // 4
+    sell, adjust, buy = tokens[0:quarter], tokens[quarter:-quarter], tokens[-quarter:]
+    adjust_to_sell, adjust_to_buy = adjust[0::2], adjust[1::2]
+
+    def prices(tokens):
+        return [rng.randint(10**12, 10**18) for token in tokens]
+
+    def weights(tokens):
+        return [10**8 // size for token in tokens]
+
+    return SwapOrders(
+        sell,
+        prices(sell),
+        random_swap_order(rng, sell, True),
+        adjust,
+        prices(adjust),
+        adjust_to_sell,
+        prices(adjust_to_sell),
+        random_swap_order(rng, adjust_to_sell, True),
+        adjust_to_buy,
+        weights(adjust_to_buy),
+        prices(adjust_to_buy),
+        random_swap_order(rng, adjust_to_buy, False),
+        buy,
+        weights(buy),
+        prices(buy),
+        random_swap_order(rng, buy, False),
+    )
+
+
+def field_values(order_data):
+    return [getattr(order_data, name) for name in SwapOrders.__slots__]
+
+
+def nested_order_data(order_data):
+    """
+    @return orderData as the nested lists the scripts used to build, sharing
+    the field lists of order_data.
+    """
+    return [
+        [
+            (
+                [[value.factory, value.path, value.amountsIn, value.amountsOut]]
+                if isinstance(value, SwapOrder)
+                else value
+            )
+            for value in field_values(order_data)
+        ]
+    ]
+
+
+def slotted_order_data(order_data):
+    """
+    @return order_data rebuilt as SwapOrders, sharing its field lists.
+    """
+    return SwapOrders(
+        *[
+            (
+                SwapOrder(value.factory, value.path, value.amountsIn, value.amountsOut)
+                if isinstance(value, SwapOrder)
+                else value
+            )
+            for value in field_values(order_data)
+        ]
+    )
+
+
+def encode_nested(nested):
+    for i in range(0, USES):
+        encode_abi([f"{SWAP_ORDERS_TYPE}[]"], [nested])
+
+
+def allocated_bytes(build):
+    tracemalloc.start()
+    kept = build()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main():
+    rng = random.Random(0)
+    order_data = random_order_data(rng, BASKET_SIZE)
+    nested = nested_order_data(order_data)
+    assert encode_rebalance_detf(order_data)[4:] == encode_abi(
+        [f"{SWAP_ORDERS_TYPE}[]"], [nested]
+    )
+
+    per_use = min(timeit.repeat(lambda: encode_nested(nested), number=1, repeat=REPEAT))
+    once = min(
+        timeit.repeat(
+            lambda: encode_rebalance_detf(order_data), number=1, repeat=REPEAT
+        )
+    )
+    print(
+        "assets", BASKET_SIZE, "calldata bytes", len(encode_rebalance_detf(order_data))
+    )
+    print("encode per use ms", "%.2f" % (per_use * 1000), "uses", USES)
+    print("encode once ms", "%.2f" % (once * 1000))
+    print("speedup", "%.1fx" % (per_use / once))
+
+    seeds = [random.Random(i) for i in range(0, ORDERS_IN_MEMORY)]
+    orders = [random_order_data(seed, BASKET_SIZE) for seed in seeds]
+    nested_bytes = allocated_bytes(lambda: [nested_order_data(o) for o in orders])
+    slotted_bytes = allocated_bytes(lambda: [slotted_order_data(o) for o in orders])
+    order_data = random_order_data(rng, COMPACTION_BASKET_SIZE)
+    print("assets", COMPACTION_BASKET_SIZE)
+    report_calldata("OrderData", encode_rebalance_detf(order_data), order_data)
+    compacted = compact_order_data(order_data)
+    report_calldata("Compacted OrderData", encode_rebalance_detf(compacted), compacted)
+
+    # Containers only, as both share the same field lists
+    print(
+        "container bytes per order",
+        "nested",
+        nested_bytes // ORDERS_IN_MEMORY,
+        "slotted",
+        slotted_bytes // ORDERS_IN_MEMORY,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Times routing a rebalance of a basket off-chain, with MatrixRouter quoting
+every candidate path of every order as one matrix against LiquidPathRouter
+quoting them one getAmountsOut or getAmountsIn at a time. Both route from
+the same snapshot of random reserves, so only the quoting is timed.
+
+Run with `brownie run scripts/bench_quote_engine.py`; no chain is needed.
+"""
+
+import random
+import time
+from scripts.utils.dex import (
+    AMOUNT_TYPE_EXACT_IN,
+    AMOUNT_TYPE_EXACT_OUT,
+    BASE_TOKENS,
+    SWAP_FACTORIES,
+    WETH_ADDRESS,
+)
+from scripts.utils.liquid_path import LiquidPathRouter, ReserveSnapshot
+from scripts.utils.quote_engine import MatrixRouter
+
+BASKET_SIZES = [10, 50, 100]
+REPEATS = 5
+SEED = 24
+E18 = 10**18
+
+
+def random_market(rng, asset_count):
+    """
+    @return snapshot, assets where every asset has a WETH pair and a pair with
+    each base token on each factory, and WETH has a pair with each base token.
+    """
+    snapshot = ReserveSnapshot(1)
+    assets = ["0x%040x" % (0x1000 + i) for i in range(0, asset_count)]
+    pair_id = 0
+    for factory in SWAP_FACTORIES:
+        for token in assets + [WETH_ADDRESS]:
+            for other in [WETH_ADDRESS] + BASE_TOKENS:
+                if token == other:
+                    continue
+                pair_id += 1
+                snapshot.add_pair(
+                    factory,
+                    token,
+                    other,
+                    "0x%040x" % pair_id,
+                    rng.randint(10**3, 10**6) * E18,
+                    rng.randint(10**3, 10**6) * E18,
+                )
+    return snapshot, assets
+
+
+def rebalance_orders(assets):
+    orders = []
+    for asset in assets:
+        orders.append([WETH_ADDRESS, asset, E18 // 10, AMOUNT_TYPE_EXACT_IN])
+        orders.append([WETH_ADDRESS, asset, E18, AMOUNT_TYPE_EXACT_OUT])
+    return orders
+
+
+def time_router(router, orders):
+    """
+    @return seconds is the fastest of REPEATS getLiquidPaths calls.
+    """
+    router.load = lambda orders: None
+    best = None
+    for i in range(0, REPEATS):
+        start = time.perf_counter()
+        router.getLiquidPaths([[orders]])
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(basket_sizes=BASKET_SIZES):
+    rng = random.Random(SEED)
+    results = {}
+    print("assets", "orders", "MatrixRouter ms", "LiquidPathRouter ms")
+    for size in basket_sizes:
+        snapshot, assets = random_market(rng, size)
+        orders = rebalance_orders(assets)
+        matrix_seconds = time_router(MatrixRouter(snapshot), orders)
+        scalar_seconds = time_router(LiquidPathRouter(snapshot), orders)
+        results[size] = {
+            "orders": len(orders),
+            "matrix_ms": matrix_seconds * 1000,
+            "scalar_ms": scalar_seconds * 1000,
+        }
+        print(
+            size,
+            len(orders),
+            round(matrix_seconds * 1000, 2),
+            round(scalar_seconds * 1000, 2),
+        )
+    return results
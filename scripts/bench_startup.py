@@ -0,0 +1,78 @@
+"""
+Measures how long the shared helper modules take to import in a fresh
+interpreter, with sockets disabled so that any network access at import time
+fails the run. Run with `python -m scripts.bench_startup`.
+"""
+
+import statistics
+import subprocess
+import sys
+
+MODULES = [
+    "scripts.utils.polybit_utils",
+    "scripts.utils.price_feed",
+    "scripts.utils.price_cache",
+    "scripts.utils.asset_prices",
+    "scripts.utils.order_builder",
+]
+
+# Modules that are slow to import or open connections, and should only load on
+# first use
+HEAVY_MODULES = ["brownie", "web3", "eth_abi", "pycoingecko", "requests"]
+
+RUNS = 5
+
+IMPORT_TIMER = """
+import socket
+import sys
+import time
+
+
+def no_network(*args, **kwargs):
+    raise RuntimeError("network access at import time")
+
+
+socket.socket.connect = no_network
+socket.create_connection = no_network
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def time_import(module):
+    """
+    @return elapsed is the import time in seconds, and heavy is the list of
+    heavy modules the import pulled in.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_TIMER.format(module=module, heavy=HEAVY_MODULES)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    fields = result.stdout.strip().split(" ", 1)
+    elapsed = float(fields[0])
+    heavy = fields[1].split(",") if len(fields) > 1 and fields[1] else []
+    return elapsed, heavy
+
+
+def main():
+    for module in MODULES:
+        timings = []
+        heavy = []
+        for i in range(0, RUNS):
+            elapsed, heavy = time_import(module)
+            timings.append(elapsed)
+        print(
+            module,
+            "median %.1f ms" % (statistics.median(timings) * 1000),
+            "heavy imports",
+            heavy,
+        )
+
+
+if __name__ == "__main__":
+    main()
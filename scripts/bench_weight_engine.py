@@ -0,0 +1,57 @@
+"""
+Compares the per-asset planner loops with the vectorised weight engine as the
+basket grows. Run with `python -m scripts.bench_weight_engine`.
+"""
+
+import random
+import timeit
+from scripts.utils import rebalance_planner, weight_engine
+from scripts.utils.rebalance_planner import DETFBalances
+
+BASKET_SIZES = [10, 50, 100, 250, 500]
+REPEAT = 5
+
+
+def random_basket(rng, size):
+    """
+    @return args for plan_rebalance, where half the owned assets are still
+    targeted and the other half are sold.
+    """
+    tokens = ["0x%040x" % rng.getrandbits(160) for i in range(0, size * 2)]
+    owned = tokens[0:size]
+    target = tokens[size // 2 : size // 2 + size]
+    target_weights = [10**8 // size] * size
+    decimals = {token: rng.choice([6, 9, 18]) for token in tokens}
+    token_balances = {
+        token: rng.randint(1, 10**6) * 10 ** decimals[token] for token in tokens
+    }
+    balances = DETFBalances(owned, token_balances, decimals, 10**18)
+    owned_prices = [rng.randint(10**12, 10**18) for token in owned]
+    target_prices = [rng.randint(10**12, 10**18) for token in target]
+    return balances, owned, owned_prices, target, target_weights, target_prices
+
+
+def best_time(function, basket):
+    return min(timeit.repeat(lambda: function(*basket), number=1, repeat=REPEAT))
+
+
+def main():
+    rng = random.Random(0)
+    print("assets", "loops ms", "vectorised ms", "speedup")
+    for size in BASKET_SIZES:
+        basket = random_basket(rng, size)
+        assert weight_engine.plan_rebalance(
+            *basket
+        ) == rebalance_planner.plan_rebalance(*basket)
+        loops = best_time(rebalance_planner.plan_rebalance, basket)
+        vectorised = best_time(weight_engine.plan_rebalance, basket)
+        print(
+            size,
+            "%.2f" % (loops * 1000),
+            "%.2f" % (vectorised * 1000),
+            "%.1fx" % (loops / vectorised),
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,16 +8,23 @@ from scripts import (
     deploy_multicall,
 )
 from scripts.utils.polybit_utils import get_account
+from scripts.utils.asset_prices import (
+    get_coingecko_client,
+    get_coingecko_price,
+    get_owned_assets,
+    get_target_assets,
+)
+from scripts.utils.order_builder import (
+    WETH,
+    first_deposit_combo_order_data,
+    first_deposit_order_data,
+    rebalance,
+    run_rebalance,
+)
 from brownie import config, network, Contract
-from pycoingecko import CoinGeckoAPI
 from web3 import Web3
 import time
 
-cg = CoinGeckoAPI(api_key=config["data_providers"]["coingecko"])
-
-BNBUSD = cg.get_coin_by_id("binancecoin")["market_data"]["current_price"]["usd"]
-WETH = config["networks"]["bsc-main"]["weth_address"]
-
 TEST_ONE_ASSETS = [
     "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82",
     "0xBf5140A22578168FD562DCcF235E5D43A02ce9B1",
@@ -59,29 +66,6 @@ TEST_THREE_WEIGHTS = [
 ]
 
 
-def get_coingecko_price(token_address):
-    token_price = 0
-    while token_price > 0:
-        try:
-            token_price = cg.get_coin_info_from_contract_address_by_id(
-                id="binance-smart-chain",
-                contract_address=token_address,
-            )["market_data"]["current_price"]["bnb"]
-        except:
-            print(token_address, "failed first CG attempt.")
-
-        if token_price == 0:
-            # Sometimes CG stores addresses in lowercase
-            try:
-                token_price = cg.get_coin_info_from_contract_address_by_id(
-                    id="binance-smart-chain",
-                    contract_address=token_address.lower(),
-                )["market_data"]["current_price"]["bnb"]
-            except:
-                print(token_address, "failed to get price from CG.")
-    return int(token_price * 10**18)
-
-
 def add_base_tokens_to_router(router, account):
     tx = router.addBaseToken(
         config["networks"][network.show_active()]["weth_address"],
@@ -222,660 +206,6 @@ def first_deposit_order_data(
  """
 
 
-def first_deposit_order_data(
-    detf,
-    rebalancer,
-    router,
-    owned_assets,
-    target_assets,
-    target_assets_weights,
-    target_assets_prices,
-    weth_input_amount,
-):
-    start = time.time()
-    (buyList, buyListWeights, buyListPrices) = rebalancer.createBuyList(
-        owned_assets, target_assets, target_assets_weights, target_assets_prices
-    )
-    print("Buy List", buyList)
-    print("Buy List Weights", buyListWeights)
-    print("Buy List Prices", buyListPrices)
-
-    wethBalance = detf.getWethBalance() + int(weth_input_amount)
-
-    # Begin buy orders
-    totalTargetPercentage = 0
-    tokenBalances = 0
-    totalBalance = 0
-
-    for i in range(0, len(buyList)):
-        if buyList[i] != "0x0000000000000000000000000000000000000000":
-            targetPercentage = buyListWeights[i]
-            totalTargetPercentage += targetPercentage
-
-    buyOrder = [
-        [
-            [],
-            [],
-            [],
-            [],
-        ]
-    ]
-    if len(buyList) > 0:
-        (buyListAmountsIn, buyListAmountsOut) = rebalancer.createBuyOrder(
-            buyList, buyListWeights, buyListPrices, wethBalance, totalTargetPercentage
-        )
-
-        swap_orders = [[[]]]
-        for i in range(0, len(buyList)):
-            swap_orders[0][0].append(
-                [WETH, buyList[i], buyListAmountsIn[i], buyListAmountsOut[i]]
-            )
-        (factories, paths, amounts) = router.getLiquidPaths(swap_orders)
-
-        for i in range(0, len(buyList)):
-            if buyList[i] != "0x0000000000000000000000000000000000000000":
-                if len(paths[i]) > 0:
-                    print(
-                        "Buy",
-                        factories[i],
-                        paths[i],
-                        buyListAmountsIn[i],
-                        buyListAmountsOut[i],
-                    )
-                    buyOrder[0][0].append(factories[i])
-                    buyOrder[0][1].append(paths[i])
-                    buyOrder[0][2].append(buyListAmountsIn[i])
-                    buyOrder[0][3].append(buyListAmountsOut[i])
-
-                else:
-                    print("PolybitRouter: INSUFFICIENT_TOKEN_LIQUIDITY")
-
-    orderData = [
-        [
-            [],
-            [],
-            [
-                [
-                    [],
-                    [],
-                    [],
-                    [],
-                ]
-            ],
-            [],
-            [],
-            [],
-            [],
-            [
-                [
-                    [],
-                    [],
-                    [],
-                    [],
-                ]
-            ],
-            [],
-            [],
-            [],
-            [
-                [
-                    [],
-                    [],
-                    [],
-                    [],
-                ]
-            ],
-            buyList,
-            buyListWeights,
-            buyListPrices,
-            buyOrder,
-        ]
-    ]
-    print("Order Data", orderData)
-    end = time.time()
-    print("First rebalance OrderData time", end - start)
-    return orderData
-
-
-def first_deposit_combo_order_data(
-    rebalancer,
-    router,
-    owned_assets,
-    target_assets,
-    target_assets_weights,
-    target_assets_prices,
-    weth_input_amount,
-):
-    start = time.time()
-    (buyList, buyListWeights, buyListPrices) = rebalancer.createBuyList(
-        owned_assets, target_assets, target_assets_weights, target_assets_prices
-    )
-    print("Buy List", buyList)
-    print("Buy List Weights", buyListWeights)
-    print("Buy List Prices", buyListPrices)
-
-    wethBalance = int(weth_input_amount)
-
-    # Begin buy orders
-    totalTargetPercentage = 0
-    tokenBalances = 0
-    totalBalance = 0
-
-    for i in range(0, len(buyList)):
-        if buyList[i] != "0x0000000000000000000000000000000000000000":
-            targetPercentage = buyListWeights[i]
-            totalTargetPercentage += targetPercentage
-
-    buyOrder = [
-        [
-            [],
-            [],
-            [],
-            [],
-        ]
-    ]
-    if len(buyList) > 0:
-        (buyListAmountsIn, buyListAmountsOut) = rebalancer.createBuyOrder(
-            buyList, buyListWeights, buyListPrices, wethBalance, totalTargetPercentage
-        )
-
-        swap_orders = [[[]]]
-        for i in range(0, len(buyList)):
-            swap_orders[0][0].append(
-                [WETH, buyList[i], buyListAmountsIn[i], buyListAmountsOut[i]]
-            )
-        (factories, paths, amounts) = router.getLiquidPaths(swap_orders)
-
-        for i in range(0, len(buyList)):
-            if buyList[i] != "0x0000000000000000000000000000000000000000":
-                if len(paths[i]) > 0:
-                    print(
-                        "Buy",
-                        factories[i],
-                        paths[i],
-                        buyListAmountsIn[i],
-                        buyListAmountsOut[i],
-                    )
-                    buyOrder[0][0].append(factories[i])
-                    buyOrder[0][1].append(paths[i])
-                    buyOrder[0][2].append(buyListAmountsIn[i])
-                    buyOrder[0][3].append(buyListAmountsOut[i])
-
-                else:
-                    print("PolybitRouter: INSUFFICIENT_TOKEN_LIQUIDITY")
-
-    orderData = [
-        [
-            [],
-            [],
-            [
-                [
-                    [],
-                    [],
-                    [],
-                    [],
-                ]
-            ],
-            [],
-            [],
-            [],
-            [],
-            [
-                [
-                    [],
-                    [],
-                    [],
-                    [],
-                ]
-            ],
-            [],
-            [],
-            [],
-            [
-                [
-                    [],
-                    [],
-                    [],
-                    [],
-                ]
-            ],
-            buyList,
-            buyListWeights,
-            buyListPrices,
-            buyOrder,
-        ]
-    ]
-    print("Order Data", orderData)
-    end = time.time()
-    print("First rebalance OrderData time", end - start)
-    return orderData
-
-
-def rebalance(
-    account,
-    detf,
-    rebalancer,
-    router,
-    owned_assets,
-    owned_assets_prices,
-    target_assets,
-    target_assets_weights,
-    target_assets_prices,
-):
-    start = time.time()
-    (sellList, sellListPrices) = rebalancer.createSellList(
-        owned_assets, owned_assets_prices, target_assets
-    )
-    print("Sell List", sellList)
-    print("Sell List Prices", sellListPrices)
-
-    (adjustList, adjustListWeights, adjustListPrices) = rebalancer.createAdjustList(
-        owned_assets, owned_assets_prices, target_assets, target_assets_weights
-    )
-    print("Adjust List", adjustList)
-    print("Adjust List Weights", adjustListWeights)
-    print("Adjust List Prices", adjustListPrices)
-
-    total_balance = detf.getTotalBalanceInWeth(owned_assets_prices)
-
-    (
-        adjustToSellList,
-        adjustToSellWeights,
-        adjustToSellPrices,
-    ) = rebalancer.createAdjustToSellList(
-        detf.address,
-        total_balance,
-        # owned_assets_prices,
-        adjustList,
-        adjustListWeights,
-        adjustListPrices,
-    )
-    print("Adjust To Sell List", adjustToSellList)
-    print("Adjust To Sell List Weights", adjustToSellWeights)
-    print("Adjust To Sell List Prices", adjustToSellPrices)
-
-    (
-        adjustToBuyList,
-        adjustToBuyWeights,
-        adjustToBuyPrices,
-    ) = rebalancer.createAdjustToBuyList(
-        detf.address,
-        total_balance,
-        # owned_assets_prices,
-        adjustList,
-        adjustListWeights,
-        adjustListPrices,
-    )
-    print("Adjust To Buy List", adjustToBuyList)
-    print("Adjust To Buy List Weights", adjustToBuyWeights)
-    print("Adjust To Buy List Prices", adjustToBuyPrices)
-
-    (buyList, buyListWeights, buyListPrices) = rebalancer.createBuyList(
-        owned_assets, target_assets, target_assets_weights, target_assets_prices
-    )
-    print("Buy List", buyList)
-    print("Buy List Weights", buyListWeights)
-    print("Buy List Prices", buyListPrices)
-
-    wethBalance = detf.getWethBalance({"from": account})
-
-    sellOrder = [
-        [
-            [],
-            [],
-            [],
-            [],
-        ]
-    ]
-    if len(sellList) > 0:
-        (sellListAmountsIn, sellListAmountsOut) = rebalancer.createSellOrder(
-            sellList, sellListPrices, detf.address
-        )
-
-        swap_orders = [[[]]]
-        for i in range(0, len(sellList)):
-            swap_orders[0][0].append(
-                [
-                    sellList[i],
-                    WETH,
-                    sellListAmountsIn[i],
-                    sellListAmountsOut[i],
-                ]
-            )
-        (factories, paths, amounts) = router.getLiquidPaths(swap_orders)
-
-        for i in range(0, len(sellList)):
-            if sellList[i] != "0x0000000000000000000000000000000000000000":
-                if len(paths[i]) > 0:
-                    print(
-                        "Sell",
-                        factories[i],
-                        paths[i],
-                        sellListAmountsIn[i],
-                        sellListAmountsOut[i],
-                    )
-                    sellOrder[0][0].append(factories[i])
-                    sellOrder[0][1].append(paths[i])
-                    sellOrder[0][2].append(sellListAmountsIn[i])
-                    sellOrder[0][3].append(sellListAmountsOut[i])
-                    wethBalance = wethBalance + sellListAmountsOut[i]  # simulate SELL
-                else:
-                    print("PolybitRouter: INSUFFICIENT_TOKEN_LIQUIDITY")
-
-    adjustToSellOrder = [
-        [
-            [],
-            [],
-            [],
-            [],
-        ]
-    ]
-    if len(adjustToSellList) > 0:
-        (
-            adjustToSellListAmountsIn,
-            adjustToSellListAmountsOut,
-        ) = rebalancer.createAdjustToSellOrder(
-            owned_assets_prices,
-            adjustToSellList,
-            adjustToSellWeights,
-            adjustToSellPrices,
-            detf.address,
-        )
-
-        swap_orders = [[[]]]
-        for i in range(0, len(adjustToSellList)):
-            swap_orders[0][0].append(
-                [
-                    adjustToSellList[i],
-                    WETH,
-                    adjustToSellListAmountsIn[i],
-                    adjustToSellListAmountsOut[i],
-                ]
-            )
-        (factories, paths, amounts) = router.getLiquidPaths(swap_orders)
-
-        for i in range(0, len(adjustToSellList)):
-            if adjustToSellList[i] != "0x0000000000000000000000000000000000000000":
-                if len(paths[i]) > 0:
-                    print(
-                        "Adjust To Sell",
-                        factories[i],
-                        paths[i],
-                        adjustToSellListAmountsIn[i],
-                        adjustToSellListAmountsOut[i],
-                    )
-                    adjustToSellOrder[0][0].append(factories[i])
-                    adjustToSellOrder[0][1].append(paths[i])
-                    adjustToSellOrder[0][2].append(adjustToSellListAmountsIn[i])
-                    adjustToSellOrder[0][3].append(adjustToSellListAmountsOut[i])
-                    wethBalance = wethBalance + adjustToSellListAmountsOut[i]
-                    # simulate SELL
-                else:
-                    print("PolybitRouter: INSUFFICIENT_TOKEN_LIQUIDITY")
-
-    # Begin buy orders
-    totalTargetPercentage = 0
-    tokenBalances = 0
-    totalBalance = 0
-    if len(adjustList) > 0:
-        for i in range(0, len(adjustList)):
-            (tokenBalance, tokenBalanceInWeth) = detf.getTokenBalance(
-                adjustList[i], adjustListPrices[i]
-            )
-            tokenBalances = tokenBalances + tokenBalanceInWeth
-        totalBalance = tokenBalances + wethBalance
-
-    for i in range(0, len(adjustToBuyList)):
-        if adjustToBuyList[i] != "0x0000000000000000000000000000000000000000":
-            (tokenBalance, tokenBalanceInWeth) = detf.getTokenBalance(
-                adjustToBuyList[i], adjustToBuyPrices[i]
-            )
-            tokenBalancePercentage = (10**8 * tokenBalanceInWeth) / totalBalance
-            targetPercentage = adjustToBuyWeights[i]
-            totalTargetPercentage += targetPercentage - tokenBalancePercentage
-
-    for i in range(0, len(buyList)):
-        if buyList[i] != "0x0000000000000000000000000000000000000000":
-            targetPercentage = buyListWeights[i]
-            totalTargetPercentage += targetPercentage
-
-    print("totalTargetPercentage", totalTargetPercentage)
-
-    adjustToBuyOrder = [
-        [
-            [],
-            [],
-            [],
-            [],
-        ]
-    ]
-
-    if len(adjustToBuyList) > 0:
-        (
-            adjustToBuyListAmountsIn,
-            adjustToBuyListAmountsOut,
-        ) = rebalancer.createAdjustToBuyOrder(
-            totalBalance,
-            wethBalance,
-            adjustToBuyList,
-            adjustToBuyWeights,
-            adjustToBuyPrices,
-            totalTargetPercentage,
-            detf.address,
-        )
-
-        swap_orders = [[[]]]
-        for i in range(0, len(adjustToBuyList)):
-            swap_orders[0][0].append(
-                [
-                    WETH,
-                    adjustToBuyList[i],
-                    adjustToBuyListAmountsIn[i],
-                    adjustToBuyListAmountsOut[i],
-                ]
-            )
-        (factories, paths, amounts) = router.getLiquidPaths(swap_orders)
-
-        for i in range(0, len(adjustToBuyList)):
-            if adjustToBuyList[i] != "0x0000000000000000000000000000000000000000":
-                if len(paths[i]) > 0:
-                    print(
-                        "Adjust To Buy",
-                        factories[i],
-                        paths[i],
-                        adjustToBuyListAmountsIn[i],
-                        adjustToBuyListAmountsOut[i],
-                    )
-                    adjustToBuyOrder[0][0].append(factories[i])
-                    adjustToBuyOrder[0][1].append(paths[i])
-                    adjustToBuyOrder[0][2].append(adjustToBuyListAmountsIn[i])
-                    adjustToBuyOrder[0][3].append(adjustToBuyListAmountsOut[i])
-
-                else:
-                    print("PolybitRouter: INSUFFICIENT_TOKEN_LIQUIDITY")
-
-    buyOrder = [
-        [
-            [],
-            [],
-            [],
-            [],
-        ]
-    ]
-    if len(buyList) > 0:
-        (buyListAmountsIn, buyListAmountsOut) = rebalancer.createBuyOrder(
-            buyList, buyListWeights, buyListPrices, wethBalance, totalTargetPercentage
-        )
-
-        swap_orders = [[[]]]
-        for i in range(0, len(buyList)):
-            swap_orders[0][0].append(
-                [WETH, buyList[i], buyListAmountsIn[i], buyListAmountsOut[i]]
-            )
-        (factories, paths, amounts) = router.getLiquidPaths(swap_orders)
-
-        for i in range(0, len(buyList)):
-            if buyList[i] != "0x0000000000000000000000000000000000000000":
-                if len(paths[i]) > 0:
-                    print(
-                        "Buy",
-                        factories[i],
-                        paths[i],
-                        buyListAmountsIn[i],
-                        buyListAmountsOut[i],
-                    )
-                    buyOrder[0][0].append(factories[i])
-                    buyOrder[0][1].append(paths[i])
-                    buyOrder[0][2].append(buyListAmountsIn[i])
-                    buyOrder[0][3].append(buyListAmountsOut[i])
-
-                else:
-                    print("PolybitRouter: INSUFFICIENT_TOKEN_LIQUIDITY")
-
-    orderData = [
-        [
-            sellList,
-            sellListPrices,
-            sellOrder,
-            adjustList,
-            adjustListPrices,
-            adjustToSellList,
-            adjustToSellPrices,
-            adjustToSellOrder,
-            adjustToBuyList,
-            adjustToBuyWeights,
-            adjustToBuyPrices,
-            adjustToBuyOrder,
-            buyList,
-            buyListWeights,
-            buyListPrices,
-            buyOrder,
-        ]
-    ]
-    print("Order Data", orderData)
-    end = time.time()
-    print("Full rebalance OrderData time", end - start)
-
-    tx = detf.rebalanceDETF(
-        orderData,
-        {"from": account},
-    )
-    tx.wait(1)
-    for i in range(0, len(tx.events)):
-        print(tx.events[i])
-
-
-def get_owned_assets(detf):
-    owned_assets = detf.getOwnedAssets()
-    owned_assets_prices = []
-    print("Getting owned asset prices from CoinGecko")
-
-    for i in range(0, len(owned_assets)):
-        try:
-            owned_assets_prices.append(
-                int(
-                    cg.get_coin_info_from_contract_address_by_id(
-                        id="binance-smart-chain",
-                        contract_address=owned_assets[i],
-                    )["market_data"]["current_price"]["bnb"]
-                    * 10**18
-                )
-            )
-        except:
-            owned_assets_prices.append(
-                int(
-                    cg.get_coin_info_from_contract_address_by_id(
-                        id="binance-smart-chain",
-                        contract_address=owned_assets[i].lower(),
-                    )["market_data"]["current_price"]["bnb"]
-                    * 10**18
-                )
-            )
-
-    return owned_assets, owned_assets_prices
-
-
-def get_target_assets(target_assets, target_assets_weights):
-    target_assets_prices = []
-    print("Getting target asset prices from CoinGecko")
-    for i in range(0, len(target_assets)):
-        try:
-            target_assets_prices.append(
-                int(
-                    cg.get_coin_info_from_contract_address_by_id(
-                        id="binance-smart-chain",
-                        contract_address=target_assets[i],
-                    )["market_data"]["current_price"]["bnb"]
-                    * 10**18
-                )
-            )
-        except:
-            target_assets_prices.append(
-                int(
-                    cg.get_coin_info_from_contract_address_by_id(
-                        id="binance-smart-chain",
-                        contract_address=target_assets[i].lower(),
-                    )["market_data"]["current_price"]["bnb"]
-                    * 10**18
-                )
-            )
-    return target_assets, target_assets_weights, target_assets_prices
-
-
-def run_rebalance(account, detf, rebalancer, router, assets, weights):
-    (owned_assets, owned_assets_prices) = get_owned_assets(detf)
-    (
-        target_assets,
-        target_assets_weights,
-        target_assets_prices,
-    ) = get_target_assets(assets, weights)
-    print("Owned Assets Before:", owned_assets)
-    print("Target Assets Before:", target_assets)
-
-    rebalance(
-        account,
-        detf,
-        rebalancer,
-        router,
-        owned_assets,
-        owned_assets_prices,
-        target_assets,
-        target_assets_weights,
-        target_assets_prices,
-    )
-
-    (owned_assets, owned_assets_prices) = get_owned_assets(detf)
-    (
-        target_assets,
-        target_assets_weights,
-        target_assets_prices,
-    ) = get_target_assets(assets, weights)
-    print("Owned Assets After:", owned_assets)
-    print("Target Assets After:", target_assets)
-
-    total_balance = detf.getTotalBalanceInWeth(owned_assets_prices)
-    print("Total Balance", total_balance)
-    print("Total Balance %", round(total_balance / detf.getTotalDeposited(), 4))
-
-    for i in range(0, len(owned_assets)):
-        token_balance, token_balance_in_weth = detf.getTokenBalance(
-            owned_assets[i], owned_assets_prices[i]
-        )
-        for x in range(0, len(assets)):
-            if owned_assets[i] == assets[x]:
-                print(
-                    "Address",
-                    owned_assets[i],
-                    "Target",
-                    round(
-                        (weights[x] / 10**8),
-                        4,
-                    ),
-                    "Actual",
-                    round(token_balance_in_weth / total_balance, 4),
-                )
-
-
 def main():
     print(network.show_active())
     polybit_owner_account = get_account(type="polybit_owner")
@@ -1111,7 +441,6 @@ def main():
         target_assets_prices,
     ) = get_target_assets(TEST_ONE_ASSETS, TEST_ONE_WEIGHTS)
     order_data = first_deposit_combo_order_data(
-        polybit_rebalancer,
         polybit_router,
         owned_assets,
         target_assets,
@@ -1121,7 +450,7 @@ def main():
     )
 
     tx = polybit_detf_factory.createDETF(
-        [wallet_owner, product_id, lock_duration, order_data],
+        [wallet_owner, product_id, lock_duration, order_data.as_args()],
         {"from": polybit_owner_account, "value": deposit_amount},
     )
     for i in range(0, len(tx.events)):
@@ -1189,7 +518,6 @@ def main():
     ) = get_target_assets(TEST_ONE_ASSETS, TEST_ONE_WEIGHTS)
     order_data = first_deposit_order_data(
         detf,
-        polybit_rebalancer,
         polybit_router,
         owned_assets,
         target_assets,
@@ -1200,7 +528,7 @@ def main():
 
     tx = detf.deposit(
         time.time() + lock_duration,
-        order_data,
+        order_data.as_args(),
         {"from": wallet_owner, "value": deposit_amount},
     )
     tx.wait(1)
@@ -1214,10 +542,10 @@ def main():
     run_rebalance(
         rebalancer_account,
         detf,
-        polybit_rebalancer,
         polybit_router,
         TEST_TWO_ASSETS,
         TEST_TWO_WEIGHTS,
+        polybit_multicall,
     )
     print("Deposits", detf.getDeposits())
     print("Total Deposits", detf.getTotalDeposited())
@@ -1229,10 +557,10 @@ def main():
     run_rebalance(
         rebalancer_account,
         detf,
-        polybit_rebalancer,
         polybit_router,
         TEST_THREE_ASSETS,
         TEST_THREE_WEIGHTS,
+        polybit_multicall,
     )
     print("Deposits", detf.getDeposits())
     print("Total Deposits", detf.getTotalDeposited())
@@ -1262,7 +590,7 @@ def main():
     owned_assets_prices = []
     for i in range(0, len(owned_assets)):
         price = int(
-            cg.get_coin_info_from_contract_address_by_id(
+            get_coingecko_client().get_coin_info_from_contract_address_by_id(
                 id="binance-smart-chain",
                 contract_address=owned_assets[i],
             )["market_data"]["current_price"]["bnb"]
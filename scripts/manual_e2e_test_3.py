@@ -7,15 +7,16 @@ from scripts import (
     deploy_DETF_from_factory,
 )
 from scripts.utils.polybit_utils import get_account
+from scripts.utils.asset_prices import (
+    get_owned_assets,
+    get_target_assets,
+    price_cache,
+    record_price_snapshot,
+)
 from brownie import config, network
-from pycoingecko import CoinGeckoAPI
 from web3 import Web3
 import time
 
-cg = CoinGeckoAPI(api_key=config["data_providers"]["coingecko"])
-
-BNBUSD = cg.get_coin_by_id("binancecoin")["market_data"]["current_price"]["usd"]
-
 TEST_ONE_ASSETS = [
     "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82",
     "0xBf5140A22578168FD562DCcF235E5D43A02ce9B1",
@@ -61,29 +62,6 @@ TEST_THREE_WEIGHTS = [
 ]
 
 
-def get_coingecko_price(token_address):
-    token_price = 0
-    while token_price > 0:
-        try:
-            token_price = cg.get_coin_info_from_contract_address_by_id(
-                id="binance-smart-chain",
-                contract_address=token_address,
-            )["market_data"]["current_price"]["bnb"]
-        except:
-            print(token_address, "failed first CG attempt.")
-
-        if token_price == 0:
-            # Sometimes CG stores addresses in lowercase
-            try:
-                token_price = cg.get_coin_info_from_contract_address_by_id(
-                    id="binance-smart-chain",
-                    contract_address=token_address.lower(),
-                )["market_data"]["current_price"]["bnb"]
-            except:
-                print(token_address, "failed to get price from CG.")
-    return int(token_price * 10**18)
-
-
 def add_base_tokens_to_router(router, account):
     router.addBaseToken(
         config["networks"][network.show_active()]["weth_address"],
@@ -110,6 +88,7 @@ def first_deposit_order_data(
     target_assets_weights,
     target_assets_prices,
     weth_input_amount):
+    record_price_snapshot(target_assets, target_assets_prices)
     (buyList, buyListWeights, buyListPrices) = rebalancer.createBuyList(
         owned_assets, target_assets, target_assets_weights, target_assets_prices
     )
@@ -201,6 +180,10 @@ def rebalance(
     target_assets_weights,
     target_assets_prices,
 ):
+    record_price_snapshot(
+        list(owned_assets) + list(target_assets),
+        list(owned_assets_prices) + list(target_assets_prices),
+    )
 
     (sellList, sellListPrices) = rebalancer.createSellList(
         owned_assets, owned_assets_prices, target_assets
@@ -478,70 +461,14 @@ def rebalance(
         print(tx.events[i])
 
 
-def get_owned_assets(detf):
-    owned_assets = detf.getOwnedAssets()
-    owned_assets_prices = []
-    print("Getting owned asset prices from CoinGecko")
-
-    for i in range(0, len(owned_assets)):
-        try:
-            owned_assets_prices.append(
-                int(
-                    cg.get_coin_info_from_contract_address_by_id(
-                        id="binance-smart-chain",
-                        contract_address=owned_assets[i],
-                    )["market_data"]["current_price"]["bnb"]
-                    * 10**18
-                )
-            )
-        except:
-            owned_assets_prices.append(
-                int(
-                    cg.get_coin_info_from_contract_address_by_id(
-                        id="binance-smart-chain",
-                        contract_address=owned_assets[i].lower(),
-                    )["market_data"]["current_price"]["bnb"]
-                    * 10**18
-                )
-            )
-
-    return owned_assets, owned_assets_prices
-
-
-def get_target_assets(detf, target_assets, target_assets_weights):
-    target_assets_prices = []
-    print("Getting target asset prices from CoinGecko")
-    for i in range(0, len(target_assets)):
-        try:
-            target_assets_prices.append(
-                int(
-                    cg.get_coin_info_from_contract_address_by_id(
-                        id="binance-smart-chain",
-                        contract_address=target_assets[i],
-                    )["market_data"]["current_price"]["bnb"]
-                    * 10**18
-                )
-            )
-        except:
-            target_assets_prices.append(
-                int(
-                    cg.get_coin_info_from_contract_address_by_id(
-                        id="binance-smart-chain",
-                        contract_address=target_assets[i].lower(),
-                    )["market_data"]["current_price"]["bnb"]
-                    * 10**18
-                )
-            )
-    return target_assets, target_assets_weights, target_assets_prices
-
-
 def run_rebalance(account, detf, rebalancer, router, assets, weights):
+    price_cache.reset()
     (owned_assets, owned_assets_prices) = get_owned_assets(detf)
     (
         target_assets,
         target_assets_weights,
         target_assets_prices,
-    ) = get_target_assets(detf, assets, weights)
+    ) = get_target_assets(assets, weights)
     print("Owned Assets Before:", owned_assets)
     print("Target Assets Before:", target_assets)
 
@@ -562,7 +489,7 @@ def run_rebalance(account, detf, rebalancer, router, assets, weights):
         target_assets,
         target_assets_weights,
         target_assets_prices,
-    ) = get_target_assets(detf, assets, weights)
+    ) = get_target_assets(assets, weights)
     print("Owned Assets After:", owned_assets)
     print("Target Assets After:", target_assets)
 
@@ -587,6 +514,8 @@ def run_rebalance(account, detf, rebalancer, router, assets, weights):
                     "Actual",
                     round(token_balance_in_weth / total_balance, 4),
                 )
+    print("Price cache", price_cache.stats())
+
 
 def main():
     print(network.show_active())
@@ -731,7 +660,7 @@ def main():
         target_assets,
         target_assets_weights,
         target_assets_prices,
-    ) = get_target_assets(detf, TEST_ONE_ASSETS,TEST_ONE_WEIGHTS)
+    ) = get_target_assets(TEST_ONE_ASSETS,TEST_ONE_WEIGHTS)
     order_data = first_deposit_order_data(
     polybit_rebalancer,
     polybit_router,
@@ -0,0 +1,120 @@
+from brownie import (
+    Contract,
+    PolybitDETF,
+    PolybitDETFFactory,
+    PolybitLiquidPath,
+    PolybitMulticall,
+)
+from scripts.utils.fleet_rebalancer import list_fleet, plan_fleet
+from scripts.utils.liquid_path import LiquidPathRouter
+from scripts.utils.multicall_reserves import MulticallReserveReader
+from scripts.utils.order_builder import rebalance_call
+from scripts.utils.pair_index import get_pair_index
+from scripts.utils.polybit_utils import get_account
+from scripts.utils.quote_engine import MatrixRouter
+from scripts.utils.rebalance_planner import DriftTolerance
+from scripts.utils.route_search import RouteSearch
+
+
+def rebalance_fleet(
+    account,
+    detf_factory,
+    router,
+    target_assets,
+    target_assets_weights,
+    product_category=None,
+    product_dimension=None,
+    multicall=None,
+    tolerance=None,
+):
+    detfs = list_fleet(
+        detf_factory,
+        lambda address: Contract.from_abi("detf", address, PolybitDETF.abi),
+        product_category,
+        product_dimension,
+    )
+    fleet_plan = plan_fleet(
+        router,
+        detfs,
+        target_assets,
+        target_assets_weights,
+        multicall=multicall,
+        tolerance=tolerance,
+    )
+    fleet_plan.report()
+
+    for detf in detfs:
+        call = rebalance_call(detf.address, fleet_plan.order_data[detf.address])
+        tx = call.transact(account)
+        tx.wait(1)
+        for i in range(0, len(tx.events)):
+            print(tx.events[i])
+    return fleet_plan
+
+
+def main(
+    detf_factory_address,
+    router_address,
+    target_assets,
+    target_assets_weights,
+    product_category=None,
+    product_dimension=None,
+    multicall_address=None,
+    drift_tolerance_bps=None,
+    min_weth_notional=0,
+    offchain_routing=False,
+    max_hops=None,
+    multicall_reserves=False,
+    matrix_routing=False,
+):
+    rebalancer_account = get_account(type="rebalancer_owner")
+    detf_factory = Contract.from_abi(
+        "detf_factory", detf_factory_address, PolybitDETFFactory.abi
+    )
+    pair_index = None
+    if offchain_routing:
+        # Routes from one reserve snapshot instead of a getLiquidPaths call,
+        # with pair addresses from the local index instead of getPair calls
+        pair_index = get_pair_index()
+        route_search = None
+        if max_hops is not None:
+            # Searches paths of up to max_hops pairs through BUSD, USDT,
+            # USDC and WBNB instead of mirroring the contract
+            route_search = RouteSearch(max_hops=max_hops)
+        reserve_reader = None
+        if multicall_reserves and multicall_address is not None:
+            # Reads pairs of factories outside the index with getReservesBatch
+            # on the multicall, which must be a deployment that has it
+            reserve_reader = MulticallReserveReader(multicall_address)
+        # Quotes every order's direct and base token paths on every factory
+        # as one matrix, trying every base token unlike the contract
+        router_class = MatrixRouter if matrix_routing else LiquidPathRouter
+        router = router_class(
+            pair_index=pair_index,
+            route_search=route_search,
+            reserve_reader=reserve_reader,
+        )
+    else:
+        router = Contract.from_abi("router", router_address, PolybitLiquidPath.abi)
+    multicall = None
+    if multicall_address is not None:
+        multicall = Contract.from_abi(
+            "multicall", multicall_address, PolybitMulticall.abi
+        )
+    tolerance = None
+    if drift_tolerance_bps is not None:
+        tolerance = DriftTolerance(drift_tolerance_bps, min_weth_notional)
+    fleet_plan = rebalance_fleet(
+        rebalancer_account,
+        detf_factory,
+        router,
+        target_assets,
+        target_assets_weights,
+        product_category,
+        product_dimension,
+        multicall,
+        tolerance,
+    )
+    if pair_index is not None:
+        pair_index.save()
+    return fleet_plan
@@ -0,0 +1,167 @@
+from scripts.utils.dex import (
+    SWAP_FACTORIES,
+    WETH_ADDRESS,
+    ZERO_ADDRESS,
+    sort_tokens,
+    to_checksum_address,
+)
+from scripts.utils.price_feed import (
+    DEFAULT_QUOTE_CURRENCY,
+    PriceFeedError,
+    unique_checksum_addresses,
+)
+from scripts.utils.rpc_batch import BatchCaller, decode_result, encode_call
+
+
+def reserve_price(reserve_token, reserve_weth, token_decimals):
+    """
+    @return price is the amount of WETH wei per whole token, matching the
+    scaling used by PolybitDETF.getTokenBalance.
+    """
+    return (reserve_weth * 10**token_decimals) // reserve_token
+
+
+class AmmReservePriceProvider:
+    """
+    Derives WETH denominated token prices from the reserves of the token/WETH
+    pairs on each supported factory, using the deepest pool per token.
+    """
+
+    def __init__(
+        self,
+        batch_caller=None,
+        weth_address=WETH_ADDRESS,
+        factories=SWAP_FACTORIES,
+        quote=DEFAULT_QUOTE_CURRENCY,
+        pair_index=None,
+        reserve_cache=None,
+    ):
+        self.batch_caller = batch_caller if batch_caller is not None else BatchCaller()
+        self.weth_address = to_checksum_address(weth_address)
+        self.factories = [to_checksum_address(factory) for factory in factories]
+        self.quote = quote
+        # A PairIndex, whose factories need no getPair calls
+        self.pair_index = pair_index
+        # A ReserveCache, kept current from Sync events between calls
+        self.reserve_cache = reserve_cache
+
+    def is_indexed(self, factory):
+        return self.pair_index is not None and self.pair_index.covers(factory)
+
+    def get_pairs(self, token_addresses, block="latest"):
+        """
+        @return pairs is a dict of token address to a list of (factory, pair),
+        and decimals is a dict of token address to decimals.
+        """
+        calls = []
+        for token in token_addresses:
+            calls.append((token, encode_call("decimals()")))
+            for factory in self.factories:
+                if self.is_indexed(factory):
+                    continue
+                calls.append(
+                    (
+                        factory,
+                        encode_call(
+                            "getPair(address,address)",
+                            ["address", "address"],
+                            [token, self.weth_address],
+                        ),
+                    )
+                )
+        results = iter(self.batch_caller.call_many(calls, block))
+
+        pairs = {}
+        decimals = {}
+        for token in token_addresses:
+            token_decimals = decode_result(["uint8"], next(results))
+            if token_decimals is not None:
+                decimals[token] = token_decimals[0]
+            pairs[token] = []
+            for factory in self.factories:
+                if self.is_indexed(factory):
+                    # Pairs known to be missing are left out, the rest are
+                    # confirmed by their getReserves read
+                    if self.pair_index.needs_check(factory, token, self.weth_address):
+                        pair = self.pair_index.pair_for(
+                            factory, token, self.weth_address
+                        )
+                        pairs[token].append((factory, pair))
+                    continue
+                pair = decode_result(["address"], next(results))
+                if pair is not None and pair[0] != ZERO_ADDRESS:
+                    pairs[token].append((factory, to_checksum_address(pair[0])))
+        return pairs, decimals
+
+    def get_pools(self, token_addresses, block="latest"):
+        """
+        @return pools is a dict of token address to a list of
+        (factory, pair, reserveToken, reserveWeth).
+        """
+        pairs, decimals = self.get_pairs(token_addresses, block)
+        pair_addresses = []
+        for token in token_addresses:
+            for factory, pair in pairs[token]:
+                pair_addresses.append(pair)
+        if self.reserve_cache is not None:
+            results = iter(self.reserve_cache.get_reserves(pair_addresses, block))
+        else:
+            results = iter(
+                decode_result(["uint112", "uint112", "uint32"], result)
+                for result in self.batch_caller.call_many(
+                    [(pair, encode_call("getReserves()")) for pair in pair_addresses],
+                    block,
+                )
+            )
+
+        pools = {}
+        for token in token_addresses:
+            pools[token] = []
+            token0, _ = sort_tokens(token, self.weth_address)
+            for factory, pair in pairs[token]:
+                reserves = next(results)
+                if self.is_indexed(factory):
+                    self.pair_index.mark(
+                        factory,
+                        token,
+                        self.weth_address,
+                        reserves is not None,
+                        block if isinstance(block, int) else None,
+                    )
+                if reserves is None:
+                    continue
+                reserve0, reserve1 = reserves[0:2]
+                if token == token0:
+                    pools[token].append((factory, pair, reserve0, reserve1))
+                else:
+                    pools[token].append((factory, pair, reserve1, reserve0))
+        return pools, decimals
+
+    def get_prices(self, token_addresses, quote=DEFAULT_QUOTE_CURRENCY, block="latest"):
+        if quote != self.quote:
+            raise PriceFeedError(f"AMM reserve prices are quoted in {self.quote}")
+
+        token_addresses = unique_checksum_addresses(token_addresses)
+        prices = {}
+        if self.weth_address in token_addresses:
+            prices[self.weth_address] = 10**18
+        tokens = [token for token in token_addresses if token != self.weth_address]
+
+        pools, decimals = self.get_pools(tokens, block)
+        missing = []
+        for token in tokens:
+            liquid_pools = [
+                pool for pool in pools[token] if pool[2] > 0 and pool[3] > 0
+            ]
+            if token not in decimals or len(liquid_pools) == 0:
+                missing.append(token)
+                continue
+            _, _, reserve_token, reserve_weth = max(
+                liquid_pools, key=lambda pool: pool[3]
+            )
+            prices[token] = reserve_price(reserve_token, reserve_weth, decimals[token])
+
+        if len(missing) > 0:
+            raise PriceFeedError(f"No liquid WETH pool found for {missing}")
+
+        return prices
@@ -0,0 +1,98 @@
+"""
+Price helpers shared by the deploy and rebalance scripts. Nothing here touches
+brownie, CoinGecko or the chain until a price is first requested, so importing
+the module is cheap and works offline.
+"""
+
+import os
+from functools import lru_cache
+from scripts.utils.async_prices import AsyncPriceClient
+from scripts.utils.dex import to_checksum_address
+from scripts.utils.price_cache import CachedPriceProvider, PriceCache
+from scripts.utils.price_feed import create_price_provider, prices_as_list
+from scripts.utils.price_snapshots import (
+    DEFAULT_SNAPSHOT_PATH,
+    PriceSnapshotStore,
+    SnapshotPriceProvider,
+)
+
+# "coingecko" or "amm" to price from on-chain pair reserves
+PRICE_SOURCE = "coingecko"
+# Name of a recorded price snapshot to replay rebalances offline, or None
+REPLAY_PRICE_SNAPSHOT = os.environ.get("POLYBIT_REPLAY_PRICE_SNAPSHOT")
+# Connects on first use
+price_snapshots = PriceSnapshotStore(
+    os.environ.get("POLYBIT_PRICE_SNAPSHOT_DB", DEFAULT_SNAPSHOT_PATH)
+)
+# Shared by every pricing helper, reset at the start of each rebalance cycle
+price_cache = PriceCache()
+
+
+def get_coingecko_api_key():
+    from brownie import config
+
+    return config["data_providers"]["coingecko"]
+
+
+@lru_cache(maxsize=None)
+def get_coingecko_client():
+    from pycoingecko import CoinGeckoAPI
+
+    return CoinGeckoAPI(api_key=get_coingecko_api_key())
+
+
+@lru_cache(maxsize=None)
+def get_bnb_usd_price():
+    return get_coingecko_client().get_coin_by_id("binancecoin")["market_data"][
+        "current_price"
+    ]["usd"]
+
+
+@lru_cache(maxsize=None)
+def get_price_provider():
+    if REPLAY_PRICE_SNAPSHOT is None:
+        return CachedPriceProvider(
+            AsyncPriceClient(
+                create_price_provider(PRICE_SOURCE, get_coingecko_api_key())
+            ),
+            price_cache,
+        )
+    return CachedPriceProvider(
+        SnapshotPriceProvider(price_snapshots, REPLAY_PRICE_SNAPSHOT), price_cache
+    )
+
+
+def get_coingecko_price(token_address):
+    return get_price_provider().get_prices([token_address])[
+        to_checksum_address(token_address)
+    ]
+
+
+def record_price_snapshot(token_addresses, token_prices):
+    if REPLAY_PRICE_SNAPSHOT is None:
+        from brownie import chain
+
+        name = price_snapshots.save(
+            dict(zip(token_addresses, token_prices)), chain.height
+        )
+        print("Price snapshot", name)
+
+
+def get_owned_assets(detf, provider=None):
+    if provider is None:
+        provider = get_price_provider()
+    owned_assets = detf.getOwnedAssets()
+    print("Getting owned asset prices")
+    prices = provider.get_prices(owned_assets)
+    owned_assets_prices = prices_as_list(owned_assets, prices)
+
+    return owned_assets, owned_assets_prices
+
+
+def get_target_assets(target_assets, target_assets_weights, provider=None):
+    if provider is None:
+        provider = get_price_provider()
+    print("Getting target asset prices")
+    prices = provider.get_prices(target_assets)
+    target_assets_prices = prices_as_list(target_assets, prices)
+    return target_assets, target_assets_weights, target_assets_prices
@@ -0,0 +1,207 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from scripts.utils.price_feed import (
+    COINGECKO_BATCH_SIZE,
+    DEFAULT_QUOTE_CURRENCY,
+    PriceFeedError,
+    is_transient,
+    unique_checksum_addresses,
+)
+
+DEFAULT_REQUESTS_PER_SECOND = 5
+DEFAULT_HEDGE_PERCENTILE = 95
+DEFAULT_INITIAL_HEDGE_DELAY = 2.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_REQUEST_TIMEOUT = 30
+DEFAULT_MAX_WORKERS = 16
+
+
+class PriceFetchError(PriceFeedError):
+    def __init__(self, token_addresses, attempts, last_error):
+        self.token_addresses = token_addresses
+        self.attempts = attempts
+        self.last_error = last_error
+        super().__init__(
+            f"Failed to fetch prices for {token_addresses} after {attempts} attempts: {last_error}"
+        )
+
+
+class TokenBucket:
+    """
+    Allows bursts of up to capacity requests, refilled at rate per second.
+    Callers reserve a token up front and sleep off any shortfall, so no lock
+    is needed within an event loop.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated_at = clock()
+
+    def reserve(self):
+        """
+        @return wait is the number of seconds until the reserved token is available.
+        """
+        now = self.clock()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class LatencyTracker:
+    def __init__(self, window=100):
+        self.samples = deque(maxlen=window)
+
+    def record(self, latency):
+        self.samples.append(latency)
+
+    def percentile(self, percentile):
+        if len(self.samples) == 0:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+
+class AsyncPriceClient:
+    """
+    Fetches prices from a price provider concurrently in batches, under a token
+    bucket rate limit. A batch that runs past the hedge percentile of recent
+    latencies gets a duplicate request and the first answer wins. Batches
+    failing in transport, on a timeout or a 429 or 5xx response are retried
+    with exponential backoff, then raise PriceFetchError; any other failure,
+    such as a token without a price, is raised at once.
+    Batches default to the provider's own batch size, so each batch is one
+    provider request.
+    """
+
+    def __init__(
+        self,
+        provider,
+        requests_per_second=DEFAULT_REQUESTS_PER_SECOND,
+        burst=None,
+        batch_size=None,
+        hedge_percentile=DEFAULT_HEDGE_PERCENTILE,
+        initial_hedge_delay=DEFAULT_INITIAL_HEDGE_DELAY,
+        max_attempts=DEFAULT_MAX_ATTEMPTS,
+        backoff=DEFAULT_BACKOFF,
+        request_timeout=DEFAULT_REQUEST_TIMEOUT,
+        max_workers=DEFAULT_MAX_WORKERS,
+    ):
+        self.provider = provider
+        if batch_size is None:
+            batch_size = getattr(provider, "batch_size", COINGECKO_BATCH_SIZE)
+        self.batch_size = batch_size
+        self.hedge_percentile = hedge_percentile
+        self.initial_hedge_delay = initial_hedge_delay
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.request_timeout = request_timeout
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.latencies = LatencyTracker()
+        # Owned by the client so that a losing hedged request left running in
+        # its thread does not hold up asyncio.run shutting down
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.requests = 0
+        self.hedges = 0
+
+    def hedge_delay(self):
+        delay = self.latencies.percentile(self.hedge_percentile)
+        if delay is None:
+            return self.initial_hedge_delay
+        return delay
+
+    async def timed_request(self, token_addresses, quote):
+        await self.bucket.acquire()
+        self.requests += 1
+        start = time.monotonic()
+        prices = await asyncio.wait_for(
+            asyncio.get_running_loop().run_in_executor(
+                self.executor, self.provider.get_prices, token_addresses, quote
+            ),
+            self.request_timeout,
+        )
+        self.latencies.record(time.monotonic() - start)
+        return prices
+
+    async def hedged_request(self, token_addresses, quote):
+        primary = asyncio.ensure_future(self.timed_request(token_addresses, quote))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay())
+        if primary in done:
+            return primary.result()
+
+        self.hedges += 1
+        hedge = asyncio.ensure_future(self.timed_request(token_addresses, quote))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while len(pending) > 0:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch_batch(self, token_addresses, quote):
+        error = None
+        for attempt in range(0, self.max_attempts):
+            if attempt > 0:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                return await self.hedged_request(token_addresses, quote)
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                error = e
+        raise PriceFetchError(token_addresses, self.max_attempts, error)
+
+    async def get_prices_async(self, token_addresses, quote=DEFAULT_QUOTE_CURRENCY):
+        token_addresses = unique_checksum_addresses(token_addresses)
+        batches = [
+            token_addresses[i : i + self.batch_size]
+            for i in range(0, len(token_addresses), self.batch_size)
+        ]
+        results = await asyncio.gather(
+            *[self.fetch_batch(batch, quote) for batch in batches]
+        )
+        prices = {}
+        for result in results:
+            prices.update(result)
+        return prices
+
+    def get_prices(self, token_addresses, quote=DEFAULT_QUOTE_CURRENCY):
+        """
+        Blocking get_prices_async. asyncio.run cannot start a loop in a thread
+        that already runs one, so there it runs in a thread of its own, and
+        blocks the running loop until done; coroutines should await
+        get_prices_async instead.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.get_prices_async(token_addresses, quote))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(
+                asyncio.run, self.get_prices_async(token_addresses, quote)
+            ).result()
@@ -0,0 +1,51 @@
+"""
+Addresses of the BSC mainnet tokens and factories that PolybitLiquidPath
+routes through.
+"""
+
+WETH_ADDRESS = "0xbb4CdB9CBd36B01bD1cBaEBF2De08d9173bc095c"
+BUSD_ADDRESS = "0xe9e7CEA3DedcA5984780Bafc599bD69ADd087D56"
+USDT_ADDRESS = "0x55d398326f99059fF775485246999027B3197955"
+USDC_ADDRESS = "0x8AC76a51cc950d9822D68b83fE1Ad97B32Cd580d"
+
+PANCAKESWAP_V2_FACTORY = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+SUSHISWAP_V2_FACTORY = "0xc35DADB65012eC5796536bD9864eD8773aBc74C4"
+BISWAP_FACTORY = "0x858E3312ed3A876947EA49d572A7C42DE08af7EE"
+
+# In the order PolybitLiquidPath.getLiquidPath evaluates them
+SWAP_FACTORIES = [PANCAKESWAP_V2_FACTORY, SUSHISWAP_V2_FACTORY, BISWAP_FACTORY]
+
+# keccak256 of each factory's pair creation code, from which pair addresses
+# follow by CREATE2. Each is checked against a deployed pair in
+# tests/test_pair_index.py; SushiSwap has none checked yet, so its pairs are
+# still found with getPair
+FACTORY_INIT_CODE_HASHES = {
+    PANCAKESWAP_V2_FACTORY: "0x00fb7f630766e6a796048ea87d01acd3068e8ff67d078148a3fa3f4a84f69bd5",
+    BISWAP_FACTORY: "0xfea293c909d87cd4153593f077b76bb7e94340200f4ee84211ae8e4f9bd7ffdf",
+}
+
+# PolybitLiquidPath.baseTokens
+BASE_TOKENS = [BUSD_ADDRESS, USDT_ADDRESS, USDC_ADDRESS]
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# PolybitLiquidPath.SwapOrder.amountType, quoting an exact amount in or out
+AMOUNT_TYPE_EXACT_IN = 0
+AMOUNT_TYPE_EXACT_OUT = 1
+
+
+def sort_tokens(token_a, token_b):
+    """
+    Mirrors PolybitSwapLibrary.sortTokens.
+    """
+    if int(token_a, 16) < int(token_b, 16):
+        return token_a, token_b
+    return token_b, token_a
+
+
+def to_checksum_address(address):
+    # web3 takes most of a second to import, so it is only loaded once an
+    # address actually needs checksumming
+    from web3 import Web3
+
+    return Web3.toChecksumAddress(address)
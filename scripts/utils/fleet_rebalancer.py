@@ -0,0 +1,159 @@
+"""
+Plans the rebalance of every DETF of a product in one pass. The fleet shares
+one price vector and one RouteTable, so each token is priced once and each
+(tokenIn, tokenOut) pair is routed once however many DETFs hold it.
+"""
+
+import time
+from scripts.utils.asset_prices import get_price_provider, record_price_snapshot
+from scripts.utils.order_builder import (
+    BUY_LEGS,
+    ORDER_LEGS,
+    RouteTable,
+    get_planner,
+    leg_swap_requests,
+    order_data_from_routes,
+    plan_expecting_fills,
+)
+from scripts.utils.price_feed import prices_as_list
+from scripts.utils.rebalance_planner import read_balance_snapshot
+
+
+def list_fleet(factory, load_detf, product_category=None, product_dimension=None):
+    """
+    @param factory is the PolybitDETFFactory.
+    @param load_detf returns the PolybitDETF contract at an address.
+    @return detfs is every DETF from getListOfDETFs matching the product
+    category and dimension given.
+    """
+    detfs = []
+    for detf_address in factory.getListOfDETFs():
+        detf = load_detf(detf_address)
+        if (
+            product_category is not None
+            and detf.getProductCategory() != product_category
+        ):
+            continue
+        if (
+            product_dimension is not None
+            and detf.getProductDimension() != product_dimension
+        ):
+            continue
+        detfs.append(detf)
+    return detfs
+
+
+class FleetPlan:
+    """
+    The orderData of each DETF in a fleet, with the cost of planning it.
+    """
+
+    def __init__(self, order_data, route_table, seconds):
+        # Keyed by DETF address
+        self.order_data = order_data
+        self.route_table = route_table
+        self.seconds = seconds
+
+    def detfs_per_second(self):
+        if self.seconds == 0:
+            return float("inf")
+        return len(self.order_data) / self.seconds
+
+    def report(self):
+        print("DETFs planned", len(self.order_data))
+        print(
+            "Route lookups",
+            self.route_table.lookups,
+            "Pairs routed",
+            len(self.route_table.routes),
+            "getLiquidPaths calls",
+            self.route_table.round_trips,
+        )
+        print("Fleet OrderData time", self.seconds)
+        print("DETFs per second", round(self.detfs_per_second(), 2))
+
+
+def plan_fleet(
+    router,
+    detfs,
+    target_assets,
+    target_assets_weights,
+    provider=None,
+    multicall=None,
+    balances=None,
+    tolerance=None,
+):
+    """
+    @param detfs are the PolybitDETF contracts to rebalance to the same target.
+    @param multicall is a PolybitMulticall to read each snapshot in one call.
+    @param balances is a dict of DETF address to DETFBalances, read from the
+    chain for DETFs not in it.
+    @param tolerance is the DriftTolerance of the product for an incremental
+    rebalance, or None for a full rebalance.
+    @return plan is a FleetPlan.
+    """
+    if provider is None:
+        provider = get_price_provider()
+    if balances is None:
+        balances = {}
+    start = time.time()
+    for detf in detfs:
+        if detf.address not in balances:
+            if multicall is not None:
+                balances[detf.address] = read_balance_snapshot(
+                    detf.address, [], multicall_address=multicall.address
+                )
+            else:
+                balances[detf.address] = read_balance_snapshot(
+                    detf.address, detf.getOwnedAssets()
+                )
+
+    tokens = list(target_assets)
+    for detf in detfs:
+        tokens += balances[detf.address].owned_assets
+    print("Getting fleet prices")
+    prices = provider.get_prices(tokens)
+    target_assets_prices = prices_as_list(target_assets, prices)
+    record_price_snapshot(list(prices.keys()), list(prices.values()))
+
+    plans = {}
+    for detf in detfs:
+        owned_assets = balances[detf.address].owned_assets
+        planner = get_planner(max(len(owned_assets), len(target_assets)))
+        plans[detf.address] = (
+            planner,
+            plan_expecting_fills(
+                planner,
+                balances[detf.address],
+                owned_assets,
+                prices_as_list(owned_assets, prices),
+                target_assets,
+                target_assets_weights,
+                target_assets_prices,
+                tolerance,
+            ),
+        )
+
+    # Every pair of every DETF is routed by one getLiquidPaths call
+    route_table = RouteTable(router)
+    route_table.route(
+        [
+            request
+            for planner, plan in plans.values()
+            for leg in leg_swap_requests(plan, ORDER_LEGS)
+            for request in leg
+        ]
+    )
+
+    order_data = {}
+    for detf in detfs:
+        planner, plan = plans[detf.address]
+        print("Planning", detf.address)
+        order_data[detf.address] = order_data_from_routes(
+            planner,
+            plan,
+            balances[detf.address],
+            route_table.route_legs(plan, ORDER_LEGS),
+            lambda plan: route_table.route_legs(plan, BUY_LEGS),
+        )
+    return FleetPlan(order_data, route_table, time.time() - start)
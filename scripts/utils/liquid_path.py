@@ -0,0 +1,461 @@
+"""
+Off-chain mirror of PolybitLiquidPath. Paths are chosen from one snapshot of
+pair reserves with the constant product math of PolybitSwapLibrary, giving the
+same (factory, path, amount) answers as getLiquidPaths without an eth_call
+that asks each factory for every candidate path.
+"""
+
+from scripts.utils.dex import (
+    AMOUNT_TYPE_EXACT_IN,
+    AMOUNT_TYPE_EXACT_OUT,
+    BASE_TOKENS,
+    SWAP_FACTORIES,
+    WETH_ADDRESS,
+    ZERO_ADDRESS,
+    sort_tokens,
+)
+from scripts.utils.rpc_batch import BatchCaller, decode_result, encode_call
+
+UINT256_MAX = 2**256 - 1
+# PolybitSwapLibrary charges a 0.3% fee on the amount in
+FEE_NUMERATOR = 997
+FEE_DENOMINATOR = 1000
+
+
+class SwapLibraryError(Exception):
+    """
+    Raised where the PolybitSwapLibrary call would revert.
+    """
+
+    pass
+
+
+def mul(a, b):
+    # SafeMath.mul
+    if a * b > UINT256_MAX:
+        raise SwapLibraryError(f"Multiplication overflow {a} * {b}")
+    return a * b
+
+
+def add(a, b):
+    # SafeMath.add
+    if a + b > UINT256_MAX:
+        raise SwapLibraryError(f"Addition overflow {a} + {b}")
+    return a + b
+
+
+def get_amount_out(amount_in, reserve_in, reserve_out):
+    if amount_in <= 0:
+        raise SwapLibraryError("PolybitSwapLibrary: INSUFFICIENT_INPUT_AMOUNT")
+    if reserve_in <= 0 or reserve_out <= 0:
+        raise SwapLibraryError("PolybitSwapLibrary: INSUFFICIENT_LIQUIDITY")
+    amount_in_with_fee = mul(amount_in, FEE_NUMERATOR)
+    numerator = mul(amount_in_with_fee, reserve_out)
+    denominator = add(mul(reserve_in, FEE_DENOMINATOR), amount_in_with_fee)
+    return numerator // denominator
+
+
+def get_amount_in(amount_out, reserve_in, reserve_out):
+    if amount_out <= 0:
+        raise SwapLibraryError("PolybitSwapLibrary: INSUFFICIENT_OUTPUT_AMOUNT")
+    if reserve_in <= 0 or reserve_out <= 0:
+        raise SwapLibraryError("PolybitSwapLibrary: INSUFFICIENT_LIQUIDITY")
+    if amount_out > reserve_out:
+        raise SwapLibraryError(f"Arithmetic underflow {reserve_out} - {amount_out}")
+    numerator = mul(mul(reserve_in, amount_out), FEE_DENOMINATOR)
+    denominator = mul(reserve_out - amount_out, FEE_NUMERATOR)
+    if denominator == 0:
+        raise SwapLibraryError("Division by zero")
+    return add(numerator // denominator, 1)
+
+
+def same_token(token_a, token_b):
+    return token_a.lower() == token_b.lower()
+
+
+def is_better(amount, best_amount, amount_type):
+    """
+    @return better is True if amount beats best_amount, the most out for an
+    exact amount in or the least in for an exact amount out, with None and
+    zero amounts never better.
+    """
+    if amount is None or amount == 0:
+        return False
+    if best_amount is None or best_amount == 0:
+        return True
+    if amount_type == AMOUNT_TYPE_EXACT_IN:
+        return amount > best_amount
+    return amount < best_amount
+
+
+class ReserveSnapshot:
+    """
+    Pairs of each factory and their reserves at one block, answering the
+    PolybitSwapLibrary views. Pairs looked up and found missing are kept too,
+    so they are not looked up again.
+    """
+
+    def __init__(self, block=None):
+        self.block = block
+        # Keyed by (factory, token0, token1) in lowercase, to (pair, reserve0,
+        # reserve1), with a zero address pair where the factory has none
+        self.pairs = {}
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def pair_key(self, factory, token_a, token_b):
+        token0, token1 = sort_tokens(token_a.lower(), token_b.lower())
+        return factory.lower(), token0, token1
+
+    def add_pair(self, factory, token_a, token_b, pair, reserve_a=0, reserve_b=0):
+        key = self.pair_key(factory, token_a, token_b)
+        if key[1] == token_a.lower():
+            self.pairs[key] = (pair, reserve_a, reserve_b)
+        else:
+            self.pairs[key] = (pair, reserve_b, reserve_a)
+
+    def pair_for(self, factory, token_a, token_b):
+        """
+        @return pair as factory.getPair, or the zero address.
+        """
+        if same_token(token_a, token_b):
+            return ZERO_ADDRESS
+        key = self.pair_key(factory, token_a, token_b)
+        if key not in self.pairs:
+            raise KeyError(f"Pair {token_a}/{token_b} of {factory} not in snapshot")
+        return self.pairs[key][0]
+
+    def get_reserves(self, factory, token_a, token_b):
+        """
+        @return reserveA, reserveB as PolybitSwapLibrary.getReserves.
+        """
+        if same_token(token_a, token_b):
+            raise SwapLibraryError("PolybitSwapLibrary: IDENTICAL_ADDRESSES")
+        if same_token(token_a, ZERO_ADDRESS) or same_token(token_b, ZERO_ADDRESS):
+            raise SwapLibraryError("PolybitSwapLibrary: ZERO_ADDRESS")
+        pair = self.pair_for(factory, token_a, token_b)
+        if same_token(pair, ZERO_ADDRESS):
+            # getReserves on the zero address has no code to call
+            raise SwapLibraryError(f"No pair {token_a}/{token_b} on {factory}")
+        key = self.pair_key(factory, token_a, token_b)
+        _, reserve0, reserve1 = self.pairs[key]
+        if key[1] == token_a.lower():
+            return reserve0, reserve1
+        return reserve1, reserve0
+
+    def get_amounts_out(self, factory, amount_in, path):
+        if len(path) < 2:
+            raise SwapLibraryError("PolybitSwapLibrary: INVALID_PATH")
+        amounts = [amount_in]
+        for i in range(0, len(path) - 1):
+            reserve_in, reserve_out = self.get_reserves(factory, path[i], path[i + 1])
+            amounts.append(get_amount_out(amounts[i], reserve_in, reserve_out))
+        return amounts
+
+    def get_amounts_in(self, factory, amount_out, path):
+        if len(path) < 2:
+            raise SwapLibraryError("PolybitSwapLibrary: INVALID_PATH")
+        amounts = [0] * len(path)
+        amounts[-1] = amount_out
+        for i in range(len(path) - 1, 0, -1):
+            reserve_in, reserve_out = self.get_reserves(factory, path[i - 1], path[i])
+            amounts[i - 1] = get_amount_in(amounts[i], reserve_in, reserve_out)
+        return amounts
+
+
+def load_reserves(
+    snapshot,
+    factories,
+    token_pairs,
+    batch_caller=None,
+    block="latest",
+    pair_index=None,
+    reserve_cache=None,
+    reserve_reader=None,
+):
+    """
+    Adds the pairs of every factory for token_pairs to the snapshot, with one
+    batch of getPair calls and one of getReserves calls. Pairs already in the
+    snapshot are not looked up again.
+
+    @param pair_index is a PairIndex, whose factories are read with getReserves
+    on computed pair addresses alone, without getPair calls.
+    @param reserve_cache is a ReserveCache to read reserves through, so pairs
+    read for an earlier snapshot are not read again.
+    @param reserve_reader is a MulticallReserveReader, which resolves and reads
+    the pairs not covered by pair_index in one batch of getReservesBatch calls,
+    in place of the getPair and getReserves batches and the reserve cache.
+    @return snapshot
+    """
+    if batch_caller is None:
+        batch_caller = BatchCaller()
+    if snapshot.block is None:
+        if block == "latest":
+            # Every batch of the snapshot reads the same block
+            block = int(batch_caller.request("eth_blockNumber", []), 16)
+        snapshot.block = block
+    block = snapshot.block
+
+    lookups = []
+    seen = set()
+    for factory in factories:
+        for token_a, token_b in token_pairs:
+            if same_token(token_a, token_b):
+                continue
+            key = snapshot.pair_key(factory, token_a, token_b)
+            if key in snapshot.pairs or key in seen:
+                continue
+            seen.add(key)
+            lookups.append((factory, token_a, token_b))
+
+    if pair_index is not None:
+        indexed = [lookup for lookup in lookups if pair_index.covers(lookup[0])]
+        lookups = [lookup for lookup in lookups if not pair_index.covers(lookup[0])]
+        reserves = pair_index.read_reserves(indexed, batch_caller, block, reserve_cache)
+        for lookup in indexed:
+            key = snapshot.pair_key(*lookup)
+            snapshot.pairs[key] = reserves.get(key, (ZERO_ADDRESS, 0, 0))
+    if len(lookups) == 0:
+        return snapshot
+    if reserve_reader is not None:
+        reserves = reserve_reader.get_reserves(lookups, block)
+        for lookup, (pair, reserve_a, reserve_b, timestamp) in zip(lookups, reserves):
+            snapshot.add_pair(*lookup, pair, reserve_a, reserve_b)
+        return snapshot
+
+    results = batch_caller.call_many(
+        [
+            (
+                factory,
+                encode_call(
+                    "getPair(address,address)",
+                    ["address", "address"],
+                    [token_a, token_b],
+                ),
+            )
+            for factory, token_a, token_b in lookups
+        ],
+        block,
+    )
+    found = []
+    for lookup, result in zip(lookups, results):
+        pair = decode_result(["address"], result)
+        if pair is None or same_token(pair[0], ZERO_ADDRESS):
+            snapshot.add_pair(*lookup, ZERO_ADDRESS)
+        else:
+            found.append((lookup, pair[0]))
+
+    if reserve_cache is not None:
+        results = reserve_cache.get_reserves([pair for lookup, pair in found], block)
+    else:
+        results = [
+            decode_result(["uint112", "uint112", "uint32"], result)
+            for result in batch_caller.call_many(
+                [(pair, encode_call("getReserves()")) for lookup, pair in found],
+                block,
+            )
+        ]
+    for (lookup, pair), reserves in zip(found, results):
+        reserve0, reserve1 = (0, 0) if reserves is None else reserves[0:2]
+        snapshot.pairs[snapshot.pair_key(*lookup)] = (pair, reserve0, reserve1)
+    return snapshot
+
+
+class LiquidPathRouter:
+    """
+    Answers PolybitLiquidPath.getLiquidPaths from a ReserveSnapshot, so it can
+    stand in for the deployed contract wherever the order builders route.
+    """
+
+    def __init__(
+        self,
+        snapshot=None,
+        batch_caller=None,
+        factories=SWAP_FACTORIES,
+        base_tokens=BASE_TOKENS,
+        weth_address=WETH_ADDRESS,
+        pair_index=None,
+        reserve_cache=None,
+        route_search=None,
+        reserve_reader=None,
+    ):
+        self.snapshot = snapshot if snapshot is not None else ReserveSnapshot()
+        self.batch_caller = batch_caller
+        self.pair_index = pair_index
+        self.reserve_cache = reserve_cache
+        self.reserve_reader = reserve_reader
+        # A RouteSearch to find multi hop paths with, in place of the
+        # contract's single base token intermediate
+        self.route_search = route_search
+        self.factories = list(factories)
+        self.base_tokens = list(base_tokens)
+        self.weth_address = weth_address
+
+    def route_tokens(self, token_in, token_out):
+        """
+        @return token is the token getFactoryBestPath pairs with base tokens.
+        """
+        if same_token(token_in, self.weth_address):
+            return token_out
+        return token_in
+
+    def candidate_pairs(self, token_in, token_out):
+        if self.route_search is not None:
+            return self.route_search.candidate_pairs(token_in, token_out)
+        token = self.route_tokens(token_in, token_out)
+        pairs = [(token_in, token_out)]
+        for base_token in self.base_tokens:
+            pairs += [(base_token, token), (token_in, base_token)]
+            pairs.append((base_token, token_out))
+        return pairs
+
+    def load(self, swap_orders):
+        pairs = []
+        for token_in, token_out, amount, amount_type in swap_orders:
+            pairs += self.candidate_pairs(token_in, token_out)
+        load_reserves(
+            self.snapshot,
+            self.factories,
+            pairs,
+            self.batch_caller,
+            pair_index=self.pair_index,
+            reserve_cache=self.reserve_cache,
+            reserve_reader=self.reserve_reader,
+        )
+
+    def refresh(self):
+        """
+        Starts a new snapshot at the next load, e.g. for the next rebalance.
+        Reserves still come from the reserve cache where one is given.
+        """
+        self.snapshot = ReserveSnapshot()
+
+    def quote(self, factory, amount, path, amount_type):
+        """
+        @return amount is the path's amount out for an exact amount in, or
+        amount in for an exact amount out, or None where the router reverts.
+        """
+        try:
+            if amount_type == AMOUNT_TYPE_EXACT_IN:
+                return self.snapshot.get_amounts_out(factory, amount, path)[-1]
+            return self.snapshot.get_amounts_in(factory, amount, path)[0]
+        except SwapLibraryError:
+            return None
+
+    def get_factory_best_path(
+        self, factory, token_in, token_out, token_amount, amount_type, multihop=True
+    ):
+        """
+        @return path, amount as PolybitLiquidPath.getFactoryBestPath, or of
+        the route search where one is given.
+        """
+        if self.route_search is not None and multihop:
+            return self.route_search.best_path(
+                self.snapshot,
+                self.quote,
+                factory,
+                token_in,
+                token_out,
+                token_amount,
+                amount_type,
+            )
+        dual_path = []
+        dual_path_amount = 0
+        if not same_token(
+            self.snapshot.pair_for(factory, token_in, token_out), ZERO_ADDRESS
+        ):
+            dual_path = [token_in, token_out]
+            if amount_type in [AMOUNT_TYPE_EXACT_IN, AMOUNT_TYPE_EXACT_OUT]:
+                amount = self.quote(factory, token_amount, dual_path, amount_type)
+                if amount is not None:
+                    dual_path_amount = amount
+
+        if not multihop:
+            return dual_path, dual_path_amount
+
+        token = self.route_tokens(token_in, token_out)
+        tri_path_amount = 0
+        best_tri_path = []
+        # The contract loop starts at index 1, so the first base token is
+        # never an intermediate
+        for base_token in self.base_tokens[1:]:
+            if same_token(
+                self.snapshot.pair_for(factory, base_token, token), ZERO_ADDRESS
+            ):
+                continue
+            tri_path = [token_in, base_token, token_out]
+            if amount_type not in [AMOUNT_TYPE_EXACT_IN, AMOUNT_TYPE_EXACT_OUT]:
+                continue
+            amount = self.quote(factory, token_amount, tri_path, amount_type)
+            if amount is None:
+                continue
+            if amount_type == AMOUNT_TYPE_EXACT_IN and amount > tri_path_amount:
+                tri_path_amount = amount
+                best_tri_path = tri_path
+            # As the contract, which starts the cheapest amount in at zero,
+            # no exact out tri path is ever chosen
+            if (
+                amount_type == AMOUNT_TYPE_EXACT_OUT
+                and amount > 0
+                and amount < tri_path_amount
+            ):
+                tri_path_amount = amount
+                best_tri_path = tri_path
+
+        if amount_type == AMOUNT_TYPE_EXACT_IN:
+            if dual_path_amount > tri_path_amount:
+                return dual_path, dual_path_amount
+            return best_tri_path, tri_path_amount
+        if amount_type == AMOUNT_TYPE_EXACT_OUT:
+            if tri_path_amount > 0 and dual_path_amount < tri_path_amount:
+                return best_tri_path, tri_path_amount
+            return dual_path, dual_path_amount
+        return [], 0
+
+    def get_liquid_path(self, token_in, token_out, token_amount, amount_type):
+        """
+        @return factory, path, amount as PolybitLiquidPath.getLiquidPath. The
+        first factory is kept unless another quotes strictly better, which
+        with a route search includes the first quoting nothing.
+        """
+        best_factory = self.factories[0]
+        best_path, best_amount = self.get_factory_best_path(
+            best_factory, token_in, token_out, token_amount, amount_type
+        )
+        for factory in self.factories[1:]:
+            path, amount = self.get_factory_best_path(
+                factory, token_in, token_out, token_amount, amount_type
+            )
+            if self.route_search is not None:
+                better = is_better(amount, best_amount, amount_type)
+            else:
+                better = (
+                    amount_type == AMOUNT_TYPE_EXACT_IN and amount > best_amount
+                ) or (
+                    amount_type == AMOUNT_TYPE_EXACT_OUT
+                    and amount > 0
+                    and amount < best_amount
+                )
+            if better:
+                best_factory, best_path, best_amount = factory, path, amount
+        return best_factory, best_path, best_amount
+
+    def getLiquidPaths(self, swap_orders):
+        """
+        @param swap_orders is the SwapOrders[] argument of the contract call.
+        @return factories, paths, amounts
+        """
+        orders = [list(order) for order in swap_orders[0][0]]
+        self.load(orders)
+        factories = []
+        paths = []
+        amounts = []
+        for token_in, token_out, token_amount, amount_type in orders:
+            factory, path, amount = self.get_liquid_path(
+                token_in, token_out, token_amount, amount_type
+            )
+            factories.append(factory)
+            paths.append(path)
+            amounts.append(amount)
+        return factories, paths, amounts
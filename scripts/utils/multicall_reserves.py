@@ -0,0 +1,116 @@
+"""
+Client for PolybitMulticall.getReservesBatch, which resolves and reads many
+pairs in one eth_call. Pairs are split over calls small enough to stay under
+the gas cap nodes put on eth_call, and the calls of one read are sent to the
+node as one JSON-RPC batch.
+"""
+
+from scripts.utils.rpc_batch import (
+    BatchCaller,
+    RpcBatchError,
+    decode_result,
+    encode_call,
+)
+
+GET_RESERVES_BATCH = "getReservesBatch(address[],address[],address[])"
+PAIR_RESERVES_TYPES = ["(address,uint256,uint256,uint32)[]"]
+# Reading a pair costs up to about 15k gas with cold factory and pair slots,
+# so this stays under the 25M to 50M gas nodes commonly allow an eth_call
+DEFAULT_MAX_PAIRS_PER_CALL = 1000
+
+
+class MulticallReserveReader:
+    """
+    Reads (pair, reserveA, reserveB, blockTimestampLast) of (factory, tokenA,
+    tokenB) lookups through a deployed PolybitMulticall.
+    """
+
+    def __init__(
+        self,
+        multicall_address,
+        batch_caller=None,
+        max_pairs_per_call=DEFAULT_MAX_PAIRS_PER_CALL,
+    ):
+        self.multicall_address = multicall_address
+        self.batch_caller = batch_caller if batch_caller is not None else BatchCaller()
+        self.max_pairs_per_call = max_pairs_per_call
+        self.calls = 0
+        self.splits = 0
+        # Set once eth_getCode has found the contract deployed
+        self.deployed = False
+
+    def encode(self, lookups):
+        return encode_call(
+            GET_RESERVES_BATCH,
+            ["address[]", "address[]", "address[]"],
+            [
+                [lookup[0] for lookup in lookups],
+                [lookup[1] for lookup in lookups],
+                [lookup[2] for lookup in lookups],
+            ],
+        )
+
+    def check_deployed(self, block):
+        """
+        Raises RpcBatchError if the multicall address has no code at block, as
+        its calls then return no data however few pairs they read.
+        """
+        if self.deployed:
+            return
+        if isinstance(block, int):
+            block = hex(block)
+        code = self.batch_caller.request("eth_getCode", [self.multicall_address, block])
+        if code in (None, "0x", ""):
+            raise RpcBatchError(
+                f"No PolybitMulticall deployed at {self.multicall_address}"
+            )
+        self.deployed = True
+
+    def get_reserves(self, lookups, block="latest"):
+        """
+        @param lookups is a list of (factory, token_a, token_b).
+        @param block is a block number or "latest", which is resolved once so
+        that every call of the read sees the same block.
+        @return reserves is a list of (pair, reserve_a, reserve_b,
+        block_timestamp_last) in the order of lookups, with a zero address pair
+        and zero reserves where the factory has no pair.
+        """
+        if len(lookups) == 0:
+            return []
+        if block == "latest":
+            block = int(self.batch_caller.request("eth_blockNumber", []), 16)
+
+        reserves = [None] * len(lookups)
+        size = self.max_pairs_per_call
+        pending = [(start, size) for start in range(0, len(lookups), size)]
+        while len(pending) > 0:
+            results = self.batch_caller.call_many(
+                [
+                    (self.multicall_address, self.encode(lookups[start : start + n]))
+                    for start, n in pending
+                ],
+                block,
+            )
+            self.calls += len(pending)
+            retry = []
+            for (start, n), result in zip(pending, results):
+                n = min(n, len(lookups) - start)
+                entries = decode_result(PAIR_RESERVES_TYPES, result)
+                if entries is None:
+                    # getReservesBatch catches every pair read, so a failed call
+                    # to a deployed contract ran out of gas and is split in two
+                    self.check_deployed(block)
+                    if n == 1:
+                        raise RpcBatchError(
+                            f"getReservesBatch failed for {lookups[start]}"
+                        )
+                    self.splits += 1
+                    retry += [(start, n // 2), (start + n // 2, n - n // 2)]
+                    continue
+                for i, (pair, reserve_a, reserve_b, timestamp) in enumerate(entries[0]):
+                    reserves[start + i] = (pair, reserve_a, reserve_b, timestamp)
+            pending = retry
+        return reserves
+
+    def stats(self):
+        return {"calls": self.calls, "splits": self.splits}
@@ -0,0 +1,711 @@
+"""
+Builds the orderData consumed by PolybitDETF.deposit, PolybitDETF.rebalanceDETF
+and PolybitDETFFactory.createDETF. Lists and amounts are planned locally by
+rebalance_planner from one balance snapshot, and routed with PolybitLiquidPath.
+"""
+
+import time
+from scripts.utils.asset_prices import (
+    get_owned_assets,
+    get_target_assets,
+    price_cache,
+    record_price_snapshot,
+)
+from scripts.utils.dex import AMOUNT_TYPE_EXACT_IN, WETH_ADDRESS
+from scripts.utils.order_data import (
+    EncodedCall,
+    SwapOrder,
+    SwapOrders,
+    encode_rebalance_detf,
+    report_calldata,
+)
+from scripts.utils import rebalance_planner
+from scripts.utils.rebalance_planner import (
+    is_zero_address,
+    plan_first_deposit,
+    read_balance_snapshot,
+    same_address,
+)
+from scripts.utils.route_cache import CachedRouter
+from scripts.utils.rpc_batch import RpcBatchError
+from scripts.utils.simulation import check_simulation, simulate_call
+
+WETH = WETH_ADDRESS
+# Baskets at least this large are planned by the NumPy weight engine
+VECTORISED_BASKET_SIZE = 50
+
+
+def get_planner(basket_size):
+    if basket_size >= VECTORISED_BASKET_SIZE:
+        from scripts.utils import weight_engine
+
+        return weight_engine
+    return rebalance_planner
+
+
+class OrderLeg:
+    """
+    Names the plan keys of one leg of SwapOrders.
+    """
+
+    def __init__(self, label, tokens, amounts_in, amounts_out, sell):
+        self.label = label
+        self.tokens = tokens
+        self.amounts_in = amounts_in
+        self.amounts_out = amounts_out
+        # True to swap tokens for WETH, False to buy tokens with WETH
+        self.sell = sell
+
+
+SELL_LEGS = [
+    OrderLeg("Sell", "sellList", "sellListAmountsIn", "sellListAmountsOut", True),
+    OrderLeg(
+        "Adjust To Sell",
+        "adjustToSellList",
+        "adjustToSellListAmountsIn",
+        "adjustToSellListAmountsOut",
+        True,
+    ),
+]
+BUY_LEGS = [
+    OrderLeg(
+        "Adjust To Buy",
+        "adjustToBuyList",
+        "adjustToBuyListAmountsIn",
+        "adjustToBuyListAmountsOut",
+        False,
+    ),
+    OrderLeg("Buy", "buyList", "buyListAmountsIn", "buyListAmountsOut", False),
+]
+ORDER_LEGS = SELL_LEGS + BUY_LEGS
+
+
+def swap_request(leg, token, amount_in):
+    """
+    @return request is a PolybitLiquidPath SwapOrder quoting an exact amount in.
+    """
+    if leg.sell:
+        return [token, WETH, amount_in, AMOUNT_TYPE_EXACT_IN]
+    return [WETH, token, amount_in, AMOUNT_TYPE_EXACT_IN]
+
+
+def leg_swap_requests(plan, legs):
+    """
+    @return requests is, for each leg, the swap request of each index, or None
+    for zero address placeholders.
+    """
+    leg_requests = []
+    for leg in legs:
+        requests = []
+        for i in range(0, len(plan[leg.tokens])):
+            token = plan[leg.tokens][i]
+            if is_zero_address(token):
+                requests.append(None)
+            else:
+                requests.append(swap_request(leg, token, plan[leg.amounts_in][i]))
+        leg_requests.append(requests)
+    return leg_requests
+
+
+def orders_from_paths(plan, legs, leg_requests, find_path):
+    """
+    @param find_path returns the (factory, path) found for a swap request.
+    @return orders is a dict of leg label to (swap_order, routed), where routed
+    is the list of leg indices that found a path.
+    """
+    orders = {}
+    for leg, requests in zip(legs, leg_requests):
+        swap_order = SwapOrder.empty()
+        routed = []
+        for i in range(0, len(requests)):
+            if requests[i] is None:
+                continue
+            factory, path = find_path(requests[i])
+            if len(path) > 0:
+                amount_in = plan[leg.amounts_in][i]
+                amount_out = plan[leg.amounts_out][i]
+                print(leg.label, factory, path, amount_in, amount_out)
+                swap_order.append(factory, path, amount_in, amount_out)
+                routed.append(i)
+            else:
+                print("PolybitRouter: INSUFFICIENT_TOKEN_LIQUIDITY")
+        orders[leg.label] = (swap_order, routed)
+    return orders
+
+
+def route_legs(router, plan, legs):
+    """
+    Routes every swap of the given legs with one getLiquidPaths call, leaving
+    out zero address placeholders and asking once for repeated swaps.
+
+    @return orders is a dict of leg label to (swap_order, routed).
+    """
+    leg_requests = leg_swap_requests(plan, legs)
+    requests = []
+    request_index = {}
+    for request in [r for leg in leg_requests for r in leg if r is not None]:
+        key = (request[0].lower(), request[1].lower(), request[2])
+        if key not in request_index:
+            request_index[key] = len(requests)
+            requests.append(request)
+
+    if len(requests) > 0:
+        factories, paths, amounts = router.getLiquidPaths([[requests]])
+
+    def find_path(request):
+        i = request_index[(request[0].lower(), request[1].lower(), request[2])]
+        return factories[i], paths[i]
+
+    return orders_from_paths(plan, legs, leg_requests, find_path)
+
+
+class RouteTable:
+    """
+    Paths found by PolybitLiquidPath for each (tokenIn, tokenOut) pair, shared
+    by every plan routed through the table. Each new pair is looked up once,
+    with the largest amount asked for, so the path found can carry every swap.
+    """
+
+    def __init__(self, router):
+        self.router = router
+        self.routes = {}
+        self.lookups = 0
+        self.round_trips = 0
+
+    def pair_key(self, request):
+        return request[0].lower(), request[1].lower()
+
+    def route(self, requests):
+        """
+        Looks up the pairs of requests not yet in the table, in one call.
+        """
+        pending = {}
+        for request in requests:
+            if request is None:
+                continue
+            key = self.pair_key(request)
+            if key in self.routes:
+                continue
+            if key not in pending or request[2] > pending[key][2]:
+                pending[key] = request
+        if len(pending) == 0:
+            return
+        factories, paths, amounts = self.router.getLiquidPaths(
+            [[list(pending.values())]]
+        )
+        self.round_trips += 1
+        for key, factory, path in zip(pending.keys(), factories, paths):
+            self.routes[key] = (factory, path)
+
+    def find_path(self, request):
+        self.lookups += 1
+        return self.routes[self.pair_key(request)]
+
+    def route_legs(self, plan, legs):
+        """
+        As route_legs, but reusing paths already in the table.
+        """
+        leg_requests = leg_swap_requests(plan, legs)
+        self.route([request for leg in leg_requests for request in leg])
+        return orders_from_paths(plan, legs, leg_requests, self.find_path)
+
+
+def print_plan(plan):
+    for key in [
+        "sellList",
+        "sellListPrices",
+        "adjustList",
+        "adjustListWeights",
+        "adjustListPrices",
+        "adjustToSellList",
+        "adjustToSellWeights",
+        "adjustToSellPrices",
+        "adjustToBuyList",
+        "adjustToBuyWeights",
+        "adjustToBuyPrices",
+        "buyList",
+        "buyListWeights",
+        "buyListPrices",
+    ]:
+        if len(plan[key]) > 0:
+            print(key, plan[key])
+
+
+def order_data_from_plan(
+    plan,
+    sell_order=None,
+    adjust_to_sell_order=None,
+    adjust_to_buy_order=None,
+    buy_order=None,
+):
+    """
+    @return orderData is the SwapOrders of the plan, with empty SwapOrders for
+    legs not given.
+    """
+
+    def or_empty(swap_order):
+        return swap_order if swap_order is not None else SwapOrder.empty()
+
+    return SwapOrders(
+        plan["sellList"],
+        plan["sellListPrices"],
+        or_empty(sell_order),
+        plan["adjustList"],
+        plan["adjustListPrices"],
+        plan["adjustToSellList"],
+        plan["adjustToSellPrices"],
+        or_empty(adjust_to_sell_order),
+        plan["adjustToBuyList"],
+        plan["adjustToBuyWeights"],
+        plan["adjustToBuyPrices"],
+        or_empty(adjust_to_buy_order),
+        plan["buyList"],
+        plan["buyListWeights"],
+        plan["buyListPrices"],
+        or_empty(buy_order),
+    )
+
+
+def without_zero_addresses(tokens, *values):
+    """
+    @return tokens and each parallel list of values without the entries of
+    zero address placeholders.
+    """
+    kept = [i for i in range(0, len(tokens)) if not is_zero_address(tokens[i])]
+    return [[column[i] for i in kept] for column in (tokens,) + values]
+
+
+def routed_entries(tokens, swap_order, path_token, *values):
+    """
+    @param swap_order is the leg's SwapOrder, holding a path for each routed
+    entry of tokens in order.
+    @param path_token is the index of the leg's token in each path, 0 for
+    sells and -1 for buys.
+    @return tokens and each parallel list of values with only the entries
+    that have a path, so that entry i is swapped with path i.
+    """
+    paths = swap_order.path if swap_order is not None else []
+    kept = []
+    for i in range(0, len(tokens)):
+        if len(kept) < len(paths) and same_address(
+            tokens[i], paths[len(kept)][path_token]
+        ):
+            kept.append(i)
+    return [[column[i] for i in kept] for column in (tokens,) + values]
+
+
+def compact_order_data(order_data):
+    """
+    Strips from orderData what PolybitDETF.rebalanceDETF and deposit never
+    read: zero address placeholders, swaps that found no path, the prices of
+    the sell and adjust to sell lists, and the SwapOrder of empty legs. Not for
+    withdraw, which records sellListPrices and reads sellOrders[0].
+
+    @return orderData is a compacted copy of order_data.
+    """
+    # The sell, adjust to buy and buy loops read their SwapOrder by list
+    # index, so only routed entries are kept, in their routed order. The
+    # adjust to sell loop runs over its SwapOrder alone
+    (sell_list,) = routed_entries(order_data.sellList, order_data.sellOrders, 0)
+    adjust_list, adjust_list_prices = without_zero_addresses(
+        order_data.adjustList, order_data.adjustListPrices
+    )
+    (adjust_to_sell_list,) = without_zero_addresses(order_data.adjustToSellList)
+    (
+        adjust_to_buy_list,
+        adjust_to_buy_weights,
+        adjust_to_buy_prices,
+    ) = routed_entries(
+        order_data.adjustToBuyList,
+        order_data.adjustToBuyOrders,
+        -1,
+        order_data.adjustToBuyWeights,
+        order_data.adjustToBuyPrices,
+    )
+    buy_list, buy_list_weights, buy_list_prices = routed_entries(
+        order_data.buyList,
+        order_data.buyOrders,
+        -1,
+        order_data.buyListWeights,
+        order_data.buyListPrices,
+    )
+
+    def leg_order(tokens, swap_order):
+        # A leg's SwapOrder is only read when its list is not empty
+        return swap_order if len(tokens) > 0 else None
+
+    return SwapOrders(
+        sell_list,
+        [],
+        leg_order(sell_list, order_data.sellOrders),
+        adjust_list,
+        adjust_list_prices,
+        adjust_to_sell_list,
+        [],
+        leg_order(adjust_to_sell_list, order_data.adjustToSellOrders),
+        adjust_to_buy_list,
+        adjust_to_buy_weights,
+        adjust_to_buy_prices,
+        leg_order(adjust_to_buy_list, order_data.adjustToBuyOrders),
+        buy_list,
+        buy_list_weights,
+        buy_list_prices,
+        leg_order(buy_list, order_data.buyOrders),
+    )
+
+
+def rebalance_call(detf_address, order_data):
+    """
+    Compacts and encodes a rebalanceDETF call, reporting the calldata saved.
+
+    @return call is the EncodedCall to estimate, dry run and send.
+    """
+    compacted = compact_order_data(order_data)
+    data = encode_rebalance_detf(compacted)
+    report_calldata("OrderData", encode_rebalance_detf(order_data), order_data)
+    report_calldata("Compacted OrderData", data, compacted)
+    return EncodedCall(detf_address, data)
+
+
+def first_deposit_order_data(
+    detf,
+    router,
+    owned_assets,
+    target_assets,
+    target_assets_weights,
+    target_assets_prices,
+    weth_input_amount,
+):
+    record_price_snapshot(target_assets, target_assets_prices)
+    start = time.time()
+    plan = plan_first_deposit(
+        owned_assets,
+        target_assets,
+        target_assets_weights,
+        target_assets_prices,
+        detf.getWethBalance() + int(weth_input_amount),
+    )
+    print_plan(plan)
+
+    orders = route_legs(router, plan, BUY_LEGS)
+
+    orderData = order_data_from_plan(plan, buy_order=orders["Buy"][0])
+    print("Order Data", orderData)
+    end = time.time()
+    print("First rebalance OrderData time", end - start)
+    return orderData
+
+
+def first_deposit_combo_order_data(
+    router,
+    owned_assets,
+    target_assets,
+    target_assets_weights,
+    target_assets_prices,
+    weth_input_amount,
+):
+    record_price_snapshot(target_assets, target_assets_prices)
+    start = time.time()
+    plan = plan_first_deposit(
+        owned_assets,
+        target_assets,
+        target_assets_weights,
+        target_assets_prices,
+        int(weth_input_amount),
+    )
+    print_plan(plan)
+
+    orders = route_legs(router, plan, BUY_LEGS)
+
+    orderData = order_data_from_plan(plan, buy_order=orders["Buy"][0])
+    print("Order Data", orderData)
+    end = time.time()
+    print("First rebalance OrderData time", end - start)
+    return orderData
+
+
+def plan_expecting_fills(
+    planner,
+    balances,
+    owned_assets,
+    owned_assets_prices,
+    target_assets,
+    target_assets_weights,
+    target_assets_prices,
+    tolerance=None,
+):
+    """
+    Plans the sells, then sizes the buys as if every sell fills, so that all
+    legs can share one routing call.
+    """
+    plan = planner.plan_sells(
+        balances,
+        owned_assets,
+        owned_assets_prices,
+        target_assets,
+        target_assets_weights,
+        target_assets_prices,
+        tolerance,
+    )
+    expected_weth_balance = (
+        balances.weth_balance
+        + sum(plan["sellListAmountsOut"])
+        + sum(plan["adjustToSellListAmountsOut"])
+    )
+    planner.plan_buys(plan, balances, expected_weth_balance)
+    return plan
+
+
+def order_data_from_routes(planner, plan, balances, orders, route_buys):
+    """
+    Only sells that found a path raise WETH for the buys, so the buys are
+    resized and passed to route_buys again if any sell was left out.
+
+    @return orderData is the SwapOrders struct as nested lists.
+    """
+    wethBalance = balances.weth_balance
+    for leg in SELL_LEGS:
+        for i in orders[leg.label][1]:
+            wethBalance += plan[leg.amounts_out][i]
+    if wethBalance != plan["wethBalance"]:
+        planner.plan_buys(plan, balances, wethBalance)
+        orders.update(route_buys(plan))
+    print_plan(plan)
+    print("totalTargetPercentage", plan["totalTargetPercentage"])
+
+    return order_data_from_plan(
+        plan,
+        orders["Sell"][0],
+        orders["Adjust To Sell"][0],
+        orders["Adjust To Buy"][0],
+        orders["Buy"][0],
+    )
+
+
+def incremental_order_data(router, plan_args, tolerance):
+    """
+    Plans an incremental rebalance and, for comparison, the full rebalance it
+    replaces. Both are routed through one RouteTable, so the incremental plan
+    costs no further getLiquidPaths calls.
+
+    @param plan_args are the arguments of plan_expecting_fills.
+    @return orderData, fullOrderData
+    """
+    planner, balances = plan_args[0], plan_args[1]
+    route_table = RouteTable(router)
+    order_data = []
+    for plan_tolerance in [None, tolerance]:
+        plan = plan_expecting_fills(*plan_args, plan_tolerance)
+        order_data.append(
+            order_data_from_routes(
+                planner,
+                plan,
+                balances,
+                route_table.route_legs(plan, ORDER_LEGS),
+                lambda plan: route_table.route_legs(plan, BUY_LEGS),
+            )
+        )
+    return order_data[1], order_data[0]
+
+
+def count_adjust_swaps(order_data):
+    return len(order_data.adjustToSellList) + len(order_data.adjustToBuyList)
+
+
+def report_gas_saved(
+    detf, account, full_order_data, order_data, call=None, batch_caller=None
+):
+    """
+    Prints the adjust swaps an incremental rebalance leaves out, and the gas
+    it saves against the full rebalance, as estimated by the node.
+
+    @param call is the EncodedCall of order_data, when already encoded.
+    @return gas_saved is None where the full rebalance would revert, as it may
+    on the dust adjust swaps an incremental rebalance leaves out.
+    """
+    print(
+        "Adjust swaps skipped",
+        count_adjust_swaps(full_order_data) - count_adjust_swaps(order_data),
+    )
+    if call is None:
+        call = rebalance_call(detf.address, order_data)
+    full_call = EncodedCall(
+        detf.address, encode_rebalance_detf(compact_order_data(full_order_data))
+    )
+    try:
+        full_gas = full_call.estimate_gas(account.address, batch_caller)
+    except RpcBatchError as e:
+        print("Full rebalance would revert", e)
+        return None
+    gas = call.estimate_gas(account.address, batch_caller)
+    print("Full rebalance gas", full_gas, "Incremental rebalance gas", gas)
+    print("Gas saved", full_gas - gas)
+    return full_gas - gas
+
+
+def rebalance(
+    account,
+    detf,
+    router,
+    owned_assets,
+    owned_assets_prices,
+    target_assets,
+    target_assets_weights,
+    target_assets_prices,
+    balances=None,
+    multicall=None,
+    tolerance=None,
+    failure_predicate=None,
+):
+    """
+    @param balances is a DETFBalances snapshot, read from the chain when None.
+    @param multicall is a PolybitMulticall to read the snapshot in one call.
+    @param tolerance is a DriftTolerance for an incremental rebalance, or None
+    for a full rebalance.
+    @param failure_predicate is checked against a dry run of the call before
+    it is sent, as simulation.check_simulation, or None to send it untested.
+    """
+    record_price_snapshot(
+        list(owned_assets) + list(target_assets),
+        list(owned_assets_prices) + list(target_assets_prices),
+    )
+    start = time.time()
+    if balances is None:
+        # Target assets are read too, so the simulated balances have decimals
+        balances = read_balance_snapshot(
+            detf.address,
+            owned_assets,
+            target_assets,
+            multicall_address=multicall_address(multicall),
+        )
+    planner = get_planner(max(len(owned_assets), len(target_assets)))
+    plan_args = (
+        planner,
+        balances,
+        owned_assets,
+        owned_assets_prices,
+        target_assets,
+        target_assets_weights,
+        target_assets_prices,
+    )
+    if tolerance is None:
+        plan = plan_expecting_fills(*plan_args)
+        orders = route_legs(router, plan, ORDER_LEGS)
+        orderData = order_data_from_routes(
+            planner,
+            plan,
+            balances,
+            orders,
+            lambda plan: route_legs(router, plan, BUY_LEGS),
+        )
+    else:
+        orderData, full_order_data = incremental_order_data(
+            router, plan_args, tolerance
+        )
+    print("Order Data", orderData)
+    end = time.time()
+    print("Full rebalance OrderData time", end - start)
+    # Encoded once for the gas estimates and the transaction
+    call = rebalance_call(detf.address, orderData)
+    if tolerance is not None:
+        report_gas_saved(detf, account, full_order_data, orderData, call)
+    if failure_predicate is not None:
+        simulation = simulate_call(call, account.address, balances)
+        simulation.report()
+        check_simulation(simulation, failure_predicate)
+
+    tx = call.transact(account)
+    tx.wait(1)
+    for i in range(0, len(tx.events)):
+        print(tx.events[i])
+
+
+def multicall_address(multicall):
+    return multicall.address if multicall is not None else None
+
+
+def report_balances(detf, assets, weights, owned_assets, owned_assets_prices, balances):
+    """
+    Prints the total balance of a DETF and the actual weight of each target
+    asset it holds.
+    """
+    total_balance = balances.get_total_balance_in_weth(owned_assets_prices)
+    print("Total Balance", total_balance)
+    print("Total Balance %", round(total_balance / detf.getTotalDeposited(), 4))
+
+    for i in range(0, len(owned_assets)):
+        token_balance, token_balance_in_weth = balances.get_token_balance(
+            owned_assets[i], owned_assets_prices[i]
+        )
+        for x in range(0, len(assets)):
+            if owned_assets[i] == assets[x]:
+                print(
+                    "Address",
+                    owned_assets[i],
+                    "Target",
+                    round(
+                        (weights[x] / 10**8),
+                        4,
+                    ),
+                    "Actual",
+                    round(token_balance_in_weth / total_balance, 4),
+                )
+
+
+def run_rebalance(
+    account,
+    detf,
+    router,
+    assets,
+    weights,
+    multicall=None,
+    tolerance=None,
+    failure_predicate=None,
+    route_cache=None,
+):
+    """
+    @param route_cache is a RouteCache kept across runs, so routes found by
+    earlier deposits and rebalances are re-quoted rather than looked up again.
+    """
+    price_cache.reset()
+    if route_cache is not None:
+        router = CachedRouter(router, route_cache)
+    owned_assets, owned_assets_prices = get_owned_assets(detf)
+    (
+        target_assets,
+        target_assets_weights,
+        target_assets_prices,
+    ) = get_target_assets(assets, weights)
+    print("Owned Assets Before:", owned_assets)
+    print("Target Assets Before:", target_assets)
+
+    rebalance(
+        account,
+        detf,
+        router,
+        owned_assets,
+        owned_assets_prices,
+        target_assets,
+        target_assets_weights,
+        target_assets_prices,
+        multicall=multicall,
+        tolerance=tolerance,
+        failure_predicate=failure_predicate,
+    )
+
+    owned_assets, owned_assets_prices = get_owned_assets(detf)
+    (
+        target_assets,
+        target_assets_weights,
+        target_assets_prices,
+    ) = get_target_assets(assets, weights)
+    print("Owned Assets After:", owned_assets)
+    print("Target Assets After:", target_assets)
+
+    balances = read_balance_snapshot(
+        detf.address, owned_assets, multicall_address=multicall_address(multicall)
+    )
+    report_balances(detf, assets, weights, owned_assets, owned_assets_prices, balances)
+    print("Price cache", price_cache.stats())
+    if route_cache is not None:
+        print("Route cache", route_cache.stats())
@@ -0,0 +1,294 @@
+"""
+Typed model of the PolybitDETF.SwapOrders struct, encoded straight to calldata.
+The calldata of a rebalanceDETF, deposit or createDETF call is encoded once and
+reused for eth_estimateGas, eth_call dry runs and the transaction itself.
+"""
+
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from scripts.utils.rpc_batch import BatchCaller
+
+SWAP_ORDER_TYPE = "(address[],address[][],uint256[],uint256[])"
+SWAP_ORDERS_FIELD_TYPES = [
+    ("sellList", "address[]"),
+    ("sellListPrices", "uint256[]"),
+    ("sellOrders", f"{SWAP_ORDER_TYPE}[]"),
+    ("adjustList", "address[]"),
+    ("adjustListPrices", "uint256[]"),
+    ("adjustToSellList", "address[]"),
+    ("adjustToSellPrices", "uint256[]"),
+    ("adjustToSellOrders", f"{SWAP_ORDER_TYPE}[]"),
+    ("adjustToBuyList", "address[]"),
+    ("adjustToBuyWeights", "uint256[]"),
+    ("adjustToBuyPrices", "uint256[]"),
+    ("adjustToBuyOrders", f"{SWAP_ORDER_TYPE}[]"),
+    ("buyList", "address[]"),
+    ("buyListWeights", "uint256[]"),
+    ("buyListPrices", "uint256[]"),
+    ("buyOrders", f"{SWAP_ORDER_TYPE}[]"),
+]
+SWAP_ORDERS_TYPE = "({})".format(
+    ",".join(field_type for name, field_type in SWAP_ORDERS_FIELD_TYPES)
+)
+# SwapOrders fields read by each leg of PolybitDETF.rebalance
+ORDER_DATA_LEGS = [
+    ("Sell", ["sellList", "sellListPrices", "sellOrders"]),
+    ("Adjust", ["adjustList", "adjustListPrices"]),
+    (
+        "Adjust To Sell",
+        ["adjustToSellList", "adjustToSellPrices", "adjustToSellOrders"],
+    ),
+    (
+        "Adjust To Buy",
+        [
+            "adjustToBuyList",
+            "adjustToBuyWeights",
+            "adjustToBuyPrices",
+            "adjustToBuyOrders",
+        ],
+    ),
+    ("Buy", ["buyList", "buyListWeights", "buyListPrices", "buyOrders"]),
+]
+# EIP-2028 calldata costs, as on BSC
+CALLDATA_ZERO_BYTE_GAS = 4
+CALLDATA_NONZERO_BYTE_GAS = 16
+REBALANCE_DETF_SIGNATURE = f"rebalanceDETF({SWAP_ORDERS_TYPE}[])"
+DEPOSIT_SIGNATURE = f"deposit(uint256,{SWAP_ORDERS_TYPE}[])"
+CREATE_DETF_SIGNATURE = f"createDETF((address,uint256,uint256,{SWAP_ORDERS_TYPE}[]))"
+
+
+@dataclass
+class SwapOrder:
+    """
+    PolybitDETF.SwapOrder, the routed swaps of one leg.
+    """
+
+    __slots__ = ("factory", "path", "amountsIn", "amountsOut")
+    factory: list
+    path: list
+    amountsIn: list
+    amountsOut: list
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [])
+
+    def __len__(self):
+        return len(self.factory)
+
+    def append(self, factory, path, amount_in, amount_out):
+        self.factory.append(factory)
+        self.path.append(path)
+        self.amountsIn.append(amount_in)
+        self.amountsOut.append(amount_out)
+
+    def as_tuple(self):
+        return (self.factory, self.path, self.amountsIn, self.amountsOut)
+
+
+@dataclass
+class SwapOrders:
+    """
+    PolybitDETF.SwapOrders, the orderData of a rebalance. Each leg has one
+    SwapOrder, as built by the order builder, or None to send no SwapOrder.
+    """
+
+    __slots__ = (
+        "sellList",
+        "sellListPrices",
+        "sellOrders",
+        "adjustList",
+        "adjustListPrices",
+        "adjustToSellList",
+        "adjustToSellPrices",
+        "adjustToSellOrders",
+        "adjustToBuyList",
+        "adjustToBuyWeights",
+        "adjustToBuyPrices",
+        "adjustToBuyOrders",
+        "buyList",
+        "buyListWeights",
+        "buyListPrices",
+        "buyOrders",
+    )
+    sellList: list
+    sellListPrices: list
+    sellOrders: SwapOrder
+    adjustList: list
+    adjustListPrices: list
+    adjustToSellList: list
+    adjustToSellPrices: list
+    adjustToSellOrders: SwapOrder
+    adjustToBuyList: list
+    adjustToBuyWeights: list
+    adjustToBuyPrices: list
+    adjustToBuyOrders: SwapOrder
+    buyList: list
+    buyListWeights: list
+    buyListPrices: list
+    buyOrders: SwapOrder
+
+    def as_tuple(self):
+        values = []
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if isinstance(value, SwapOrder):
+                # Solidity declares each leg as SwapOrder[]
+                value = [value.as_tuple()]
+            elif value is None:
+                value = []
+            values.append(value)
+        return tuple(values)
+
+    def as_args(self):
+        """
+        @return orderData is the SwapOrders[] argument as nested lists, for
+        contract calls made through brownie.
+        """
+        return [self.as_tuple()]
+
+
+def calldata_gas(data):
+    zero_bytes = data.count(0)
+    return (
+        zero_bytes * CALLDATA_ZERO_BYTE_GAS
+        + (len(data) - zero_bytes) * CALLDATA_NONZERO_BYTE_GAS
+    )
+
+
+def leg_calldata(order_data):
+    """
+    Splits the SwapOrders encoding by leg. Each field costs its offset in the
+    struct head and its encoded tail.
+
+    @return legs is a dict of leg label to (calldata bytes, calldata gas).
+    """
+    from eth_abi import encode_abi
+
+    values = dict(
+        zip([name for name, _ in SWAP_ORDERS_FIELD_TYPES], order_data.as_tuple())
+    )
+    offset = 32 * len(SWAP_ORDERS_FIELD_TYPES)
+    field_data = {}
+    for name, field_type in SWAP_ORDERS_FIELD_TYPES:
+        # Dropping the 32 byte offset of a standalone encode leaves the tail
+        tail = encode_abi([field_type], [values[name]])[32:]
+        field_data[name] = offset.to_bytes(32, "big") + tail
+        offset += len(tail)
+
+    legs = {}
+    for label, names in ORDER_DATA_LEGS:
+        data = b"".join(field_data[name] for name in names)
+        legs[label] = (len(data), calldata_gas(data))
+    return legs
+
+
+def report_calldata(label, data, order_data):
+    """
+    Prints the calldata bytes and gas of a rebalanceDETF call, by leg.
+    """
+    print(label, "calldata bytes", len(data), "calldata gas", calldata_gas(data))
+    for leg, (size, gas) in leg_calldata(order_data).items():
+        print("   ", leg, "bytes", size, "gas", gas)
+
+
+@lru_cache(maxsize=None)
+def get_selector(signature):
+    from eth_utils import keccak
+
+    return bytes(keccak(text=signature)[:4])
+
+
+@lru_cache(maxsize=None)
+def get_args_encoder(arg_types):
+    """
+    @return encoder is the eth_abi encoder of an argument tuple, built once per
+    function rather than on every encode.
+    """
+    from eth_abi.encoding import TupleEncoder
+    from eth_abi.registry import registry
+
+    return TupleEncoder(
+        encoders=[registry.get_encoder(arg_type) for arg_type in arg_types]
+    )
+
+
+def encode_function_call(signature, arg_types, args):
+    return get_selector(signature) + get_args_encoder(tuple(arg_types))(tuple(args))
+
+
+def encode_rebalance_detf(order_data):
+    return encode_function_call(
+        REBALANCE_DETF_SIGNATURE, [f"{SWAP_ORDERS_TYPE}[]"], [[order_data.as_tuple()]]
+    )
+
+
+def encode_deposit(lock_timestamp, order_data):
+    return encode_function_call(
+        DEPOSIT_SIGNATURE,
+        ["uint256", f"{SWAP_ORDERS_TYPE}[]"],
+        [int(lock_timestamp), [order_data.as_tuple()]],
+    )
+
+
+def encode_create_detf(wallet_owner, product_id, lock_timestamp, order_data):
+    return encode_function_call(
+        CREATE_DETF_SIGNATURE,
+        [f"(address,uint256,uint256,{SWAP_ORDERS_TYPE}[])"],
+        [
+            (
+                wallet_owner,
+                int(product_id),
+                int(lock_timestamp),
+                [order_data.as_tuple()],
+            )
+        ],
+    )
+
+
+class EncodedCall:
+    """
+    A contract call encoded once, to be estimated, dry run and sent.
+    """
+
+    __slots__ = ("to", "data", "value")
+
+    def __init__(self, to, data, value=0):
+        self.to = to
+        self.data = data
+        self.value = int(value)
+
+    def tx_params(self, sender):
+        return {
+            "from": str(sender),
+            "to": str(self.to),
+            "data": "0x" + self.data.hex(),
+            "value": hex(self.value),
+        }
+
+    def estimate_gas(self, sender, batch_caller=None):
+        if batch_caller is None:
+            batch_caller = BatchCaller()
+        return int(
+            batch_caller.request("eth_estimateGas", [self.tx_params(sender)]), 16
+        )
+
+    def call(self, sender, batch_caller=None, block="latest"):
+        """
+        @return result is the return data of an eth_call dry run. Reverts raise
+        RpcBatchError.
+        """
+        if batch_caller is None:
+            batch_caller = BatchCaller()
+        if isinstance(block, int):
+            block = hex(block)
+        result = batch_caller.request("eth_call", [self.tx_params(sender), block])
+        return bytes.fromhex(result[2:])
+
+    def transact(self, account, gas_limit=None):
+        """
+        Sends the calldata as is from a brownie account.
+        """
+        return account.transfer(
+            self.to, self.value, gas_limit=gas_limit, data=self.data
+        )
@@ -0,0 +1,252 @@
+"""
+Local index of the pairs of each supported factory. Pair addresses follow from
+CREATE2 with the factory's init code hash, so they are computed rather than
+asked of factory.getPair, and whether each pair is deployed is learnt from the
+getReserves reads that need its reserves anyway. The index is kept per network
+in SQLite so that later runs start with what earlier runs found.
+"""
+
+import sqlite3
+from scripts.utils.dex import FACTORY_INIT_CODE_HASHES, sort_tokens
+from scripts.utils.rpc_batch import BatchCaller, decode_result, encode_call
+
+DEFAULT_PAIR_INDEX_PATH = "pair_index.db"
+# Pairs found missing are checked again after this many blocks, about a day
+# on BSC, in case they have since been created
+MISSING_PAIR_RECHECK_BLOCKS = 28800
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pairs (
+    network TEXT NOT NULL,
+    factory TEXT NOT NULL,
+    token0 TEXT NOT NULL,
+    token1 TEXT NOT NULL,
+    pair TEXT NOT NULL,
+    pair_exists INTEGER,
+    checked_block INTEGER,
+    PRIMARY KEY (network, factory, token0, token1)
+);
+"""
+
+
+class PairIndexError(Exception):
+    """
+    Raised for an init code hash that is not 32 bytes of hex.
+    """
+
+
+def check_init_code_hash(factory, init_code_hash):
+    digits = init_code_hash[2:] if init_code_hash.startswith("0x") else ""
+    try:
+        length = len(bytes.fromhex(digits))
+    except ValueError:
+        length = None
+    if length != 32:
+        raise PairIndexError(
+            f"Init code hash {init_code_hash} of {factory} is not 32 bytes"
+        )
+
+
+def pair_address(factory, token_a, token_b, init_code_hash):
+    """
+    @return pair is the CREATE2 address factory.createPair deploys the pair
+    of the two tokens to, as a checksum address.
+    """
+    from eth_utils import keccak, to_checksum_address
+
+    token0, token1 = sort_tokens(token_a.lower(), token_b.lower())
+    salt = keccak(bytes.fromhex(token0[2:]) + bytes.fromhex(token1[2:]))
+    address = keccak(
+        b"\xff" + bytes.fromhex(factory[2:]) + salt + bytes.fromhex(init_code_hash[2:])
+    )[12:]
+    return to_checksum_address("0x" + address.hex())
+
+
+class PairIndexStore:
+    """
+    SQLite store of PairIndex entries, keyed by network.
+    """
+
+    def __init__(self, path=DEFAULT_PAIR_INDEX_PATH):
+        self.path = path
+        self.connection = None
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.path)
+            self.connection.executescript(SCHEMA)
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def load(self, network):
+        """
+        @return entries is a dict of (factory, token0, token1) to
+        (pair, exists, checked_block).
+        """
+        entries = {}
+        for row in self.connect().execute(
+            "SELECT factory, token0, token1, pair, pair_exists, checked_block FROM pairs WHERE network = ?",
+            (network,),
+        ):
+            factory, token0, token1, pair, exists, checked_block = row
+            entries[(factory, token0, token1)] = (
+                pair,
+                None if exists is None else bool(exists),
+                checked_block,
+            )
+        return entries
+
+    def save(self, network, entries):
+        connection = self.connect()
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO pairs (network, factory, token0, token1, pair, pair_exists, checked_block) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        network,
+                        factory,
+                        token0,
+                        token1,
+                        pair,
+                        None if exists is None else int(exists),
+                        checked_block,
+                    )
+                    for (factory, token0, token1), (
+                        pair,
+                        exists,
+                        checked_block,
+                    ) in entries.items()
+                ],
+            )
+
+
+class PairIndex:
+    """
+    Pair addresses of each factory with a known init code hash on one network,
+    and whether each pair exists as of the block it was last checked at.
+    """
+
+    def __init__(
+        self,
+        network,
+        init_code_hashes=FACTORY_INIT_CODE_HASHES,
+        store=None,
+        recheck_blocks=MISSING_PAIR_RECHECK_BLOCKS,
+    ):
+        self.network = network
+        for factory, init_code_hash in init_code_hashes.items():
+            check_init_code_hash(factory, init_code_hash)
+        self.init_code_hashes = {
+            factory.lower(): init_code_hash
+            for factory, init_code_hash in init_code_hashes.items()
+        }
+        self.store = store
+        self.recheck_blocks = recheck_blocks
+        # Keyed by (factory, token0, token1) in lowercase, to
+        # (pair, exists or None if unchecked, checked_block)
+        self.entries = {}
+        if store is not None:
+            self.entries = store.load(network)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def covers(self, factory):
+        return factory.lower() in self.init_code_hashes
+
+    def pair_key(self, factory, token_a, token_b):
+        token0, token1 = sort_tokens(token_a.lower(), token_b.lower())
+        return factory.lower(), token0, token1
+
+    def pair_for(self, factory, token_a, token_b):
+        """
+        @return pair is the address the pair has or would have, computed once.
+        """
+        key = self.pair_key(factory, token_a, token_b)
+        if key not in self.entries:
+            pair = pair_address(key[0], key[1], key[2], self.init_code_hashes[key[0]])
+            self.entries[key] = (pair, None, None)
+        return self.entries[key][0]
+
+    def exists(self, factory, token_a, token_b):
+        """
+        @return exists is True or False as last checked, or None if unchecked.
+        """
+        self.pair_for(factory, token_a, token_b)
+        return self.entries[self.pair_key(factory, token_a, token_b)][1]
+
+    def mark(self, factory, token_a, token_b, exists, block=None):
+        pair = self.pair_for(factory, token_a, token_b)
+        self.entries[self.pair_key(factory, token_a, token_b)] = (pair, exists, block)
+
+    def needs_check(self, factory, token_a, token_b, block=None):
+        key = self.pair_key(factory, token_a, token_b)
+        self.pair_for(factory, token_a, token_b)
+        pair, exists, checked_block = self.entries[key]
+        if exists is None or exists:
+            return True
+        if block is None or checked_block is None:
+            return False
+        return block - checked_block >= self.recheck_blocks
+
+    def read_reserves(
+        self, factory_pairs, batch_caller=None, block="latest", reserve_cache=None
+    ):
+        """
+        Reads getReserves from the computed address of every pair not known to
+        be missing, in one batch, marking each pair found or missing.
+
+        @param factory_pairs is a list of (factory, token_a, token_b).
+        @param reserve_cache is a ReserveCache to read reserves through.
+        @return reserves is a dict of (factory, token0, token1) to
+        (pair, reserve0, reserve1), holding only pairs that exist.
+        """
+        if batch_caller is None:
+            batch_caller = BatchCaller()
+        block_number = block if isinstance(block, int) else None
+        reads = {}
+        for factory, token_a, token_b in factory_pairs:
+            if token_a.lower() == token_b.lower():
+                continue
+            if self.needs_check(factory, token_a, token_b, block_number):
+                reads[self.pair_key(factory, token_a, token_b)] = self.pair_for(
+                    factory, token_a, token_b
+                )
+
+        keys = list(reads.keys())
+        if len(keys) == 0:
+            return {}
+        if reserve_cache is not None:
+            results = reserve_cache.get_reserves([reads[key] for key in keys], block)
+        else:
+            results = [
+                decode_result(["uint112", "uint112", "uint32"], result)
+                for result in batch_caller.call_many(
+                    [(reads[key], encode_call("getReserves()")) for key in keys],
+                    block,
+                )
+            ]
+        reserves = {}
+        for key, decoded in zip(keys, results):
+            # An address without code answers eth_call with empty data
+            self.mark(*key, decoded is not None, block_number)
+            if decoded is not None:
+                reserves[key] = (reads[key], decoded[0], decoded[1])
+        return reserves
+
+    def save(self):
+        if self.store is not None:
+            self.store.save(self.network, self.entries)
+
+
+def get_pair_index(path=DEFAULT_PAIR_INDEX_PATH):
+    """
+    @return index is the PairIndex of the active brownie network.
+    """
+    from brownie import network
+
+    return PairIndex(network.show_active(), store=PairIndexStore(path))
@@ -1,5 +1,3 @@
-from brownie import network, accounts, config
-
 POLYBIT_FORKED_ENVIRONMENTS = ["polybit-bsc-fork","polybit-bsc-main-fork"]
 NON_FORKED_LOCAL_BLOCKCHAIN_ENVIRONMENTS = ["development", "ganache-local"]
 LOCAL_BLOCKCHAIN_ENVIRONMENTS = NON_FORKED_LOCAL_BLOCKCHAIN_ENVIRONMENTS + [
@@ -8,16 +6,30 @@ LOCAL_BLOCKCHAIN_ENVIRONMENTS = NON_FORKED_LOCAL_BLOCKCHAIN_ENVIRONMENTS + [
     "matic-fork",
 ]
 
-BLOCK_CONFIRMATIONS_FOR_VERIFICATION = (
-    1 if network.show_active() in LOCAL_BLOCKCHAIN_ENVIRONMENTS else 6
-)
+
+def get_block_confirmations_for_verification():
+    from brownie import network
+
+    return 1 if network.show_active() in LOCAL_BLOCKCHAIN_ENVIRONMENTS else 6
+
+
+def __getattr__(name):
+    # Depends on the active network, so it is only resolved once brownie has
+    # connected rather than when the module is imported
+    if name == "BLOCK_CONFIRMATIONS_FOR_VERIFICATION":
+        return get_block_confirmations_for_verification()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def is_verifiable_contract() -> bool:
+    from brownie import network, config
+
     return config["networks"][network.show_active()].get("verify", False)
 
 
 def get_account(index=None, id=None, type=None):
+    from brownie import network, accounts, config
+
     if index:
         return accounts[index]
     if id:
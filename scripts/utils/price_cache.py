@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import OrderedDict
+from scripts.utils.dex import to_checksum_address
+from scripts.utils.price_feed import (
+    DEFAULT_QUOTE_CURRENCY,
+    PriceFeedError,
+    unique_checksum_addresses,
+)
+
+DEFAULT_PRICE_CACHE_TTL = 300
+DEFAULT_PRICE_CACHE_SIZE = 1024
+
+
+class PriceCache:
+    """
+    TTL and LRU bounded cache of wei prices keyed by (token, quote currency).
+    """
+
+    def __init__(
+        self,
+        ttl=DEFAULT_PRICE_CACHE_TTL,
+        maxsize=DEFAULT_PRICE_CACHE_SIZE,
+        clock=time.monotonic,
+    ):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fetches = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, token_address, quote=DEFAULT_QUOTE_CURRENCY):
+        key = (to_checksum_address(token_address), quote)
+        entry = self.entries.get(key)
+        if entry is not None:
+            price, expires_at = entry
+            if expires_at > self.clock():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return price
+            del self.entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, token_address, price, quote=DEFAULT_QUOTE_CURRENCY):
+        key = (to_checksum_address(token_address), quote)
+        self.entries[key] = (price, self.clock() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def reset(self):
+        """
+        Clears all entries and counters, e.g. at the start of a rebalance cycle.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fetches = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "fetches": self.fetches,
+            "size": len(self.entries),
+        }
+
+
+class PendingFetch:
+    """
+    Prices of one provider call, which calls from other threads wanting the
+    same tokens wait on instead of fetching them again.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.prices = {}
+
+
+class CachedPriceProvider:
+    """
+    Wraps any price provider so that only tokens missing from the cache are
+    fetched, in a single batched call to the wrapped provider. Calls from
+    several threads share the cache under a lock, and a token already being
+    fetched by one call is waited on by the others rather than fetched twice.
+    """
+
+    def __init__(self, provider, cache=None):
+        self.provider = provider
+        self.cache = cache if cache is not None else PriceCache()
+        self.lock = threading.Lock()
+        self.pending = {}
+
+    def get_prices(self, token_addresses, quote=DEFAULT_QUOTE_CURRENCY):
+        prices = {}
+        missing = []
+        waiting = []
+        with self.lock:
+            for address in unique_checksum_addresses(token_addresses):
+                price = self.cache.get(address, quote)
+                if price is not None:
+                    prices[address] = price
+                elif (address, quote) in self.pending:
+                    waiting.append((address, self.pending[(address, quote)]))
+                else:
+                    missing.append(address)
+            fetch = PendingFetch()
+            for address in missing:
+                self.pending[(address, quote)] = fetch
+
+        if len(missing) > 0:
+            try:
+                fetched = self.provider.get_prices(missing, quote)
+                with self.lock:
+                    self.cache.fetches += 1
+                    for address in missing:
+                        self.cache.set(address, fetched[address], quote)
+                        prices[address] = fetched[address]
+                        fetch.prices[address] = fetched[address]
+            finally:
+                with self.lock:
+                    for address in missing:
+                        del self.pending[(address, quote)]
+                fetch.done.set()
+
+        for address, other_fetch in waiting:
+            other_fetch.done.wait()
+            if address not in other_fetch.prices:
+                raise PriceFeedError(f"Price fetch for {address} failed")
+            prices[address] = other_fetch.prices[address]
+
+        return prices
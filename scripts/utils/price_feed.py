@@ -0,0 +1,139 @@
+import asyncio
+import urllib.error
+from decimal import Decimal
+from scripts.utils.dex import to_checksum_address
+
+COINGECKO_PLATFORM_ID = "binance-smart-chain"
+DEFAULT_QUOTE_CURRENCY = "bnb"
+# Keeps the request URL well under the CoinGecko query string limit.
+COINGECKO_BATCH_SIZE = 50
+# Rate limited, and server errors that may clear by the next attempt
+TRANSIENT_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class PriceFeedError(Exception):
+    pass
+
+
+class TransientPriceFeedError(PriceFeedError):
+    """
+    Raised where a price request failed in transport, timed out or was rate
+    limited, so the same request may succeed when retried.
+    """
+
+    pass
+
+
+def is_transient(error):
+    """
+    @return transient is True for transport errors, timeouts and 429 or 5xx
+    responses, looking through the errors error was raised from.
+    """
+    chain = []
+    while error is not None and error not in chain:
+        chain.append(error)
+        error = error.__cause__ or error.__context__
+    if any(isinstance(error, TransientPriceFeedError) for error in chain):
+        return True
+    for error in chain:
+        # requests keeps the status on its response, urllib on the error
+        if isinstance(error, urllib.error.HTTPError):
+            status = error.code
+        else:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        if status is not None:
+            return status in TRANSIENT_STATUS_CODES
+    return any(isinstance(error, (OSError, asyncio.TimeoutError)) for error in chain)
+
+
+def to_wei_price(price):
+    """
+    Converts a decimal price into an integer amount of wei per whole token,
+    the format expected by PolybitDETF.getTokenBalance.
+    """
+    return int(Decimal(str(price)) * 10**18)
+
+
+def unique_checksum_addresses(token_addresses):
+    checksum_addresses = []
+    for token_address in token_addresses:
+        checksum_address = to_checksum_address(token_address)
+        if checksum_address not in checksum_addresses:
+            checksum_addresses.append(checksum_address)
+    return checksum_addresses
+
+
+def prices_as_list(token_addresses, prices):
+    """
+    Orders a price dict to match a list of token addresses, as required by the
+    Rebalancer and DETF contract calls.
+    """
+    return [prices[to_checksum_address(address)] for address in token_addresses]
+
+
+class CoinGeckoPriceProvider:
+    """
+    Resolves a whole basket of token prices with the CoinGecko multi-address
+    token price endpoint, instead of one coin info request per token.
+    """
+
+    def __init__(
+        self,
+        api_key="",
+        api_base_url=None,
+        platform_id=COINGECKO_PLATFORM_ID,
+        batch_size=COINGECKO_BATCH_SIZE,
+    ):
+        from pycoingecko import CoinGeckoAPI
+
+        self.client = CoinGeckoAPI(api_key=api_key)
+        if api_base_url:
+            self.client.api_base_url = api_base_url
+        self.platform_id = platform_id
+        self.batch_size = batch_size
+
+    def get_prices(self, token_addresses, quote=DEFAULT_QUOTE_CURRENCY):
+        """
+        @return prices is a dict of wei per token keyed by checksum address.
+        """
+        token_addresses = unique_checksum_addresses(token_addresses)
+        prices = {}
+
+        for i in range(0, len(token_addresses), self.batch_size):
+            batch = token_addresses[i : i + self.batch_size]
+            try:
+                response = self.client.get_token_price(
+                    id=self.platform_id,
+                    contract_addresses=[address.lower() for address in batch],
+                    vs_currencies=quote,
+                )
+            except Exception as e:
+                error = TransientPriceFeedError if is_transient(e) else PriceFeedError
+                raise error(f"CoinGecko token price request failed: {e}") from e
+
+            # CoinGecko keys its response by lowercase contract address
+            response = {key.lower(): value for key, value in response.items()}
+            for address in batch:
+                token_price = response.get(address.lower(), {}).get(quote)
+                if token_price is not None:
+                    prices[address] = to_wei_price(token_price)
+
+        missing = [address for address in token_addresses if address not in prices]
+        if len(missing) > 0:
+            raise PriceFeedError(f"No {quote} price returned for {missing}")
+
+        return prices
+
+
+def create_price_provider(source="coingecko", api_key=""):
+    """
+    @param source is "coingecko" for the CoinGecko API, or "amm" for prices
+    derived from on-chain PancakeSwap/SushiSwap/Biswap reserves.
+    """
+    if source == "coingecko":
+        return CoinGeckoPriceProvider(api_key=api_key)
+    if source == "amm":
+        from scripts.utils.amm_prices import AmmReservePriceProvider
+
+        return AmmReservePriceProvider()
+    raise PriceFeedError(f"Unknown price source {source}")
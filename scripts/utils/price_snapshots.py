@@ -0,0 +1,161 @@
+import sqlite3
+import threading
+import time
+from scripts.utils.dex import to_checksum_address
+from scripts.utils.price_feed import (
+    DEFAULT_QUOTE_CURRENCY,
+    PriceFeedError,
+    unique_checksum_addresses,
+)
+
+DEFAULT_SNAPSHOT_PATH = "price_snapshots.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    timestamp REAL NOT NULL,
+    block_number INTEGER NOT NULL,
+    quote TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshot_prices (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    token TEXT NOT NULL,
+    price TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, token)
+);
+CREATE INDEX IF NOT EXISTS snapshots_block_number ON snapshots(block_number);
+"""
+
+
+class PriceSnapshotStore:
+    """
+    SQLite store of the price vectors used by rebalances, keyed by timestamp
+    and block number, so that rebalances can be replayed without the network.
+    The connection is shared by every thread, e.g. the executor threads of
+    the async pipeline, and used by one at a time.
+    """
+
+    def __init__(self, path=DEFAULT_SNAPSHOT_PATH):
+        self.path = path
+        self.connection = None
+        self.lock = threading.RLock()
+
+    def connect(self):
+        with self.lock:
+            if self.connection is None:
+                self.connection = sqlite3.connect(self.path, check_same_thread=False)
+                self.connection.executescript(SCHEMA)
+            return self.connection
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def save(
+        self,
+        prices,
+        block_number,
+        name=None,
+        quote=DEFAULT_QUOTE_CURRENCY,
+        timestamp=None,
+    ):
+        """
+        @param prices is a dict of wei prices keyed by token address.
+        @return name is the name of the new snapshot.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        if name is None:
+            name = f"{block_number}-{int(timestamp * 1000)}"
+
+        with self.lock, self.connect() as connection:
+            cursor = connection.execute(
+                "INSERT INTO snapshots (name, timestamp, block_number, quote) VALUES (?, ?, ?, ?)",
+                (name, timestamp, block_number, quote),
+            )
+            # Prices exceed SQLite's 64 bit integers, so they are stored as text
+            connection.executemany(
+                "INSERT INTO snapshot_prices (snapshot_id, token, price) VALUES (?, ?, ?)",
+                [
+                    (cursor.lastrowid, to_checksum_address(token), str(price))
+                    for token, price in prices.items()
+                ],
+            )
+        return name
+
+    def get_snapshot(self, name):
+        """
+        @return snapshot is a dict of the snapshot name, timestamp, block number,
+        quote currency and prices.
+        """
+        with self.lock:
+            connection = self.connect()
+            row = connection.execute(
+                "SELECT id, timestamp, block_number, quote FROM snapshots WHERE name = ?",
+                (name,),
+            ).fetchone()
+            if row is None:
+                raise PriceFeedError(f"No price snapshot named {name}")
+            snapshot_id, timestamp, block_number, quote = row
+            prices = {
+                token: int(price)
+                for token, price in connection.execute(
+                    "SELECT token, price FROM snapshot_prices WHERE snapshot_id = ?",
+                    (snapshot_id,),
+                )
+            }
+        return {
+            "name": name,
+            "timestamp": timestamp,
+            "block_number": block_number,
+            "quote": quote,
+            "prices": prices,
+        }
+
+    def list_snapshots(self):
+        with self.lock:
+            return [
+                {"name": name, "timestamp": timestamp, "block_number": block_number}
+                for name, timestamp, block_number in self.connect().execute(
+                    "SELECT name, timestamp, block_number FROM snapshots ORDER BY id"
+                )
+            ]
+
+    def latest(self):
+        snapshots = self.list_snapshots()
+        if len(snapshots) == 0:
+            return None
+        return snapshots[-1]["name"]
+
+
+class SnapshotPriceProvider:
+    """
+    Serves prices from a named snapshot in place of a network price source.
+    """
+
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+        self.snapshot = None
+
+    def get_prices(self, token_addresses, quote=DEFAULT_QUOTE_CURRENCY):
+        if self.snapshot is None:
+            self.snapshot = self.store.get_snapshot(self.name)
+        if quote != self.snapshot["quote"]:
+            raise PriceFeedError(
+                f"Snapshot {self.name} is quoted in {self.snapshot['quote']}"
+            )
+
+        prices = {}
+        missing = []
+        for token in unique_checksum_addresses(token_addresses):
+            if token in self.snapshot["prices"]:
+                prices[token] = self.snapshot["prices"][token]
+            else:
+                missing.append(token)
+        if len(missing) > 0:
+            raise PriceFeedError(f"Snapshot {self.name} has no price for {missing}")
+        return prices
@@ -0,0 +1,329 @@
+"""
+Vectorised counterpart of the PolybitSwapLibrary math in liquid_path, quoting
+many candidate (factory, path) pairs at once. Amounts are held in NumPy object
+arrays of Python ints, so every quote rounds exactly as the contract's, and a
+candidate fails wherever the library call would revert. Exact in hops whose
+products fit in int64 are worked out in int64 arrays instead.
+
+best_routes quotes the direct path and the path through each base token on
+every factory, for a whole batch of orders, and takes the best per order;
+MatrixRouter answers getLiquidPaths with it.
+"""
+
+import numpy as np
+from scripts.utils.dex import AMOUNT_TYPE_EXACT_IN
+from scripts.utils.liquid_path import (
+    FEE_DENOMINATOR,
+    FEE_NUMERATOR,
+    UINT256_MAX,
+    LiquidPathRouter,
+    SwapLibraryError,
+)
+
+# Bound below 2 ** 63 for products worked out in int64
+INT64_SAFE = 2.0**62
+
+
+def uint_array(values):
+    return np.array([int(value) for value in values], dtype=object)
+
+
+def get_amount_in_array(amounts_out, reserves_in, reserves_out):
+    """
+    Vectorised liquid_path.get_amount_in.
+
+    @return amounts_in, ok where ok is False, and the amount 0, for each
+    element whose getAmountIn would revert.
+    """
+    ok = (
+        (amounts_out > 0)
+        & (reserves_in > 0)
+        & (reserves_out > 0)
+        & (amounts_out < reserves_out)
+    ).astype(bool)
+    # Elements that would revert are worked out on placeholder values
+    amounts_out = np.where(ok, amounts_out, 1)
+    reserves_in = np.where(ok, reserves_in, 1)
+    reserves_out = np.where(ok, reserves_out, 2)
+    numerator = reserves_in * amounts_out * FEE_DENOMINATOR
+    ok &= (numerator <= UINT256_MAX).astype(bool)
+    amounts_in = numerator // ((reserves_out - amounts_out) * FEE_NUMERATOR) + 1
+    ok &= (amounts_in <= UINT256_MAX).astype(bool)
+    return np.where(ok, amounts_in, 0), ok
+
+
+def get_amount_out_array(amounts_in, reserves_in, reserves_out):
+    """
+    Vectorised liquid_path.get_amount_out, in int64 for the elements whose
+    products fit and in Python ints for the rest.
+
+    @return amounts_out, ok where ok is False, and the amount 0, for each
+    element whose getAmountOut would revert.
+    """
+    ok = ((amounts_in > 0) & (reserves_in > 0) & (reserves_out > 0)).astype(bool)
+    amounts_in = np.where(ok, amounts_in, 1)
+    reserves_in = np.where(ok, reserves_in, 1)
+    reserves_out = np.where(ok, reserves_out, 1)
+    amounts_out = np.zeros(len(ok), dtype=object)
+
+    # Float bounds, with headroom for their rounding, pick out the elements
+    # that cannot overflow int64
+    with_fee = amounts_in.astype(np.float64) * FEE_NUMERATOR
+    small = (with_fee * reserves_out.astype(np.float64) < INT64_SAFE) & (
+        reserves_in.astype(np.float64) * FEE_DENOMINATOR + with_fee < INT64_SAFE
+    )
+    if small.any():
+        amount_in_with_fee = amounts_in[small].astype(np.int64) * FEE_NUMERATOR
+        amounts_out[small] = (
+            (amount_in_with_fee * reserves_out[small].astype(np.int64))
+            // (
+                reserves_in[small].astype(np.int64) * FEE_DENOMINATOR
+                + amount_in_with_fee
+            )
+        ).astype(object)
+
+    # Python ints where uint112 reserve products would overflow int64
+    large = ~small
+    if large.any():
+        amount_in_with_fee = amounts_in[large] * FEE_NUMERATOR
+        numerator = amount_in_with_fee * reserves_out[large]
+        denominator = reserves_in[large] * FEE_DENOMINATOR + amount_in_with_fee
+        ok[large] &= ((numerator <= UINT256_MAX) & (denominator <= UINT256_MAX)).astype(
+            bool
+        )
+        amounts_out[large] = numerator // denominator
+    return np.where(ok, amounts_out, 0), ok
+
+
+def get_amounts_out_array(amounts_in, reserves_in, reserves_out):
+    """
+    Vectorised ReserveSnapshot.get_amounts_out over candidate paths with the
+    same number of hops.
+
+    @return amounts, ok as get_amounts_in_array.
+    """
+    candidates, hops = reserves_in.shape
+    amounts = np.zeros((candidates, hops + 1), dtype=object)
+    amounts[:, 0] = amounts_in
+    ok = np.ones(candidates, dtype=bool)
+    for hop in range(0, hops):
+        amounts[:, hop + 1], hop_ok = get_amount_out_array(
+            amounts[:, hop], reserves_in[:, hop], reserves_out[:, hop]
+        )
+        ok &= hop_ok
+    return amounts, ok
+
+
+def get_amounts_in_array(amounts_out, reserves_in, reserves_out):
+    """
+    Vectorised ReserveSnapshot.get_amounts_in over candidate paths with the
+    same number of hops.
+
+    @param amounts_out is the exact amount out of each candidate, or one for all.
+    @param reserves_in, reserves_out are arrays of candidates by hops, the
+    reserves of the token swapped in and out at each hop.
+    @return amounts, ok where amounts is an array of candidates by path tokens
+    as getAmountsIn, and ok is False for candidates whose call would revert.
+    """
+    candidates, hops = reserves_in.shape
+    amounts = np.zeros((candidates, hops + 1), dtype=object)
+    amounts[:, hops] = amounts_out
+    ok = np.ones(candidates, dtype=bool)
+    for hop in range(hops - 1, -1, -1):
+        amounts[:, hop], hop_ok = get_amount_in_array(
+            amounts[:, hop + 1], reserves_in[:, hop], reserves_out[:, hop]
+        )
+        ok &= hop_ok
+    return amounts, ok
+
+
+def hop_reserves(snapshot, factory, path, memo=None):
+    """
+    @param memo is an optional dict of (factory, token_in, token_out) to the
+    reserves already looked up for that hop.
+    @return reserves is the (reserve_in, reserve_out) of each hop of path, with
+    (0, 0) for hops whose getReserves would revert, so that they fail.
+    """
+    reserves = []
+    for i in range(0, len(path) - 1):
+        key = (factory, path[i], path[i + 1])
+        if memo is not None and key in memo:
+            reserves.append(memo[key])
+            continue
+        try:
+            hop = snapshot.get_reserves(factory, path[i], path[i + 1])
+        except SwapLibraryError:
+            hop = (0, 0)
+        if memo is not None:
+            memo[key] = hop
+        reserves.append(hop)
+    return reserves
+
+
+def reserve_matrices(snapshot, candidates, memo=None):
+    """
+    @param candidates is a list of (factory, path) with paths of equal length.
+    @return reserves_in, reserves_out as arrays of candidates by hops.
+    """
+    reserves = [
+        hop_reserves(snapshot, factory, path, memo) for factory, path in candidates
+    ]
+    reserves_in = np.array(
+        [[int(hop[0]) for hop in path] for path in reserves], dtype=object
+    )
+    reserves_out = np.array(
+        [[int(hop[1]) for hop in path] for path in reserves], dtype=object
+    )
+    return reserves_in, reserves_out
+
+
+def group_by_length(candidates):
+    """
+    @return groups is a dict of path length to the indices of its candidates.
+    """
+    groups = {}
+    for i, (factory, path) in enumerate(candidates):
+        groups.setdefault(len(path), []).append(i)
+    return groups
+
+
+def quote_exact_out(snapshot, candidates, amounts_out, memo=None):
+    """
+    Quotes the amount in of many (factory, path) candidates for exact amounts
+    out, as PolybitSwapRouter.getAmountsIn(...)[0] on the snapshot's reserves.
+
+    @param amounts_out is the amount out of each candidate.
+    @param memo is as hop_reserves, shared by calls on one snapshot.
+    @return amounts_in is a list of the amount in of each candidate, or None
+    where getAmountsIn would revert.
+    """
+    amounts_in = [None] * len(candidates)
+    for length, indices in group_by_length(candidates).items():
+        if length < 2:
+            continue
+        reserves_in, reserves_out = reserve_matrices(
+            snapshot, [candidates[i] for i in indices], memo
+        )
+        amounts, ok = get_amounts_in_array(
+            uint_array([amounts_out[i] for i in indices]), reserves_in, reserves_out
+        )
+        for row, i in enumerate(indices):
+            if ok[row]:
+                amounts_in[i] = amounts[row, 0]
+    return amounts_in
+
+
+def quote_exact_in(snapshot, candidates, amounts_in, memo=None):
+    """
+    As quote_exact_out, for the amount out of exact amounts in.
+    """
+    amounts_out = [None] * len(candidates)
+    for length, indices in group_by_length(candidates).items():
+        if length < 2:
+            continue
+        reserves_in, reserves_out = reserve_matrices(
+            snapshot, [candidates[i] for i in indices], memo
+        )
+        amounts, ok = get_amounts_out_array(
+            uint_array([amounts_in[i] for i in indices]), reserves_in, reserves_out
+        )
+        for row, i in enumerate(indices):
+            if ok[row]:
+                amounts_out[i] = amounts[row, -1]
+    return amounts_out
+
+
+def candidate_paths(token_in, token_out, base_tokens):
+    """
+    @return paths is the direct path, then the path through each base token.
+    """
+    return [[token_in, token_out]] + [
+        [token_in, base_token, token_out] for base_token in base_tokens
+    ]
+
+
+def best_routes(snapshot, orders, factories, base_tokens, memo=None):
+    """
+    Quotes every order's candidate_paths on every factory as one orders x
+    factories x paths matrix, and takes the best quote of each order: the
+    largest amount out of exact in orders, the smallest amount in of exact
+    out orders. Unlike PolybitLiquidPath every base token is tried, the
+    earliest factory and the direct path winning ties.
+
+    @param orders is a list of [token_in, token_out, amount, amount_type].
+    @return factories, paths, amounts as getLiquidPaths, with the first
+    factory, an empty path and a zero amount where no candidate quotes.
+    """
+    shape = (len(orders), len(factories), 1 + len(base_tokens))
+    paths = [candidate_paths(order[0], order[1], base_tokens) for order in orders]
+    order_rows, factory_columns, path_columns = [
+        index.ravel() for index in np.indices(shape)
+    ]
+    exact_in = np.array(
+        [order[3] == AMOUNT_TYPE_EXACT_IN for order in orders], dtype=bool
+    )
+    token_amounts = np.array([order[2] for order in orders], dtype=object)
+    amounts = np.zeros(len(order_rows), dtype=object)
+    ok = np.zeros(len(order_rows), dtype=bool)
+    if memo is None:
+        memo = {}
+    for quote, cells in [
+        (quote_exact_in, np.flatnonzero(exact_in[order_rows])),
+        (quote_exact_out, np.flatnonzero(~exact_in[order_rows])),
+    ]:
+        if len(cells) == 0:
+            continue
+        candidates = [
+            (
+                factories[factory_columns[cell]],
+                paths[order_rows[cell]][path_columns[cell]],
+            )
+            for cell in cells
+        ]
+        quotes = np.empty(len(cells), dtype=object)
+        quotes[:] = quote(snapshot, candidates, token_amounts[order_rows[cells]], memo)
+        quoted = np.array([amount is not None and amount > 0 for amount in quotes])
+        amounts[cells[quoted]] = quotes[quoted]
+        ok[cells[quoted]] = True
+
+    amounts = amounts.reshape(shape[0], shape[1] * shape[2])
+    ok = ok.reshape(shape[0], shape[1] * shape[2])
+    # Failed quotes score below any quote, and exact out scores the amount in
+    # negated, so the best of each order is its argmax
+    scores = np.where(exact_in[:, None], amounts, -amounts)
+    scores = np.where(ok, scores, -(UINT256_MAX + 1))
+    best = [int(np.argmax(row)) for row in scores] if len(factories) > 0 else []
+
+    best_factories = []
+    best_paths = []
+    best_amounts = []
+    for i, cell in enumerate(best):
+        f, c = divmod(cell, shape[2])
+        if not ok[i, cell]:
+            best_factories.append(factories[0])
+            best_paths.append([])
+            best_amounts.append(0)
+            continue
+        best_factories.append(factories[f])
+        best_paths.append(paths[i][c])
+        best_amounts.append(amounts[i, cell])
+    return best_factories, best_paths, best_amounts
+
+
+class MatrixRouter(LiquidPathRouter):
+    """
+    Answers getLiquidPaths with best_routes, quoting a whole batch of orders
+    at once from the snapshot. With a route search it routes as
+    LiquidPathRouter, since the searched paths are not a fixed matrix.
+    """
+
+    def getLiquidPaths(self, swap_orders):
+        """
+        @param swap_orders is the SwapOrders[] argument of the contract call.
+        @return factories, paths, amounts
+        """
+        if self.route_search is not None:
+            return super().getLiquidPaths(swap_orders)
+        orders = [list(order) for order in swap_orders[0][0]]
+        self.load(orders)
+        return best_routes(self.snapshot, orders, self.factories, self.base_tokens)
@@ -0,0 +1,328 @@
+"""
+Runs a rebalance as an asyncio pipeline. Stages that do not depend on each
+other overlap: target prices are fetched while the balance snapshot and owned
+prices are read, and the sell legs are routed while the buys are sized. Every
+stage is timed so the critical path of each rebalance can be read off its
+report.
+"""
+
+import asyncio
+import functools
+import time
+from scripts.utils.asset_prices import (
+    get_price_provider,
+    price_cache,
+    record_price_snapshot,
+)
+from scripts.utils.order_builder import (
+    BUY_LEGS,
+    ORDER_LEGS,
+    SELL_LEGS,
+    RouteTable,
+    get_planner,
+    leg_swap_requests,
+    multicall_address,
+    order_data_from_routes,
+    rebalance_call,
+    report_balances,
+)
+from scripts.utils.price_feed import prices_as_list
+from scripts.utils.rebalance_planner import read_balance_snapshot
+from scripts.utils.simulation import check_simulation, simulate_call
+
+
+class StageTimer:
+    """
+    Start offset and duration of each stage of one pipeline run.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.started_at = clock()
+        self.stages = []
+
+    def elapsed(self):
+        return self.clock() - self.started_at
+
+    def record(self, name, start):
+        self.stages.append((name, start - self.started_at, self.clock() - start))
+
+    async def run(self, name, function, *args):
+        """
+        Runs a blocking call in a worker thread as a timed stage.
+        """
+        start = self.clock()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(function, *args)
+            )
+        finally:
+            self.record(name, start)
+
+    def run_inline(self, name, function, *args):
+        """
+        Runs a call on the event loop thread as a timed stage.
+        """
+        start = self.clock()
+        try:
+            return function(*args)
+        finally:
+            self.record(name, start)
+
+    def serial_seconds(self):
+        """
+        @return seconds is the time the stages would take one after another.
+        """
+        return sum(duration for name, offset, duration in self.stages)
+
+    def report(self):
+        for name, offset, duration in sorted(self.stages, key=lambda s: s[1]):
+            print(
+                "Stage",
+                name,
+                "start",
+                "%.3f" % offset,
+                "duration",
+                "%.3f" % duration,
+            )
+        print(
+            "Critical path",
+            "%.3f" % self.elapsed(),
+            "Serial stages",
+            "%.3f" % self.serial_seconds(),
+        )
+
+
+def get_prices_list(provider, token_addresses):
+    return prices_as_list(token_addresses, provider.get_prices(token_addresses))
+
+
+async def read_detf_state(
+    timer,
+    detf,
+    provider,
+    multicall=None,
+    batch_caller=None,
+    suffix="",
+    token_addresses=(),
+):
+    """
+    Reads the balance snapshot and prices the owned assets. PolybitMulticall
+    returns the owned assets with the snapshot, otherwise they are read first
+    so the snapshot and the owned prices can be fetched together.
+
+    @param suffix is appended to the stage names.
+    @param token_addresses are read into the snapshot besides the owned assets.
+    @return owned_assets, owned_assets_prices, balances
+    """
+    if multicall is not None:
+        balances = await timer.run(
+            "balance snapshot" + suffix,
+            read_balance_snapshot,
+            detf.address,
+            [],
+            token_addresses,
+            multicall_address(multicall),
+            batch_caller,
+        )
+        owned_assets = balances.owned_assets
+        owned_assets_prices = await timer.run(
+            "owned prices" + suffix, get_prices_list, provider, owned_assets
+        )
+    else:
+        owned_assets = await timer.run("owned assets" + suffix, detf.getOwnedAssets)
+        balances, owned_assets_prices = await asyncio.gather(
+            timer.run(
+                "balance snapshot" + suffix,
+                read_balance_snapshot,
+                detf.address,
+                owned_assets,
+                token_addresses,
+                None,
+                batch_caller,
+            ),
+            timer.run("owned prices" + suffix, get_prices_list, provider, owned_assets),
+        )
+    return owned_assets, owned_assets_prices, balances
+
+
+def request_list(plan, legs):
+    return [request for leg in leg_swap_requests(plan, legs) for request in leg]
+
+
+async def plan_order_data(
+    timer,
+    router,
+    balances,
+    owned_assets,
+    owned_assets_prices,
+    target_assets,
+    target_assets_weights,
+    target_assets_prices,
+    tolerance=None,
+):
+    """
+    As plan_expecting_fills followed by order_data_from_routes, but the sell
+    legs are routed in a worker thread while the buys are sized.
+
+    @return orderData, route_table
+    """
+    planner = get_planner(max(len(owned_assets), len(target_assets)))
+    plan = timer.run_inline(
+        "plan sells",
+        planner.plan_sells,
+        balances,
+        owned_assets,
+        owned_assets_prices,
+        target_assets,
+        target_assets_weights,
+        target_assets_prices,
+        tolerance,
+    )
+    expected_weth_balance = (
+        balances.weth_balance
+        + sum(plan["sellListAmountsOut"])
+        + sum(plan["adjustToSellListAmountsOut"])
+    )
+    route_table = RouteTable(router)
+    # The sell requests are built before plan_buys starts writing to the plan
+    sell_requests = request_list(plan, SELL_LEGS)
+    await asyncio.gather(
+        timer.run("route sells", route_table.route, sell_requests),
+        timer.run(
+            "plan buys", planner.plan_buys, plan, balances, expected_weth_balance
+        ),
+    )
+    await timer.run("route buys", route_table.route, request_list(plan, BUY_LEGS))
+
+    order_data = timer.run_inline(
+        "order data",
+        order_data_from_routes,
+        planner,
+        plan,
+        balances,
+        route_table.route_legs(plan, ORDER_LEGS),
+        lambda plan: route_table.route_legs(plan, BUY_LEGS),
+    )
+    return order_data, route_table
+
+
+async def rebalance_async(
+    account,
+    detf,
+    router,
+    assets,
+    weights,
+    provider=None,
+    multicall=None,
+    tolerance=None,
+    batch_caller=None,
+    timer=None,
+    failure_predicate=None,
+):
+    """
+    @param multicall is a PolybitMulticall to read each snapshot in one call.
+    @param tolerance is a DriftTolerance for an incremental rebalance, or None
+    for a full rebalance.
+    @param failure_predicate is checked against a dry run of the call before
+    it is sent, or None to send it untested.
+    @return timer is the StageTimer of the run.
+    """
+    if provider is None:
+        provider = get_price_provider()
+    if timer is None:
+        timer = StageTimer()
+
+    target_assets_prices, (owned_assets, owned_assets_prices, balances) = (
+        await asyncio.gather(
+            timer.run("target prices", get_prices_list, provider, assets),
+            read_detf_state(timer, detf, provider, multicall, batch_caller, "", assets),
+        )
+    )
+    print("Owned Assets Before:", owned_assets)
+    print("Target Assets Before:", assets)
+    # Saved alongside planning, which only needs the prices in memory
+    snapshot = asyncio.ensure_future(
+        timer.run(
+            "price snapshot",
+            record_price_snapshot,
+            list(owned_assets) + list(assets),
+            list(owned_assets_prices) + list(target_assets_prices),
+        )
+    )
+
+    order_data, route_table = await plan_order_data(
+        timer,
+        router,
+        balances,
+        owned_assets,
+        owned_assets_prices,
+        assets,
+        weights,
+        target_assets_prices,
+        tolerance,
+    )
+    print("Order Data", order_data)
+    print("getLiquidPaths calls", route_table.round_trips)
+    # Saved before the rebalance is sent, as the sync path does, so a failed
+    # save stops the run before anything is sent
+    await snapshot
+
+    call = timer.run_inline("encode", rebalance_call, detf.address, order_data)
+    if failure_predicate is not None:
+        simulation = await timer.run(
+            "simulate", simulate_call, call, account.address, balances, batch_caller
+        )
+        simulation.report()
+        check_simulation(simulation, failure_predicate)
+    tx = await timer.run("send", call.transact, account)
+    await timer.run("confirm", tx.wait, 1)
+    for i in range(0, len(tx.events)):
+        print(tx.events[i])
+
+    owned_assets, owned_assets_prices, balances = await read_detf_state(
+        timer, detf, provider, multicall, batch_caller, " after"
+    )
+    print("Owned Assets After:", owned_assets)
+    await timer.run(
+        "report",
+        report_balances,
+        detf,
+        assets,
+        weights,
+        owned_assets,
+        owned_assets_prices,
+        balances,
+    )
+    timer.report()
+    return timer
+
+
+def run_rebalance_async(
+    account,
+    detf,
+    router,
+    assets,
+    weights,
+    multicall=None,
+    tolerance=None,
+    failure_predicate=None,
+):
+    """
+    As order_builder.run_rebalance, with the pipeline's I/O overlapped.
+    """
+    price_cache.reset()
+    timer = asyncio.run(
+        rebalance_async(
+            account,
+            detf,
+            router,
+            assets,
+            weights,
+            multicall=multicall,
+            tolerance=tolerance,
+            failure_predicate=failure_predicate,
+        )
+    )
+    print("Price cache", price_cache.stats())
+    return timer
@@ -0,0 +1,767 @@
+"""
+Off-chain mirror of PolybitRebalancer. Every function reproduces the contract
+function of the same name with the same integer math and 10**8 weight scale,
+reading token balances from one DETFBalances snapshot instead of calling
+PolybitDETF.getTokenBalance for each token.
+"""
+
+from scripts.utils.dex import WETH_ADDRESS, ZERO_ADDRESS, to_checksum_address
+from scripts.utils.rpc_batch import BatchCaller, decode_result, encode_call
+
+WEIGHT_SCALE = 10**8
+BPS_SCALE = 10**4
+UINT256_MAX = 2**256 - 1
+
+
+class RebalancerError(Exception):
+    """
+    Raised where the PolybitRebalancer call would revert.
+    """
+
+    pass
+
+
+def same_address(address_a, address_b):
+    return address_a.lower() == address_b.lower()
+
+
+def is_zero_address(address):
+    return same_address(address, ZERO_ADDRESS)
+
+
+def sub(a, b):
+    # Solidity 0.8 checked arithmetic
+    if b > a:
+        raise RebalancerError(f"Arithmetic underflow {a} - {b}")
+    return a - b
+
+
+def mul(a, b):
+    if a * b > UINT256_MAX:
+        raise RebalancerError(f"Arithmetic overflow {a} * {b}")
+    return a * b
+
+
+def uint_list(values):
+    # Weights and prices arrive as floats from 10**8 * (1 / 3) style configs,
+    # which the contract only ever sees truncated to uint256
+    return [int(value) for value in values]
+
+
+def div(a, b):
+    if b == 0:
+        raise RebalancerError("Division by zero")
+    return a // b
+
+
+class DriftTolerance:
+    """
+    Per product drift below which an incremental rebalance leaves an adjust
+    leg out, as PolybitRebalancer.isWithinDriftTolerance.
+    """
+
+    def __init__(self, bps=0, min_weth_notional=0):
+        self.bps = bps
+        self.min_weth_notional = min_weth_notional
+
+    def is_within(self, total_balance, balance_percentage, target_percentage):
+        drift = abs(balance_percentage - target_percentage)
+        return (
+            drift < self.bps * (WEIGHT_SCALE // BPS_SCALE)
+            or mul(drift, total_balance) // WEIGHT_SCALE < self.min_weth_notional
+        )
+
+
+def token_balance_in_weth(token_balance, token_price, token_decimals):
+    """
+    Mirrors the scaling of PolybitDETF.getTokenBalance.
+    """
+    return mul(token_balance, token_price) // 10**token_decimals
+
+
+class DETFBalances:
+    """
+    Snapshot of the balances a DETF holds at one block, answering the same
+    views as PolybitDETF without further RPC calls.
+    """
+
+    def __init__(
+        self,
+        owned_assets,
+        token_balances,
+        token_decimals,
+        weth_balance,
+        eth_balance=0,
+    ):
+        self.owned_assets = list(owned_assets)
+        # Keyed by lowercase address, so lookups need no checksumming
+        self.token_balances = {
+            token.lower(): balance for token, balance in token_balances.items()
+        }
+        self.token_decimals = {
+            token.lower(): decimals for token, decimals in token_decimals.items()
+        }
+        self.weth_balance = weth_balance
+        self.eth_balance = eth_balance
+
+    def get_token_balance(self, token_address, token_price):
+        """
+        @return tokenBalance, tokenBalanceInWeth as PolybitDETF.getTokenBalance.
+        """
+        key = token_address.lower()
+        if key not in self.token_balances:
+            raise RebalancerError(f"No balance in snapshot for {token_address}")
+        token_balance = self.token_balances[key]
+        return token_balance, token_balance_in_weth(
+            token_balance, token_price, self.token_decimals[key]
+        )
+
+    def get_total_balance_in_weth(self, owned_assets_prices):
+        token_balances = 0
+        for i in range(0, len(self.owned_assets)):
+            _, balance_in_weth = self.get_token_balance(
+                self.owned_assets[i], owned_assets_prices[i]
+            )
+            token_balances += balance_in_weth
+        return token_balances + self.eth_balance + self.weth_balance
+
+
+def read_detf_balances(
+    detf_address,
+    owned_assets,
+    token_addresses=(),
+    weth_address=WETH_ADDRESS,
+    batch_caller=None,
+    block="latest",
+):
+    """
+    Reads the balance and decimals of every owned and listed token, and the
+    WETH balance, in one batched request. The ETH balance is read separately.
+    """
+    if batch_caller is None:
+        batch_caller = BatchCaller()
+    tokens = []
+    for token in list(owned_assets) + list(token_addresses):
+        token = to_checksum_address(token)
+        if token not in tokens and not is_zero_address(token):
+            tokens.append(token)
+
+    balance_of = encode_call("balanceOf(address)", ["address"], [detf_address])
+    calls = [(weth_address, balance_of)]
+    for token in tokens:
+        calls.append((token, balance_of))
+        calls.append((token, encode_call("decimals()")))
+    results = iter(batch_caller.call_many(calls, block))
+
+    weth_balance = decode_result(["uint256"], next(results))
+    if weth_balance is None:
+        raise RebalancerError(f"WETH balance read failed for {detf_address}")
+    token_balances = {}
+    token_decimals = {}
+    for token in tokens:
+        balance = decode_result(["uint256"], next(results))
+        decimals = decode_result(["uint8"], next(results))
+        if balance is None or decimals is None:
+            raise RebalancerError(f"Balance read failed for {token}")
+        token_balances[token] = balance[0]
+        token_decimals[token] = decimals[0]
+
+    if isinstance(block, int):
+        block = hex(block)
+    eth_balance = int(batch_caller.request("eth_getBalance", [detf_address, block]), 16)
+
+    return DETFBalances(
+        owned_assets, token_balances, token_decimals, weth_balance[0], eth_balance
+    )
+
+
+def read_multicall_balances(
+    multicall_address,
+    detf_address,
+    token_addresses=(),
+    batch_caller=None,
+    block="latest",
+):
+    """
+    Reads the same snapshot as read_detf_balances with one eth_call to
+    PolybitMulticall.getDETFBalanceSnapshot, including the ETH balance.
+    """
+    if batch_caller is None:
+        batch_caller = BatchCaller()
+    tokens = [
+        to_checksum_address(token)
+        for token in token_addresses
+        if not is_zero_address(token)
+    ]
+    data = encode_call(
+        "getDETFBalanceSnapshot(address,address[])",
+        ["address", "address[]"],
+        [detf_address, tokens],
+    )
+    result = decode_result(
+        ["(address[],address[],uint256[],uint8[],uint256,uint256)"],
+        batch_caller.call_many([(multicall_address, data)], block)[0],
+    )
+    if result is None:
+        raise RebalancerError(f"Balance snapshot failed for {detf_address}")
+    (
+        owned_assets,
+        tokens,
+        balances,
+        decimals,
+        weth_balance,
+        eth_balance,
+    ) = result[0]
+    owned_assets = [to_checksum_address(token) for token in owned_assets]
+    return DETFBalances(
+        owned_assets,
+        dict(zip(tokens, balances)),
+        dict(zip(tokens, decimals)),
+        weth_balance,
+        eth_balance,
+    )
+
+
+def read_balance_snapshot(
+    detf_address,
+    owned_assets,
+    token_addresses=(),
+    multicall_address=None,
+    batch_caller=None,
+):
+    """
+    @return balances is a DETFBalances snapshot, read through PolybitMulticall
+    when its address is given and with batched token calls otherwise.
+    """
+    if multicall_address is not None:
+        return read_multicall_balances(
+            multicall_address, detf_address, token_addresses, batch_caller
+        )
+    return read_detf_balances(
+        detf_address, owned_assets, token_addresses, batch_caller=batch_caller
+    )
+
+
+def create_sell_list(owned_assets_list, owned_assets_prices, target_assets_list):
+    if len(owned_assets_list) != len(owned_assets_prices):
+        raise RebalancerError("Price information incorrect")
+    if len(target_assets_list) == 0:
+        return list(owned_assets_list), list(owned_assets_prices)
+
+    sell_list = []
+    sell_list_prices = []
+    for i in range(0, len(owned_assets_list)):
+        if is_zero_address(owned_assets_list[i]):
+            continue
+        if any(same_address(owned_assets_list[i], x) for x in target_assets_list):
+            continue
+        sell_list.append(owned_assets_list[i])
+        sell_list_prices.append(owned_assets_prices[i])
+    return sell_list, sell_list_prices
+
+
+def create_adjust_list(
+    owned_assets_list, owned_assets_prices, target_assets_list, target_assets_weights
+):
+    if len(owned_assets_list) != len(owned_assets_prices):
+        raise RebalancerError("Owned price information incorrect")
+    if len(target_assets_list) != len(target_assets_weights):
+        raise RebalancerError("Target weight information incorrect")
+
+    adjust_list = []
+    adjust_list_weights = []
+    adjust_list_prices = []
+    for i in range(0, len(owned_assets_list)):
+        for x in range(0, len(target_assets_list)):
+            if same_address(owned_assets_list[i], target_assets_list[x]):
+                adjust_list.append(owned_assets_list[i])
+                adjust_list_weights.append(target_assets_weights[x])
+                adjust_list_prices.append(owned_assets_prices[i])
+    if len(adjust_list) > len(owned_assets_list):
+        raise RebalancerError("Index out of bounds")
+
+    filtered = [
+        i for i in range(0, len(adjust_list)) if not is_zero_address(adjust_list[i])
+    ]
+    return (
+        [adjust_list[i] for i in filtered],
+        [adjust_list_weights[i] for i in filtered],
+        [adjust_list_prices[i] for i in filtered],
+    )
+
+
+def split_adjust_list(
+    balances,
+    total_balance,
+    adjust_list,
+    adjust_list_weights,
+    adjust_list_prices,
+    to_sell,
+    tolerance=None,
+):
+    """
+    @param tolerance is a DriftTolerance for incremental rebalances, or None
+    to adjust every token off target.
+    """
+    if len(adjust_list) != len(adjust_list_prices):
+        raise RebalancerError("Adjust List price information incorrect")
+    if len(adjust_list) != len(adjust_list_weights):
+        raise RebalancerError("Adjust List weight information incorrect")
+
+    result_list = []
+    result_weights = []
+    result_prices = []
+    for i in range(0, len(adjust_list)):
+        _, balance_in_weth = balances.get_token_balance(
+            adjust_list[i], adjust_list_prices[i]
+        )
+        balance_percentage = div(mul(WEIGHT_SCALE, balance_in_weth), total_balance)
+        target_percentage = adjust_list_weights[i]
+        if to_sell:
+            selected = balance_percentage > target_percentage
+        else:
+            selected = target_percentage > balance_percentage
+        if (
+            selected
+            and tolerance is not None
+            and tolerance.is_within(
+                total_balance, balance_percentage, target_percentage
+            )
+        ):
+            continue
+        if selected and not is_zero_address(adjust_list[i]):
+            result_list.append(adjust_list[i])
+            result_weights.append(adjust_list_weights[i])
+            result_prices.append(adjust_list_prices[i])
+    return result_list, result_weights, result_prices
+
+
+def create_adjust_to_sell_list(
+    balances,
+    total_balance,
+    adjust_list,
+    adjust_list_weights,
+    adjust_list_prices,
+    tolerance=None,
+):
+    return split_adjust_list(
+        balances,
+        total_balance,
+        adjust_list,
+        adjust_list_weights,
+        adjust_list_prices,
+        to_sell=True,
+        tolerance=tolerance,
+    )
+
+
+def create_adjust_to_buy_list(
+    balances,
+    total_balance,
+    adjust_list,
+    adjust_list_weights,
+    adjust_list_prices,
+    tolerance=None,
+):
+    return split_adjust_list(
+        balances,
+        total_balance,
+        adjust_list,
+        adjust_list_weights,
+        adjust_list_prices,
+        to_sell=False,
+        tolerance=tolerance,
+    )
+
+
+def create_buy_list(
+    owned_assets_list, target_assets_list, target_assets_weights, target_assets_prices
+):
+    if len(target_assets_list) != len(target_assets_weights):
+        raise RebalancerError("Target weight information incorrect")
+    if len(target_assets_list) != len(target_assets_prices):
+        raise RebalancerError("Target price information incorrect")
+    if len(owned_assets_list) == 0:
+        return (
+            list(target_assets_list),
+            list(target_assets_weights),
+            list(target_assets_prices),
+        )
+
+    buy_list = []
+    buy_list_weights = []
+    buy_list_prices = []
+    for x in range(0, len(target_assets_list)):
+        if is_zero_address(target_assets_list[x]):
+            continue
+        if any(same_address(target_assets_list[x], i) for i in owned_assets_list):
+            continue
+        buy_list.append(target_assets_list[x])
+        buy_list_weights.append(target_assets_weights[x])
+        buy_list_prices.append(target_assets_prices[x])
+    return buy_list, buy_list_weights, buy_list_prices
+
+
+def calc_total_target_buy_percentage(
+    balances,
+    owned_assets_prices,
+    adjust_to_buy_list,
+    adjust_to_buy_weights,
+    adjust_to_buy_prices,
+    buy_list,
+    buy_list_weights,
+):
+    total_balance = balances.get_total_balance_in_weth(owned_assets_prices)
+    total_target_percentage = 0
+    for i in range(0, len(adjust_to_buy_list)):
+        if not is_zero_address(adjust_to_buy_list[i]):
+            _, balance_in_weth = balances.get_token_balance(
+                adjust_to_buy_list[i], adjust_to_buy_prices[i]
+            )
+            balance_percentage = div(mul(WEIGHT_SCALE, balance_in_weth), total_balance)
+            total_target_percentage += sub(adjust_to_buy_weights[i], balance_percentage)
+    for i in range(0, len(buy_list)):
+        if not is_zero_address(buy_list[i]):
+            total_target_percentage += buy_list_weights[i]
+    return total_target_percentage
+
+
+def create_sell_order(balances, sell_list, sell_list_prices):
+    amounts_in = []
+    amounts_out = []
+    for i in range(0, len(sell_list)):
+        token_balance, balance_in_weth = balances.get_token_balance(
+            sell_list[i], sell_list_prices[i]
+        )
+        amounts_in.append(token_balance)
+        amounts_out.append(balance_in_weth)
+    return amounts_in, amounts_out
+
+
+def create_adjust_to_sell_order(
+    balances,
+    owned_assets_prices,
+    adjust_to_sell_list,
+    adjust_to_sell_weights,
+    adjust_to_sell_prices,
+):
+    total_balance = balances.get_total_balance_in_weth(owned_assets_prices)
+    amounts_in = [0] * len(adjust_to_sell_list)
+    amounts_out = [0] * len(adjust_to_sell_list)
+    index = 0
+    for i in range(0, len(adjust_to_sell_list)):
+        if not is_zero_address(adjust_to_sell_list[i]):
+            token_balance, balance_in_weth = balances.get_token_balance(
+                adjust_to_sell_list[i], adjust_to_sell_prices[i]
+            )
+            balance_percentage = div(mul(WEIGHT_SCALE, balance_in_weth), total_balance)
+            target_percentage = adjust_to_sell_weights[i]
+            amounts_in[index] = sub(
+                token_balance,
+                div(mul(token_balance, target_percentage), balance_percentage),
+            )
+            amounts_out[index] = sub(
+                balance_in_weth,
+                div(mul(balance_in_weth, target_percentage), balance_percentage),
+            )
+            index += 1
+    return amounts_in, amounts_out
+
+
+def create_adjust_to_buy_order(
+    balances,
+    total_balance,
+    weth_balance,
+    adjust_to_buy_list,
+    adjust_to_buy_weights,
+    adjust_to_buy_prices,
+    total_target_percentage,
+):
+    amounts_in = [0] * len(adjust_to_buy_list)
+    amounts_out = [0] * len(adjust_to_buy_list)
+    index = 0
+    for i in range(0, len(adjust_to_buy_list)):
+        if not is_zero_address(adjust_to_buy_list[i]):
+            _, balance_in_weth = balances.get_token_balance(
+                adjust_to_buy_list[i], adjust_to_buy_prices[i]
+            )
+            target_percentage = sub(
+                adjust_to_buy_weights[i],
+                div(mul(WEIGHT_SCALE, balance_in_weth), total_balance),
+            )
+            percentage_of_available_weth = div(
+                mul(WEIGHT_SCALE, target_percentage), total_target_percentage
+            )
+            amount_in = mul(weth_balance, percentage_of_available_weth) // WEIGHT_SCALE
+            amounts_in[index] = amount_in
+            amounts_out[index] = div(mul(10**18, amount_in), adjust_to_buy_prices[i])
+            index += 1
+    return amounts_in, amounts_out
+
+
+def create_buy_order(
+    buy_list, buy_list_weights, buy_list_prices, weth_balance, total_target_percentage
+):
+    buy_list_weights = uint_list(buy_list_weights)
+    buy_list_prices = uint_list(buy_list_prices)
+    amounts_in = []
+    amounts_out = []
+    for i in range(0, len(buy_list)):
+        percentage_of_available_weth = div(
+            mul(WEIGHT_SCALE, buy_list_weights[i]), total_target_percentage
+        )
+        amount_in = mul(weth_balance, percentage_of_available_weth) // WEIGHT_SCALE
+        amounts_in.append(amount_in)
+        amounts_out.append(div(mul(10**18, amount_in), buy_list_prices[i]))
+    return amounts_in, amounts_out
+
+
+def total_target_buy_percentage(buy_list, buy_list_weights):
+    total_target_percentage = 0
+    for i in range(0, len(buy_list)):
+        if not is_zero_address(buy_list[i]):
+            total_target_percentage += buy_list_weights[i]
+    return total_target_percentage
+
+
+def plan_first_deposit(
+    owned_assets,
+    target_assets,
+    target_assets_weights,
+    target_assets_prices,
+    weth_balance,
+):
+    """
+    @return plan is the buy leg for a first deposit, as built by
+    first_deposit_order_data.
+    """
+    target_assets_weights = uint_list(target_assets_weights)
+    target_assets_prices = uint_list(target_assets_prices)
+    buy_list, buy_list_weights, buy_list_prices = create_buy_list(
+        owned_assets, target_assets, target_assets_weights, target_assets_prices
+    )
+    plan = empty_plan()
+    plan["buyList"] = buy_list
+    plan["buyListWeights"] = buy_list_weights
+    plan["buyListPrices"] = buy_list_prices
+    plan["wethBalance"] = weth_balance
+    plan["totalTargetPercentage"] = total_target_buy_percentage(
+        buy_list, buy_list_weights
+    )
+    if len(buy_list) > 0:
+        plan["buyListAmountsIn"], plan["buyListAmountsOut"] = create_buy_order(
+            buy_list,
+            buy_list_weights,
+            buy_list_prices,
+            weth_balance,
+            plan["totalTargetPercentage"],
+        )
+    return plan
+
+
+def empty_plan():
+    return {
+        "sellList": [],
+        "sellListPrices": [],
+        "sellListAmountsIn": [],
+        "sellListAmountsOut": [],
+        "adjustList": [],
+        "adjustListWeights": [],
+        "adjustListPrices": [],
+        "adjustToSellList": [],
+        "adjustToSellWeights": [],
+        "adjustToSellPrices": [],
+        "adjustToSellListAmountsIn": [],
+        "adjustToSellListAmountsOut": [],
+        "adjustToBuyList": [],
+        "adjustToBuyWeights": [],
+        "adjustToBuyPrices": [],
+        "adjustToBuyListAmountsIn": [],
+        "adjustToBuyListAmountsOut": [],
+        "buyList": [],
+        "buyListWeights": [],
+        "buyListPrices": [],
+        "buyListAmountsIn": [],
+        "buyListAmountsOut": [],
+        "totalBalance": 0,
+        "wethBalance": 0,
+        "totalTargetPercentage": 0,
+    }
+
+
+def plan_sells(
+    balances,
+    owned_assets,
+    owned_assets_prices,
+    target_assets,
+    target_assets_weights,
+    target_assets_prices,
+    tolerance=None,
+):
+    """
+    Builds every list of a rebalance, and sizes the sell and adjust to sell
+    legs. The buy legs depend on how much WETH the sells raise, and are sized
+    by plan_buys once the sells have been routed.
+
+    @param tolerance is a DriftTolerance to leave small adjustments out of an
+    incremental rebalance, or None for a full rebalance.
+
+    @return plan is a dict of the SwapOrders lists keyed by their field names,
+    with the amounts in and out of each leg.
+    """
+    plan = empty_plan()
+    plan["sellList"], plan["sellListPrices"] = create_sell_list(
+        owned_assets, owned_assets_prices, target_assets
+    )
+    (
+        plan["adjustList"],
+        plan["adjustListWeights"],
+        plan["adjustListPrices"],
+    ) = create_adjust_list(
+        owned_assets, owned_assets_prices, target_assets, target_assets_weights
+    )
+
+    total_balance = balances.get_total_balance_in_weth(owned_assets_prices)
+    (
+        plan["adjustToSellList"],
+        plan["adjustToSellWeights"],
+        plan["adjustToSellPrices"],
+    ) = create_adjust_to_sell_list(
+        balances,
+        total_balance,
+        plan["adjustList"],
+        plan["adjustListWeights"],
+        plan["adjustListPrices"],
+        tolerance,
+    )
+    (
+        plan["adjustToBuyList"],
+        plan["adjustToBuyWeights"],
+        plan["adjustToBuyPrices"],
+    ) = create_adjust_to_buy_list(
+        balances,
+        total_balance,
+        plan["adjustList"],
+        plan["adjustListWeights"],
+        plan["adjustListPrices"],
+        tolerance,
+    )
+    (
+        plan["buyList"],
+        plan["buyListWeights"],
+        plan["buyListPrices"],
+    ) = create_buy_list(
+        owned_assets, target_assets, target_assets_weights, target_assets_prices
+    )
+
+    if len(plan["sellList"]) > 0:
+        (
+            plan["sellListAmountsIn"],
+            plan["sellListAmountsOut"],
+        ) = create_sell_order(balances, plan["sellList"], plan["sellListPrices"])
+    if len(plan["adjustToSellList"]) > 0:
+        (
+            plan["adjustToSellListAmountsIn"],
+            plan["adjustToSellListAmountsOut"],
+        ) = create_adjust_to_sell_order(
+            balances,
+            owned_assets_prices,
+            plan["adjustToSellList"],
+            plan["adjustToSellWeights"],
+            plan["adjustToSellPrices"],
+        )
+    return plan
+
+
+def plan_buys(plan, balances, weth_balance):
+    """
+    Sizes the adjust to buy and buy legs of a plan from plan_sells.
+
+    @param weth_balance is the WETH the DETF will hold once the routable sells
+    have filled at their quoted amounts out.
+    """
+    # The buy legs are sized against the adjusted tokens plus the WETH
+    # available once the sells have filled
+    if len(plan["adjustList"]) > 0:
+        token_balances = 0
+        for i in range(0, len(plan["adjustList"])):
+            _, balance_in_weth = balances.get_token_balance(
+                plan["adjustList"][i], plan["adjustListPrices"][i]
+            )
+            token_balances += balance_in_weth
+        plan["totalBalance"] = token_balances + weth_balance
+
+    total_target_percentage = 0
+    for i in range(0, len(plan["adjustToBuyList"])):
+        _, balance_in_weth = balances.get_token_balance(
+            plan["adjustToBuyList"][i], plan["adjustToBuyPrices"][i]
+        )
+        balance_percentage = div(
+            mul(WEIGHT_SCALE, balance_in_weth), plan["totalBalance"]
+        )
+        total_target_percentage += plan["adjustToBuyWeights"][i] - balance_percentage
+    total_target_percentage += total_target_buy_percentage(
+        plan["buyList"], plan["buyListWeights"]
+    )
+    plan["wethBalance"] = weth_balance
+    plan["totalTargetPercentage"] = total_target_percentage
+
+    if len(plan["adjustToBuyList"]) > 0:
+        (
+            plan["adjustToBuyListAmountsIn"],
+            plan["adjustToBuyListAmountsOut"],
+        ) = create_adjust_to_buy_order(
+            balances,
+            plan["totalBalance"],
+            weth_balance,
+            plan["adjustToBuyList"],
+            plan["adjustToBuyWeights"],
+            plan["adjustToBuyPrices"],
+            total_target_percentage,
+        )
+
+    if len(plan["buyList"]) > 0:
+        (
+            plan["buyListAmountsIn"],
+            plan["buyListAmountsOut"],
+        ) = create_buy_order(
+            plan["buyList"],
+            plan["buyListWeights"],
+            plan["buyListPrices"],
+            weth_balance,
+            total_target_percentage,
+        )
+    return plan
+
+
+def plan_rebalance(
+    balances,
+    owned_assets,
+    owned_assets_prices,
+    target_assets,
+    target_assets_weights,
+    target_assets_prices,
+    tolerance=None,
+):
+    """
+    Plans every leg of a rebalance from one balance snapshot, assuming every
+    sell fills at its quoted amount out.
+    """
+    owned_assets_prices = uint_list(owned_assets_prices)
+    target_assets_weights = uint_list(target_assets_weights)
+    target_assets_prices = uint_list(target_assets_prices)
+    plan = plan_sells(
+        balances,
+        owned_assets,
+        owned_assets_prices,
+        target_assets,
+        target_assets_weights,
+        target_assets_prices,
+        tolerance,
+    )
+    weth_balance = (
+        balances.weth_balance
+        + sum(plan["sellListAmountsOut"])
+        + sum(plan["adjustToSellListAmountsOut"])
+    )
+    return plan_buys(plan, balances, weth_balance)
@@ -0,0 +1,145 @@
+"""
+Pair reserves kept across rebalances. Pairs are first read with one batch of
+getReserves calls, then kept current from the Sync events every pair emits
+whenever its reserves change, so moving to a new block costs one eth_getLogs
+request rather than a getReserves call per pair.
+"""
+
+from scripts.utils.rpc_batch import BatchCaller, decode_result, encode_call
+from scripts.utils.simulation import event_topic
+
+SYNC_EVENT = "Sync(uint112,uint112)"
+# Entries not refreshed by a read or a Sync for this many blocks, about an
+# hour on BSC, are dropped and read again when next asked for
+DEFAULT_RESERVE_MAX_AGE_BLOCKS = 1200
+# Block ranges wider than this are not replayed from logs, as nodes cap the
+# range of eth_getLogs; the cache starts over instead
+DEFAULT_MAX_LOG_BLOCKS = 5000
+
+
+def decode_sync(log):
+    """
+    @return reserves is the (reserve0, reserve1) of a Sync log.
+    """
+    data = log["data"]
+    if isinstance(data, str):
+        data = bytes.fromhex(data[2:])
+    return tuple(decode_result(["uint112", "uint112"], data))
+
+
+class ReserveCache:
+    """
+    Reserves of pairs as of one block, keyed by pair address in lowercase.
+    """
+
+    def __init__(
+        self,
+        batch_caller=None,
+        max_age_blocks=DEFAULT_RESERVE_MAX_AGE_BLOCKS,
+        max_log_blocks=DEFAULT_MAX_LOG_BLOCKS,
+    ):
+        self.batch_caller = batch_caller if batch_caller is not None else BatchCaller()
+        self.max_age_blocks = max_age_blocks
+        self.max_log_blocks = max_log_blocks
+        # The block every entry is current as of
+        self.block = None
+        # pair to (reserve0, reserve1, block the entry was last refreshed at)
+        self.entries = {}
+        self.reads = 0
+        self.syncs = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def latest_block(self):
+        return int(self.batch_caller.request("eth_blockNumber", []), 16)
+
+    def evict(self):
+        for pair, (reserve0, reserve1, block) in list(self.entries.items()):
+            if self.block - block > self.max_age_blocks:
+                del self.entries[pair]
+                self.evictions += 1
+
+    def reset(self):
+        self.entries.clear()
+        self.block = None
+
+    def sync(self, block):
+        """
+        Moves the cache to block, applying the Sync logs of cached pairs from
+        the blocks in between and evicting entries past their age.
+        """
+        if self.block is not None and block < self.block:
+            # Reserves cannot be rolled back from logs
+            self.reset()
+        if self.block is None or block - self.block > self.max_log_blocks:
+            self.entries.clear()
+            self.block = block
+            return
+        if block == self.block:
+            return
+
+        if len(self.entries) > 0:
+            logs = self.batch_caller.request(
+                "eth_getLogs",
+                [
+                    {
+                        "fromBlock": hex(self.block + 1),
+                        "toBlock": hex(block),
+                        "address": list(self.entries.keys()),
+                        "topics": [event_topic(SYNC_EVENT)],
+                    }
+                ],
+            )
+            logs = [log for log in logs if not log.get("removed", False)]
+            logs.sort(
+                key=lambda log: (int(log["blockNumber"], 16), int(log["logIndex"], 16))
+            )
+            for log in logs:
+                pair = log["address"].lower()
+                if pair in self.entries:
+                    reserve0, reserve1 = decode_sync(log)
+                    self.entries[pair] = (
+                        reserve0,
+                        reserve1,
+                        int(log["blockNumber"], 16),
+                    )
+                    self.syncs += 1
+        self.block = block
+        self.evict()
+
+    def load(self, pairs):
+        """
+        Reads the pairs not yet cached with one batch of getReserves calls.
+        Pairs without code or whose call reverts are not cached.
+        """
+        pairs = list(dict.fromkeys(pair.lower() for pair in pairs))
+        missing = [pair for pair in pairs if pair not in self.entries]
+        if len(missing) == 0:
+            return
+        results = self.batch_caller.call_many(
+            [(pair, encode_call("getReserves()")) for pair in missing], self.block
+        )
+        for pair, result in zip(missing, results):
+            reserves = decode_result(["uint112", "uint112", "uint32"], result)
+            if reserves is not None:
+                self.entries[pair] = (reserves[0], reserves[1], self.block)
+                self.reads += 1
+
+    def get_reserves(self, pairs, block="latest"):
+        """
+        @param pairs is a list of pair addresses.
+        @param block is the block number to read at, or "latest".
+        @return reserves is a list of (reserve0, reserve1), or None where the
+        pair has no reserves to read, in the same order as pairs.
+        """
+        if block == "latest":
+            block = self.latest_block()
+        self.sync(block)
+        self.load(pairs)
+        reserves = []
+        for pair in pairs:
+            entry = self.entries.get(pair.lower())
+            reserves.append(None if entry is None else entry[0:2])
+        return reserves
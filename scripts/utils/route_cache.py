@@ -0,0 +1,232 @@
+"""
+Routes kept across deposits and rebalances. The best factory and path for a
+swap rarely change between blocks for similar amounts, so a route found by
+getLiquidPaths is kept per (tokenIn, tokenOut, amountType, amount bucket) and
+only re-quoted on the current reserves while it is young. getLiquidPaths is
+called again only for swaps without a young route, or whose re-quote moved
+further than the tolerance from the quote the route was found with.
+"""
+
+import math
+from collections import OrderedDict
+from scripts.utils.dex import AMOUNT_TYPE_EXACT_IN
+from scripts.utils.liquid_path import ReserveSnapshot, load_reserves
+from scripts.utils.quote_engine import quote_exact_in, quote_exact_out
+from scripts.utils.rpc_batch import BatchCaller
+
+# About five minutes of BSC blocks
+DEFAULT_ROUTE_MAX_AGE_BLOCKS = 100
+DEFAULT_ROUTE_CACHE_SIZE = 4096
+# Amounts within a bucket differ by at most a factor of 10 ** (1 / 4)
+DEFAULT_BUCKETS_PER_DECADE = 4
+# Largest move in the amount per unit swapped before a route is found again
+DEFAULT_ROUTE_DEVIATION_BPS = 50
+
+
+def amount_bucket(amount, buckets_per_decade=DEFAULT_BUCKETS_PER_DECADE):
+    if amount <= 0:
+        return -1
+    return int(math.log10(amount) * buckets_per_decade)
+
+
+class CachedRoute:
+    """
+    A route found by getLiquidPaths, with the amount it was asked and quoted
+    for and the block it was found at.
+    """
+
+    __slots__ = ("factory", "path", "token_amount", "amount", "block")
+
+    def __init__(self, factory, path, token_amount, amount, block):
+        self.factory = factory
+        self.path = path
+        self.token_amount = token_amount
+        self.amount = amount
+        self.block = block
+
+    def deviation_bps(self, token_amount, amount):
+        """
+        @return deviation is how far amount per token_amount is from the
+        route's quote per amount asked, in basis points.
+        """
+        expected = self.amount * token_amount
+        return abs(amount * self.token_amount - expected) * 10000 / expected
+
+
+class RouteCache:
+    """
+    Block age and LRU bounded cache of CachedRoutes keyed by (tokenIn,
+    tokenOut, amountType, amount bucket).
+    """
+
+    def __init__(
+        self,
+        max_age_blocks=DEFAULT_ROUTE_MAX_AGE_BLOCKS,
+        maxsize=DEFAULT_ROUTE_CACHE_SIZE,
+        buckets_per_decade=DEFAULT_BUCKETS_PER_DECADE,
+        deviation_bps=DEFAULT_ROUTE_DEVIATION_BPS,
+    ):
+        self.max_age_blocks = max_age_blocks
+        self.maxsize = maxsize
+        self.buckets_per_decade = buckets_per_decade
+        self.deviation_bps = deviation_bps
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.deviations = 0
+        self.evictions = 0
+        self.fetches = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key(self, order):
+        token_in, token_out, token_amount, amount_type = order
+        return (
+            token_in.lower(),
+            token_out.lower(),
+            amount_type,
+            amount_bucket(token_amount, self.buckets_per_decade),
+        )
+
+    def get(self, order, block):
+        key = self.key(order)
+        entry = self.entries.get(key)
+        if entry is not None:
+            if block - entry.block <= self.max_age_blocks:
+                self.entries.move_to_end(key)
+                return entry
+            del self.entries[key]
+        return None
+
+    def set(self, order, factory, path, amount, block):
+        key = self.key(order)
+        self.entries[key] = CachedRoute(factory, path, order[2], amount, block)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "deviations": self.deviations,
+            "evictions": self.evictions,
+            "fetches": self.fetches,
+            "size": len(self.entries),
+        }
+
+
+class ReserveQuoter:
+    """
+    Quotes given paths from one snapshot of their pair reserves, with the
+    PolybitSwapLibrary math.
+    """
+
+    def __init__(self, batch_caller=None, pair_index=None, reserve_cache=None):
+        self.batch_caller = batch_caller if batch_caller is not None else BatchCaller()
+        self.pair_index = pair_index
+        self.reserve_cache = reserve_cache
+
+    def latest_block(self):
+        return int(self.batch_caller.request("eth_blockNumber", []), 16)
+
+    def quote_paths(self, quotes, block):
+        """
+        @param quotes is a list of (factory, path, token_amount, amount_type).
+        @return amounts is the amount out of each exact amount in, or amount
+        in of each exact amount out, or None where the swap would revert.
+        """
+        snapshot = ReserveSnapshot(block)
+        factory_pairs = {}
+        for factory, path, token_amount, amount_type in quotes:
+            pairs = factory_pairs.setdefault(factory, [])
+            pairs += [(path[i], path[i + 1]) for i in range(0, len(path) - 1)]
+        for factory, pairs in factory_pairs.items():
+            load_reserves(
+                snapshot,
+                [factory],
+                pairs,
+                self.batch_caller,
+                block,
+                pair_index=self.pair_index,
+                reserve_cache=self.reserve_cache,
+            )
+
+        amounts = [None] * len(quotes)
+        for exact_in, quote in [(True, quote_exact_in), (False, quote_exact_out)]:
+            items = [
+                i
+                for i, item in enumerate(quotes)
+                if (item[3] == AMOUNT_TYPE_EXACT_IN) == exact_in
+            ]
+            quoted = quote(
+                snapshot,
+                [(quotes[i][0], quotes[i][1]) for i in items],
+                [quotes[i][2] for i in items],
+            )
+            for i, amount in zip(items, quoted):
+                amounts[i] = amount
+        return amounts
+
+
+class CachedRouter:
+    """
+    Wraps a PolybitLiquidPath, or anything answering getLiquidPaths, so that
+    swaps with a young cached route are re-quoted rather than routed again.
+    """
+
+    def __init__(self, router, cache=None, quoter=None):
+        self.router = router
+        self.cache = cache if cache is not None else RouteCache()
+        self.quoter = quoter if quoter is not None else ReserveQuoter()
+
+    def getLiquidPaths(self, swap_orders):
+        """
+        @param swap_orders is the SwapOrders[] argument of the contract call.
+        @return factories, paths, amounts
+        """
+        orders = [list(order) for order in swap_orders[0][0]]
+        block = self.quoter.latest_block()
+        results = [None] * len(orders)
+
+        cached = []
+        for i, order in enumerate(orders):
+            entry = self.cache.get(order, block)
+            if entry is not None:
+                cached.append((i, entry))
+        if len(cached) > 0:
+            amounts = self.quoter.quote_paths(
+                [
+                    (entry.factory, entry.path, orders[i][2], orders[i][3])
+                    for i, entry in cached
+                ],
+                block,
+            )
+            for (i, entry), amount in zip(cached, amounts):
+                if amount is None or amount == 0:
+                    continue
+                if entry.deviation_bps(orders[i][2], amount) > self.cache.deviation_bps:
+                    self.cache.deviations += 1
+                    continue
+                results[i] = (entry.factory, entry.path, amount)
+                self.cache.hits += 1
+
+        missing = [i for i in range(0, len(orders)) if results[i] is None]
+        self.cache.misses += len(missing)
+        if len(missing) > 0:
+            factories, paths, amounts = self.router.getLiquidPaths(
+                [[[orders[i] for i in missing]]]
+            )
+            self.cache.fetches += 1
+            for i, factory, path, amount in zip(missing, factories, paths, amounts):
+                results[i] = (factory, list(path), amount)
+                if len(path) > 0 and amount > 0:
+                    self.cache.set(orders[i], factory, list(path), amount, block)
+
+        return (
+            [result[0] for result in results],
+            [result[1] for result in results],
+            [result[2] for result in results],
+        )
@@ -0,0 +1,139 @@
+"""
+Route search over the pairs of a ReserveSnapshot. Where PolybitLiquidPath
+only tries the direct pair and one intermediate from its baseTokens, skipping
+the first, RouteSearch treats the pairs as a graph and tries every path of up
+to max_hops pairs through a configurable set of hop tokens. Pairs whose hop
+token reserve is below its minimum are pruned, so the paths tried stay few as
+the token universe grows.
+
+Each path is quoted on one factory, as a swap in orderData executes its whole
+path on a single factory, and the best path of any factory is chosen.
+"""
+
+from scripts.utils.dex import (
+    AMOUNT_TYPE_EXACT_IN,
+    AMOUNT_TYPE_EXACT_OUT,
+    BASE_TOKENS,
+    BUSD_ADDRESS,
+    USDC_ADDRESS,
+    USDT_ADDRESS,
+    WETH_ADDRESS,
+    ZERO_ADDRESS,
+)
+from scripts.utils.liquid_path import SwapLibraryError, is_better, same_token
+
+DEFAULT_MAX_HOPS = 3
+DEFAULT_HOP_TOKENS = [WETH_ADDRESS] + BASE_TOKENS
+# Smallest reserve of a hop token in a pair used as an intermediate hop
+DEFAULT_MIN_HOP_RESERVES = {
+    WETH_ADDRESS: 10 * 10**18,
+    BUSD_ADDRESS: 3000 * 10**18,
+    USDT_ADDRESS: 3000 * 10**18,
+    USDC_ADDRESS: 3000 * 10**18,
+}
+
+
+class RouteSearch:
+    """
+    Searches paths of up to max_hops pairs on each factory, through hop_tokens.
+    """
+
+    def __init__(
+        self,
+        hop_tokens=DEFAULT_HOP_TOKENS,
+        max_hops=DEFAULT_MAX_HOPS,
+        min_hop_reserves=DEFAULT_MIN_HOP_RESERVES,
+    ):
+        self.hop_tokens = list(hop_tokens)
+        self.max_hops = max_hops
+        self.min_hop_reserves = {
+            token.lower(): reserve for token, reserve in min_hop_reserves.items()
+        }
+
+    def candidate_pairs(self, token_in, token_out):
+        """
+        @return pairs is every pair a path from token_in to token_out through
+        hop tokens could use.
+        """
+        pairs = [(token_in, token_out)]
+        for i, hop_token in enumerate(self.hop_tokens):
+            pairs += [(token_in, hop_token), (hop_token, token_out)]
+            for other in self.hop_tokens[i + 1 :]:
+                pairs.append((hop_token, other))
+        return pairs
+
+    def is_liquid(self, snapshot, factory, token_a, token_b):
+        """
+        @return liquid is True if the pair exists and holds at least the
+        minimum reserve of each hop token in it.
+        """
+        if same_token(snapshot.pair_for(factory, token_a, token_b), ZERO_ADDRESS):
+            return False
+        try:
+            reserve_a, reserve_b = snapshot.get_reserves(factory, token_a, token_b)
+        except SwapLibraryError:
+            return False
+        return reserve_a >= self.min_hop_reserves.get(
+            token_a.lower(), 1
+        ) and reserve_b >= self.min_hop_reserves.get(token_b.lower(), 1)
+
+    def paths(self, snapshot, factory, token_in, token_out):
+        """
+        @return paths is every path of two to max_hops pairs from token_in to
+        token_out through liquid pairs of hop tokens, with no token twice.
+        """
+        hop_tokens = [
+            token
+            for token in self.hop_tokens
+            if not same_token(token, token_in) and not same_token(token, token_out)
+        ]
+        # Which hop tokens each token reaches over a liquid pair, worked out
+        # once per factory and search
+        edges = {}
+
+        def neighbours(token):
+            key = token.lower()
+            if key not in edges:
+                edges[key] = [
+                    hop_token
+                    for hop_token in hop_tokens
+                    if not same_token(hop_token, token)
+                    and self.is_liquid(snapshot, factory, token, hop_token)
+                ]
+            return edges[key]
+
+        paths = []
+        stack = [[token_in]]
+        while len(stack) > 0:
+            path = stack.pop()
+            hops = len(path) - 1
+            if hops > 0 and self.is_liquid(snapshot, factory, path[-1], token_out):
+                paths.append(path + [token_out])
+            if hops + 2 > self.max_hops:
+                continue
+            for hop_token in neighbours(path[-1]):
+                if not any(same_token(hop_token, token) for token in path):
+                    stack.append(path + [hop_token])
+        return paths
+
+    def best_path(
+        self, snapshot, quote, factory, token_in, token_out, token_amount, amount_type
+    ):
+        """
+        @param quote is a function of (factory, amount, path, amount_type) to
+        the path's amount, or None where it cannot be swapped.
+        @return path, amount of the best path on factory, or [], 0.
+        """
+        best_path, best_amount = [], 0
+        if amount_type not in [AMOUNT_TYPE_EXACT_IN, AMOUNT_TYPE_EXACT_OUT]:
+            return best_path, best_amount
+        paths = self.paths(snapshot, factory, token_in, token_out)
+        if not same_token(
+            snapshot.pair_for(factory, token_in, token_out), ZERO_ADDRESS
+        ):
+            paths.insert(0, [token_in, token_out])
+        for path in paths:
+            amount = quote(factory, token_amount, path, amount_type)
+            if is_better(amount, best_amount, amount_type):
+                best_path, best_amount = path, amount
+        return best_path, best_amount
@@ -0,0 +1,116 @@
+import json
+import urllib.request
+
+DEFAULT_MAX_BATCH_SIZE = 500
+
+
+class RpcBatchError(Exception):
+    def __init__(self, message, error=None):
+        super().__init__(message)
+        # The JSON-RPC error object, holding revert data where the node gives it
+        self.error = error
+
+
+def encode_call(signature, arg_types=(), args=()):
+    """
+    @param signature is the canonical function signature e.g. "getPair(address,address)".
+    @return calldata is the 4 byte selector followed by the ABI encoded arguments.
+    """
+    from eth_abi import encode_abi
+    from eth_utils import keccak
+
+    selector = keccak(text=signature)[:4]
+    return bytes(selector) + encode_abi(list(arg_types), list(args))
+
+
+def decode_result(result_types, data):
+    if data is None or len(data) == 0:
+        return None
+    from eth_abi import decode_abi
+
+    return decode_abi(list(result_types), data)
+
+
+def get_default_endpoint_uri():
+    from brownie import web3
+
+    return web3.provider.endpoint_uri
+
+
+class BatchCaller:
+    """
+    Sends many eth_calls to a node as JSON-RPC batch requests, so a whole
+    basket of view calls costs one HTTP round trip instead of one per call.
+    """
+
+    def __init__(
+        self, endpoint_uri=None, timeout=60, max_batch_size=DEFAULT_MAX_BATCH_SIZE
+    ):
+        self.endpoint_uri = endpoint_uri
+        self.timeout = timeout
+        self.max_batch_size = max_batch_size
+        self.round_trips = 0
+
+    def get_endpoint_uri(self):
+        if self.endpoint_uri is None:
+            self.endpoint_uri = get_default_endpoint_uri()
+        return self.endpoint_uri
+
+    def post(self, payload):
+        request = urllib.request.Request(
+            self.get_endpoint_uri(),
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = json.load(response)
+        except Exception as e:
+            raise RpcBatchError(f"JSON-RPC batch request failed: {e}")
+        self.round_trips += 1
+        if not isinstance(body, list):
+            raise RpcBatchError(f"Unexpected JSON-RPC batch response: {body}")
+        return body
+
+    def call_many(self, calls, block="latest"):
+        """
+        @param calls is a list of (to, calldata) tuples.
+        @param block is a block number or tag shared by every call in the batch.
+        @return results is a list of return data bytes, or None where the call
+        reverted, in the same order as calls.
+        """
+        if isinstance(block, int):
+            block = hex(block)
+
+        results = []
+        for start in range(0, len(calls), self.max_batch_size):
+            batch = calls[start : start + self.max_batch_size]
+            payload = [
+                {
+                    "jsonrpc": "2.0",
+                    "id": i,
+                    "method": "eth_call",
+                    "params": [{"to": to, "data": "0x" + bytes(data).hex()}, block],
+                }
+                for i, (to, data) in enumerate(batch)
+            ]
+            responses = {response["id"]: response for response in self.post(payload)}
+
+            for i in range(0, len(batch)):
+                response = responses.get(i, {})
+                if "result" in response:
+                    results.append(bytes.fromhex(response["result"][2:]))
+                else:
+                    results.append(None)
+
+        return results
+
+    def request(self, method, params):
+        response = self.post(
+            [{"jsonrpc": "2.0", "id": 0, "method": method, "params": params}]
+        )[0]
+        if "error" in response:
+            raise RpcBatchError(
+                f"{method} failed: {response['error']}", response["error"]
+            )
+        return response["result"]
@@ -0,0 +1,339 @@
+"""
+Dry runs an encoded rebalanceDETF before it is sent. On a live node the call
+is traced with debug_traceCall, giving the gas used, the revert reason, the
+DETF events and, from the ERC20 Transfer logs, the balances the DETF would
+hold afterwards. On a local fork the transaction is sent between a chain
+snapshot and revert instead.
+"""
+
+from functools import lru_cache
+from scripts.utils.dex import WETH_ADDRESS, to_checksum_address
+from scripts.utils.order_data import get_selector
+from scripts.utils.rebalance_planner import DETFBalances, same_address
+from scripts.utils.rpc_batch import BatchCaller, RpcBatchError
+
+# Non-indexed arguments of the PolybitDETF events decoded from a trace
+DETF_EVENT_TYPES = {
+    "LiquidityTest(string)": ["string"],
+    "OwnedAssets(string,address[])": ["string", "address[]"],
+}
+TRANSFER_EVENT = "Transfer(address,address,uint256)"
+ERROR_SIGNATURE = "Error(string)"
+# JSON-RPC code of nodes that do not serve debug_traceCall
+METHOD_NOT_FOUND = -32601
+
+
+class SimulationError(Exception):
+    """
+    Raised when the failure predicate blocks a simulated call from being sent.
+    """
+
+    def __init__(self, message, result):
+        super().__init__(message)
+        self.result = result
+
+
+@lru_cache(maxsize=None)
+def event_topic(signature):
+    from eth_utils import keccak
+
+    return "0x" + keccak(text=signature).hex()
+
+
+@lru_cache(maxsize=None)
+def detf_events():
+    """
+    @return events is a dict of topic to (event name, argument types).
+    """
+    return {
+        event_topic(signature): (signature.split("(")[0], arg_types)
+        for signature, arg_types in DETF_EVENT_TYPES.items()
+    }
+
+
+class SimulationResult:
+    """
+    What a call would do if sent at the simulated block.
+    """
+
+    def __init__(
+        self, reverted, revert_reason, gas_used, events=(), balances=None, traced=True
+    ):
+        self.reverted = reverted
+        self.revert_reason = revert_reason
+        self.gas_used = gas_used
+        # (event name, decoded arguments) in emission order
+        self.events = list(events)
+        # DETFBalances after the call, or None where it could not be traced
+        self.balances = balances
+        # False when the node only gave eth_estimateGas
+        self.traced = traced
+
+    def event_args(self, name):
+        return [args for event_name, args in self.events if event_name == name]
+
+    def report(self):
+        print("Simulation reverted", self.reverted, "reason", self.revert_reason)
+        print("Simulation gas used", self.gas_used)
+        for name, args in self.events:
+            print("Simulated event", name, args)
+
+
+def decode_revert_reason(data):
+    """
+    @return reason is the Error(string) message of revert data, or None.
+    """
+    from eth_abi import decode_abi
+
+    if isinstance(data, str):
+        data = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+    if data is None or data[:4] != get_selector(ERROR_SIGNATURE):
+        return None
+    return decode_abi(["string"], data[4:])[0]
+
+
+def error_revert_reason(error):
+    """
+    @return reason from a JSON-RPC error object, which carries the revert data
+    or the reason in its message depending on the node.
+    """
+    if error is None:
+        return None
+    data = error.get("data")
+    if isinstance(data, dict):
+        data = data.get("data")
+    if isinstance(data, str):
+        try:
+            reason = decode_revert_reason(data)
+        except ValueError:
+            reason = None
+        if reason is not None:
+            return reason
+    return error.get("message")
+
+
+def ordered_logs(frame):
+    """
+    @return logs is every log of a callTracer frame and its subcalls in
+    emission order, leaving out frames that reverted.
+    """
+    if "error" in frame:
+        return []
+    calls = frame.get("calls", [])
+    own_logs = frame.get("logs", [])
+    logs = []
+    j = 0
+    for i in range(0, len(calls)):
+        # A log at position i was emitted before subcall i
+        while j < len(own_logs) and int(own_logs[j].get("position", "0x0"), 16) <= i:
+            logs.append(own_logs[j])
+            j += 1
+        logs += ordered_logs(calls[i])
+    return logs + own_logs[j:]
+
+
+def topic_address(topic):
+    return "0x" + topic[-40:]
+
+
+def decode_events(detf_address, logs):
+    from eth_abi import decode_abi
+
+    events = []
+    for log in logs:
+        if not same_address(log["address"], detf_address) or len(log["topics"]) == 0:
+            continue
+        event = detf_events().get(log["topics"][0].lower())
+        if event is None:
+            continue
+        name, arg_types = event
+        events.append((name, decode_abi(arg_types, bytes.fromhex(log["data"][2:]))))
+    return events
+
+
+def balance_changes(detf_address, logs):
+    """
+    @return changes is a dict of lowercase token address to the net amount of
+    it Transferred to the DETF.
+    """
+    changes = {}
+    transfer = event_topic(TRANSFER_EVENT)
+    for log in logs:
+        if len(log["topics"]) != 3 or log["topics"][0].lower() != transfer:
+            continue
+        amount = int(log["data"], 16)
+        token = log["address"].lower()
+        if same_address(topic_address(log["topics"][1]), detf_address):
+            changes[token] = changes.get(token, 0) - amount
+        if same_address(topic_address(log["topics"][2]), detf_address):
+            changes[token] = changes.get(token, 0) + amount
+    return changes
+
+
+def post_balances(balances, changes, owned_assets=None):
+    """
+    @param balances is the DETFBalances the call was simulated against. Tokens
+    it has no decimals for can only be read raw from the result.
+    @return balances is a DETFBalances with the changes applied.
+    """
+    token_balances = dict(balances.token_balances)
+    weth_balance = balances.weth_balance
+    for token, change in changes.items():
+        if same_address(token, WETH_ADDRESS):
+            weth_balance += change
+        else:
+            token_balances[token] = token_balances.get(token, 0) + change
+    if owned_assets is None:
+        received = [
+            to_checksum_address(token)
+            for token in changes
+            if not same_address(token, WETH_ADDRESS)
+            and not any(same_address(token, owned) for owned in balances.owned_assets)
+        ]
+        owned_assets = [
+            token
+            for token in list(balances.owned_assets) + received
+            if token_balances.get(token.lower(), 0) > 0
+        ]
+    return DETFBalances(
+        owned_assets,
+        token_balances,
+        balances.token_decimals,
+        weth_balance,
+        balances.eth_balance,
+    )
+
+
+def simulate_call(call, sender, balances=None, batch_caller=None, block="latest"):
+    """
+    Traces an EncodedCall with debug_traceCall, falling back to eth_estimateGas
+    on nodes that do not serve it.
+
+    @param balances is the DETFBalances of the call's target before the call.
+    @return result is a SimulationResult.
+    """
+    if batch_caller is None:
+        batch_caller = BatchCaller()
+    if isinstance(block, int):
+        block = hex(block)
+    try:
+        trace = batch_caller.request(
+            "debug_traceCall",
+            [
+                call.tx_params(sender),
+                block,
+                {"tracer": "callTracer", "tracerConfig": {"withLog": True}},
+            ],
+        )
+    except RpcBatchError as e:
+        if e.error is None or e.error.get("code") != METHOD_NOT_FOUND:
+            raise
+        return estimate_call(call, sender, batch_caller)
+
+    gas_used = int(trace.get("gasUsed", "0x0"), 16)
+    if "error" in trace:
+        reason = trace.get("revertReason")
+        if reason is None:
+            reason = decode_revert_reason(trace.get("output", "0x")) or trace["error"]
+        return SimulationResult(True, reason, gas_used)
+
+    logs = ordered_logs(trace)
+    events = decode_events(call.to, logs)
+    post = None
+    if balances is not None:
+        owned = [args[1] for name, args in events if name == "OwnedAssets"]
+        post = post_balances(
+            balances,
+            balance_changes(call.to, logs),
+            list(owned[-1]) if len(owned) > 0 else None,
+        )
+    return SimulationResult(False, None, gas_used, events, post)
+
+
+def estimate_call(call, sender, batch_caller):
+    """
+    @return result is a SimulationResult with only the revert and the gas.
+    """
+    try:
+        gas_used = call.estimate_gas(sender, batch_caller)
+    except RpcBatchError as e:
+        return SimulationResult(True, error_revert_reason(e.error), 0, traced=False)
+    return SimulationResult(False, None, gas_used, traced=False)
+
+
+def simulate_on_fork(call, account, read_balances=None):
+    """
+    Sends the call on a local fork between brownie chain.snapshot and
+    chain.revert, so nothing it does is kept.
+
+    @param read_balances returns the DETFBalances after the call.
+    """
+    from brownie import chain
+    from brownie.exceptions import VirtualMachineError
+
+    chain.snapshot()
+    try:
+        try:
+            tx = call.transact(account)
+            tx.wait(1)
+        except VirtualMachineError as e:
+            return SimulationResult(True, e.revert_msg, 0)
+        if tx.status == 0:
+            return SimulationResult(True, tx.revert_msg, tx.gas_used)
+        events = [(event.name, tuple(event.values())) for event in tx.events]
+        return SimulationResult(
+            False,
+            None,
+            tx.gas_used,
+            events,
+            read_balances() if read_balances is not None else None,
+        )
+    finally:
+        chain.revert()
+
+
+def reverted(result):
+    if result.reverted:
+        return f"Simulation reverted: {result.revert_reason}"
+    return None
+
+
+def unroutable_swaps(result):
+    messages = result.event_args("LiquidityTest")
+    if len(messages) > 0:
+        return f"Simulation left {len(messages)} swaps unrouted"
+    return None
+
+
+def gas_above(gas_limit):
+    def predicate(result):
+        if result.gas_used > gas_limit:
+            return f"Simulation gas {result.gas_used} above {gas_limit}"
+        return None
+
+    return predicate
+
+
+def any_of(*predicates):
+    def predicate(result):
+        for p in predicates:
+            message = p(result)
+            if message is not None:
+                return message
+        return None
+
+    return predicate
+
+
+DEFAULT_FAILURE_PREDICATE = any_of(reverted, unroutable_swaps)
+
+
+def check_simulation(result, failure_predicate=DEFAULT_FAILURE_PREDICATE):
+    """
+    @param failure_predicate returns why a SimulationResult must not be sent,
+    or None to send it.
+    """
+    message = failure_predicate(result)
+    if message is not None:
+        raise SimulationError(message, result)
+    return result
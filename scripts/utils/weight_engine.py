@@ -0,0 +1,296 @@
+"""
+Vectorised counterpart of rebalance_planner for baskets of 100+ assets. Amounts
+are held in NumPy object arrays of Python ints, so every product is exact and
+checked against uint256 the way PolybitRebalancer's checked arithmetic would
+revert. Plans are identical to rebalance_planner for baskets without duplicate
+target assets.
+"""
+
+import numpy as np
+from scripts.utils.dex import ZERO_ADDRESS
+from scripts.utils.rebalance_planner import (
+    BPS_SCALE,
+    WEIGHT_SCALE,
+    UINT256_MAX,
+    RebalancerError,
+    empty_plan,
+)
+
+
+def uint_array(values):
+    return np.array([int(value) for value in values], dtype=object)
+
+
+def address_keys(addresses):
+    if len(addresses) == 0:
+        return np.array([], dtype="<U42")
+    return np.char.lower(np.array(addresses, dtype="<U42"))
+
+
+def check_uint256(values):
+    if len(values) > 0 and (values.max() > UINT256_MAX or values.min() < 0):
+        raise RebalancerError("Arithmetic overflow or underflow")
+    return values
+
+
+def floor_div(a, b):
+    if np.any(b == 0):
+        raise RebalancerError("Division by zero")
+    return a // b
+
+
+def take(values, mask):
+    return values[mask].tolist()
+
+
+class BalanceArrays:
+    """
+    Balances and decimal scales of a DETFBalances snapshot, gathered into
+    arrays for a list of token addresses.
+    """
+
+    def __init__(self, balances, token_addresses):
+        keys = [token.lower() for token in token_addresses]
+        missing = [
+            token
+            for token, key in zip(token_addresses, keys)
+            if key not in balances.token_balances
+        ]
+        if len(missing) > 0:
+            raise RebalancerError(f"No balance in snapshot for {missing}")
+        self.token_balances = uint_array([balances.token_balances[key] for key in keys])
+        self.decimal_scales = uint_array(
+            [10 ** balances.token_decimals[key] for key in keys]
+        )
+
+    def in_weth(self, prices):
+        """
+        @return balances in WETH as PolybitDETF.getTokenBalance.
+        """
+        return check_uint256(self.token_balances * prices) // self.decimal_scales
+
+
+def is_within_tolerance(tolerance, total_balance, percentages, weights):
+    """
+    Vectorised DriftTolerance.is_within.
+    """
+    drift = np.where(
+        percentages > weights, percentages - weights, weights - percentages
+    )
+    within_bps = (drift < tolerance.bps * (WEIGHT_SCALE // BPS_SCALE)).astype(bool)
+    # The contract only reaches the notional product for legs beyond the bps
+    notional = drift * total_balance
+    check_uint256(notional[~within_bps])
+    within = within_bps | (notional // WEIGHT_SCALE < tolerance.min_weth_notional)
+    return within.astype(bool)
+
+
+def plan_sells(
+    balances,
+    owned_assets,
+    owned_assets_prices,
+    target_assets,
+    target_assets_weights,
+    target_assets_prices,
+    tolerance=None,
+):
+    """
+    Vectorised rebalance_planner.plan_sells.
+    """
+    if len(owned_assets) != len(owned_assets_prices):
+        raise RebalancerError("Price information incorrect")
+    if len(target_assets) != len(target_assets_weights):
+        raise RebalancerError("Target weight information incorrect")
+    if len(target_assets) != len(target_assets_prices):
+        raise RebalancerError("Target price information incorrect")
+
+    owned = np.array(list(owned_assets), dtype=object)
+    target = np.array(list(target_assets), dtype=object)
+    owned_keys = address_keys(owned_assets)
+    target_keys = address_keys(target_assets)
+    if len(np.unique(target_keys)) != len(target_keys):
+        raise RebalancerError("Duplicate target assets")
+    owned_prices = uint_array(owned_assets_prices)
+    target_weights = uint_array(target_assets_weights)
+    target_prices = uint_array(target_assets_prices)
+
+    zero = ZERO_ADDRESS.lower()
+    owned_is_target = np.isin(owned_keys, target_keys)
+    target_is_owned = np.isin(target_keys, owned_keys)
+
+    plan = empty_plan()
+    if len(target) == 0:
+        sell_mask = np.ones(len(owned), dtype=bool)
+    else:
+        sell_mask = ~owned_is_target & (owned_keys != zero)
+    plan["sellList"] = take(owned, sell_mask)
+    plan["sellListPrices"] = take(owned_prices, sell_mask)
+
+    adjust_mask = owned_is_target & (owned_keys != zero)
+    # Position of each owned asset in the target list
+    target_index = {key: i for i, key in enumerate(target_keys.tolist())}
+    adjust_weights = uint_array(
+        [target_weights[target_index[key]] for key in owned_keys[adjust_mask].tolist()]
+    )
+    plan["adjustList"] = take(owned, adjust_mask)
+    plan["adjustListWeights"] = adjust_weights.tolist()
+    plan["adjustListPrices"] = take(owned_prices, adjust_mask)
+
+    if len(owned) == 0:
+        buy_mask = np.ones(len(target), dtype=bool)
+    else:
+        buy_mask = ~target_is_owned & (target_keys != zero)
+    plan["buyList"] = take(target, buy_mask)
+    plan["buyListWeights"] = take(target_weights, buy_mask)
+    plan["buyListPrices"] = take(target_prices, buy_mask)
+
+    owned_balances = BalanceArrays(balances, owned_assets)
+    owned_in_weth = owned_balances.in_weth(owned_prices)
+    # PolybitDETF.getTotalBalanceInWeth sums the assets the DETF itself owns
+    if list(owned_assets) == balances.owned_assets:
+        detf_in_weth = owned_in_weth
+    else:
+        detf_in_weth = BalanceArrays(balances, balances.owned_assets).in_weth(
+            owned_prices
+        )
+    total_balance = detf_in_weth.sum() + balances.eth_balance + balances.weth_balance
+    if total_balance == 0 and np.any(adjust_mask):
+        raise RebalancerError("Division by zero")
+
+    adjust_in_weth = owned_in_weth[adjust_mask]
+    adjust_percentages = (
+        check_uint256(WEIGHT_SCALE * adjust_in_weth) // total_balance
+        if np.any(adjust_mask)
+        else adjust_in_weth
+    )
+    to_sell = adjust_percentages > adjust_weights
+    to_buy = adjust_weights > adjust_percentages
+    if tolerance is not None and np.any(adjust_mask):
+        within = is_within_tolerance(
+            tolerance, total_balance, adjust_percentages, adjust_weights
+        )
+        to_sell &= ~within
+        to_buy &= ~within
+    adjust = np.array(plan["adjustList"], dtype=object)
+    adjust_prices = uint_array(plan["adjustListPrices"])
+    plan["adjustToSellList"] = take(adjust, to_sell)
+    plan["adjustToSellWeights"] = take(adjust_weights, to_sell)
+    plan["adjustToSellPrices"] = take(adjust_prices, to_sell)
+    plan["adjustToBuyList"] = take(adjust, to_buy)
+    plan["adjustToBuyWeights"] = take(adjust_weights, to_buy)
+    plan["adjustToBuyPrices"] = take(adjust_prices, to_buy)
+
+    if len(plan["sellList"]) > 0:
+        sell_balances = BalanceArrays(balances, plan["sellList"])
+        plan["sellListAmountsIn"] = sell_balances.token_balances.tolist()
+        plan["sellListAmountsOut"] = sell_balances.in_weth(
+            uint_array(plan["sellListPrices"])
+        ).tolist()
+
+    if np.any(to_sell):
+        token_balances = owned_balances.token_balances[adjust_mask][to_sell]
+        in_weth = adjust_in_weth[to_sell]
+        weights = adjust_weights[to_sell]
+        percentages = adjust_percentages[to_sell]
+        amounts_in = token_balances - floor_div(
+            check_uint256(token_balances * weights), percentages
+        )
+        amounts_out = in_weth - floor_div(check_uint256(in_weth * weights), percentages)
+        plan["adjustToSellListAmountsIn"] = check_uint256(amounts_in).tolist()
+        plan["adjustToSellListAmountsOut"] = check_uint256(amounts_out).tolist()
+
+    return plan
+
+
+def plan_buys(plan, balances, weth_balance):
+    """
+    Vectorised rebalance_planner.plan_buys.
+    """
+    if len(plan["adjustList"]) > 0:
+        adjust_in_weth = BalanceArrays(balances, plan["adjustList"]).in_weth(
+            uint_array(plan["adjustListPrices"])
+        )
+        plan["totalBalance"] = adjust_in_weth.sum() + weth_balance
+
+    adjust_to_buy_weights = uint_array(plan["adjustToBuyWeights"])
+    adjust_to_buy_prices = uint_array(plan["adjustToBuyPrices"])
+    buy_weights = uint_array(plan["buyListWeights"])
+    buy_prices = uint_array(plan["buyListPrices"])
+
+    target_percentages = adjust_to_buy_weights
+    if len(plan["adjustToBuyList"]) > 0:
+        in_weth = BalanceArrays(balances, plan["adjustToBuyList"]).in_weth(
+            adjust_to_buy_prices
+        )
+        if plan["totalBalance"] == 0:
+            raise RebalancerError("Division by zero")
+        target_percentages = adjust_to_buy_weights - (
+            check_uint256(WEIGHT_SCALE * in_weth) // plan["totalBalance"]
+        )
+    buy_keys = address_keys(plan["buyList"])
+    total_target_percentage = int(target_percentages.sum()) + int(
+        buy_weights[buy_keys != ZERO_ADDRESS.lower()].sum()
+    )
+    plan["wethBalance"] = weth_balance
+    plan["totalTargetPercentage"] = total_target_percentage
+
+    if len(plan["adjustToBuyList"]) > 0:
+        check_uint256(target_percentages)
+        amounts_in, amounts_out = size_buys(
+            target_percentages,
+            adjust_to_buy_prices,
+            weth_balance,
+            total_target_percentage,
+        )
+        plan["adjustToBuyListAmountsIn"] = amounts_in
+        plan["adjustToBuyListAmountsOut"] = amounts_out
+
+    if len(plan["buyList"]) > 0:
+        amounts_in, amounts_out = size_buys(
+            buy_weights, buy_prices, weth_balance, total_target_percentage
+        )
+        plan["buyListAmountsIn"] = amounts_in
+        plan["buyListAmountsOut"] = amounts_out
+    return plan
+
+
+def size_buys(target_percentages, prices, weth_balance, total_target_percentage):
+    if total_target_percentage == 0:
+        raise RebalancerError("Division by zero")
+    percentages_of_available_weth = (
+        check_uint256(WEIGHT_SCALE * target_percentages) // total_target_percentage
+    )
+    amounts_in = (
+        check_uint256(weth_balance * percentages_of_available_weth) // WEIGHT_SCALE
+    )
+    amounts_out = floor_div(check_uint256(10**18 * amounts_in), prices)
+    return amounts_in.tolist(), amounts_out.tolist()
+
+
+def plan_rebalance(
+    balances,
+    owned_assets,
+    owned_assets_prices,
+    target_assets,
+    target_assets_weights,
+    target_assets_prices,
+    tolerance=None,
+):
+    """
+    Vectorised rebalance_planner.plan_rebalance.
+    """
+    plan = plan_sells(
+        balances,
+        owned_assets,
+        owned_assets_prices,
+        target_assets,
+        target_assets_weights,
+        target_assets_prices,
+        tolerance,
+    )
+    weth_balance = (
+        balances.weth_balance
+        + sum(plan["sellListAmountsOut"])
+        + sum(plan["adjustToSellListAmountsOut"])
+    )
+    return plan_buys(plan, balances, weth_balance)
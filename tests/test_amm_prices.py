@@ -0,0 +1,76 @@
+import pytest
+from brownie import accounts, MockERC20, MockSwapFactory, MockSwapPair
+from scripts.utils.amm_prices import AmmReservePriceProvider, reserve_price
+from scripts.utils.price_feed import PriceFeedError
+from scripts.utils.rpc_batch import BatchCaller
+
+OWNER = accounts[0]
+
+
+def create_pool(factory, token, weth, reserve_token, reserve_weth):
+    tx = factory.createPair(token, weth, {"from": OWNER})
+    tx.wait(1)
+    pair = MockSwapPair.at(factory.getPair(token, weth))
+    if pair.token0() == token.address:
+        pair.setReserves(reserve_token, reserve_weth, {"from": OWNER})
+    else:
+        pair.setReserves(reserve_weth, reserve_token, {"from": OWNER})
+    return pair
+
+
+@pytest.fixture(scope="module")
+def market():
+    weth = MockERC20.deploy("Wrapped BNB", "WBNB", 18, {"from": OWNER})
+    cake = MockERC20.deploy("Cake", "CAKE", 18, {"from": OWNER})
+    usdc = MockERC20.deploy("USD Coin", "USDC", 6, {"from": OWNER})
+    illiquid = MockERC20.deploy("Illiquid", "ILQ", 18, {"from": OWNER})
+    factories = [MockSwapFactory.deploy({"from": OWNER}) for i in range(0, 3)]
+    # Shallow pool on the first factory, deepest pool on the second
+    create_pool(factories[0], cake, weth, 1000 * 10**18, 10 * 10**18)
+    create_pool(factories[1], cake, weth, 50000 * 10**18, 600 * 10**18)
+    create_pool(factories[2], usdc, weth, 3000 * 10**6, 10 * 10**18)
+    create_pool(factories[2], illiquid, weth, 0, 0)
+    factories = [factory.address for factory in factories]
+    return weth, cake, usdc, illiquid, factories
+
+
+"""
+Test prices come from the deepest pool, scaled for PolybitDETF.getTokenBalance
+"""
+
+
+def test_get_prices__deepest_pool(market):
+    weth, cake, usdc, illiquid, factories = market
+    batch_caller = BatchCaller()
+    provider = AmmReservePriceProvider(batch_caller, weth.address, factories)
+
+    prices = provider.get_prices([cake.address, usdc.address, weth.address])
+
+    assert prices[cake.address] == 12 * 10**15
+    assert prices[usdc.address] == (10 * 10**18 * 10**6) // (3000 * 10**6)
+    assert prices[weth.address] == 10**18
+    # One batch for pairs and decimals, one for reserves
+    assert batch_caller.round_trips == 2
+
+
+"""
+Test a token without a liquid WETH pool raises
+"""
+
+
+def test_get_prices__no_liquidity(market):
+    weth, cake, usdc, illiquid, factories = market
+    provider = AmmReservePriceProvider(BatchCaller(), weth.address, factories)
+
+    with pytest.raises(PriceFeedError):
+        provider.get_prices([cake.address, illiquid.address])
+
+
+"""
+Test reserve prices match the contract's 18 decimal scaling
+"""
+
+
+def test_reserve_price():
+    assert reserve_price(3000 * 10**6, 10 * 10**18, 6) == 3333333333333333
+    assert reserve_price(100 * 10**18, 1 * 10**18, 18) == 10**16
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+import pytest
+from scripts.utils.async_prices import AsyncPriceClient, PriceFetchError, TokenBucket
+from scripts.utils.price_feed import COINGECKO_BATCH_SIZE, PriceFeedError
+
+CAKE = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+XVS = "0xBf5140A22578168FD562DCcF235E5D43A02ce9B1"
+ALPACA = "0x8F0528cE5eF7B51152A59745bEfDD91D97091d2F"
+TEST_PRICES = {CAKE: 13110000000000000, XVS: 18700000000000000, ALPACA: 682000000000}
+
+
+class ScriptedProvider:
+    """
+    Answers each request after the next scripted delay, raising if the delay is None.
+    """
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def get_prices(self, token_addresses, quote="bnb"):
+        with self.lock:
+            delay = self.delays[min(self.calls, len(self.delays) - 1)]
+            self.calls += 1
+        if delay is None:
+            raise ConnectionError("price API unavailable")
+        time.sleep(delay)
+        missing = [address for address in token_addresses if address not in TEST_PRICES]
+        if len(missing) > 0:
+            raise PriceFeedError(f"No bnb price returned for {missing}")
+        return {address: TEST_PRICES[address] for address in token_addresses}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+"""
+Test batches are fetched concurrently and merged
+"""
+
+
+def test_get_prices__concurrent_batches():
+    provider = ScriptedProvider([0.2])
+    client = AsyncPriceClient(provider, requests_per_second=100, batch_size=1)
+
+    start = time.monotonic()
+    prices = client.get_prices([CAKE, XVS, ALPACA])
+
+    assert prices == TEST_PRICES
+    assert provider.calls == 3
+    assert time.monotonic() - start < 0.5
+
+
+"""
+Test batches default to the provider's batch size, and to CoinGecko's for a
+provider without one
+"""
+
+
+def test_batch_size__provider_default():
+    provider = ScriptedProvider([0])
+    provider.batch_size = 2
+    client = AsyncPriceClient(provider, requests_per_second=100)
+
+    assert client.get_prices([CAKE, XVS, ALPACA]) == TEST_PRICES
+    assert provider.calls == 2
+    assert AsyncPriceClient(ScriptedProvider([0])).batch_size == COINGECKO_BATCH_SIZE
+
+
+"""
+Test a slow request is hedged and the faster duplicate answers
+"""
+
+
+def test_get_prices__hedged():
+    provider = ScriptedProvider([2, 0])
+    client = AsyncPriceClient(
+        provider, requests_per_second=100, initial_hedge_delay=0.1
+    )
+
+    start = time.monotonic()
+    prices = client.get_prices([CAKE, XVS])
+
+    assert prices == {CAKE: TEST_PRICES[CAKE], XVS: TEST_PRICES[XVS]}
+    assert client.hedges == 1
+    assert time.monotonic() - start < 1
+
+
+"""
+Test a persistently failing API raises a typed error after the retry budget
+"""
+
+
+def test_get_prices__gives_up():
+    provider = ScriptedProvider([None])
+    client = AsyncPriceClient(provider, max_attempts=3, backoff=0.01)
+
+    with pytest.raises(PriceFetchError) as error:
+        client.get_prices([CAKE])
+
+    assert error.value.attempts == 3
+    assert provider.calls == 3
+
+
+"""
+Test a failure that retrying cannot fix, such as a token without a price, is
+raised after one request
+"""
+
+
+def test_get_prices__not_retried():
+    provider = ScriptedProvider([0])
+    client = AsyncPriceClient(provider, max_attempts=3, backoff=0.01)
+
+    with pytest.raises(PriceFeedError) as error:
+        client.get_prices([CAKE, "0x949D48EcA67b17269629c7194F4b727d4Ef9E5d6"])
+
+    assert not isinstance(error.value, PriceFetchError)
+    assert provider.calls == 1
+
+
+"""
+Test the blocking call works from a coroutine, where asyncio.run would raise
+"""
+
+
+def test_get_prices__running_loop():
+    provider = ScriptedProvider([0])
+    client = AsyncPriceClient(provider, requests_per_second=100)
+
+    async def fetch():
+        return client.get_prices([CAKE, XVS])
+
+    assert asyncio.run(fetch()) == {CAKE: TEST_PRICES[CAKE], XVS: TEST_PRICES[XVS]}
+
+
+"""
+Test the token bucket allows a burst then spaces requests at the refill rate
+"""
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0.5
+    assert bucket.reserve() == 1.0
+    clock.now = 10
+    assert bucket.reserve() == 0
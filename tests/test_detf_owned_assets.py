@@ -0,0 +1,76 @@
+import pytest
+from brownie import (
+    accounts,
+    MockERC20,
+    PolybitAccess,
+    PolybitConfig,
+    PolybitDETF,
+    PolybitRebalancer,
+)
+from scripts.utils.order_data import SwapOrders
+
+OWNER = accounts[0]
+DETF_FACTORY = accounts[1]
+E18 = 10**18
+
+
+def order_data(**lists):
+    """
+    @return orderData with the given lists and every other list empty.
+    """
+    values = {
+        name: None if name.endswith("Orders") else [] for name in SwapOrders.__slots__
+    }
+    values.update(lists)
+    return [SwapOrders(**values).as_tuple()]
+
+
+@pytest.fixture(scope="module")
+def detf():
+    """
+    A DETF holding two tokens, with no router, so only rebalances without
+    swaps can run.
+    """
+    weth = MockERC20.deploy("Wrapped BNB", "WBNB", 18, {"from": OWNER})
+    access = PolybitAccess.deploy({"from": OWNER})
+    config = PolybitConfig.deploy(access.address, weth.address, {"from": OWNER})
+    rebalancer = PolybitRebalancer.deploy({"from": OWNER})
+    config.setPolybitRebalancerAddress(rebalancer.address, {"from": OWNER})
+
+    detf = PolybitDETF.deploy({"from": OWNER})
+    detf.init(
+        access.address,
+        config.address,
+        OWNER,
+        DETF_FACTORY,
+        1,
+        "Category",
+        "Dimension",
+        0,
+        0,
+        order_data(),
+        {"from": OWNER},
+    )
+    tokens = []
+    for i in range(0, 2):
+        token = MockERC20.deploy(f"Token {i}", f"T{i}", 18, {"from": OWNER})
+        token.mint(detf.address, E18, {"from": OWNER})
+        tokens.append(token.address)
+    return detf, tokens
+
+
+"""
+Test an incremental rebalance that skips every adjust leg for being within
+tolerance keeps the adjusted assets owned
+"""
+
+
+def test_rebalance__keeps_assets_within_tolerance(detf):
+    detf, tokens = detf
+
+    detf.rebalanceDETF(
+        order_data(adjustList=tokens, adjustListPrices=[E18, E18]), {"from": OWNER}
+    ).wait(1)
+
+    assert detf.getOwnedAssets() == tokens
+    assert detf.getTotalBalanceInWeth([E18, E18]) == 2 * E18
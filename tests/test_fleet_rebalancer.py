@@ -0,0 +1,136 @@
+from scripts.utils import asset_prices
+from scripts.utils.dex import WETH_ADDRESS
+from scripts.utils.fleet_rebalancer import list_fleet, plan_fleet
+from scripts.utils.order_builder import compact_order_data, rebalance
+from scripts.utils.order_data import encode_rebalance_detf
+from scripts.utils.rebalance_planner import DETFBalances
+from tests.test_order_builder import FACTORY, StandInRouter
+
+TOKEN_A = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+TOKEN_B = "0xBf5140A22578168FD562DCcF235E5D43A02ce9B1"
+TOKEN_C = "0x8F0528cE5eF7B51152A59745bEfDD91D97091d2F"
+PRICES = {TOKEN_A: 2 * 10**17, TOKEN_B: 3 * 10**15, TOKEN_C: 5 * 10**16}
+TARGET = [TOKEN_B, TOKEN_C]
+TARGET_WEIGHTS = [60000000, 40000000]
+
+
+class StandInDETF:
+    def __init__(self, address, product_category, product_dimension):
+        self.address = address
+        self.product_category = product_category
+        self.product_dimension = product_dimension
+
+    def getProductCategory(self):
+        return self.product_category
+
+    def getProductDimension(self):
+        return self.product_dimension
+
+
+class StandInAccount:
+    address = "0x0000000000000000000000000000000000000001"
+
+    def __init__(self):
+        self.calldata = {}
+
+    def transfer(self, to, amount, gas_limit=None, data=None):
+        self.calldata[to] = data
+        return StandInTransaction()
+
+
+class StandInTransaction:
+    events = []
+
+    def wait(self, confirmations):
+        pass
+
+
+class StandInFactory:
+    def __init__(self, detfs):
+        self.detfs = detfs
+
+    def getListOfDETFs(self):
+        return list(self.detfs.keys())
+
+
+class StandInPriceProvider:
+    def __init__(self):
+        self.requests = []
+
+    def get_prices(self, token_addresses):
+        self.requests.append(token_addresses)
+        return {token: PRICES[token] for token in token_addresses}
+
+
+def fleet_balances(size):
+    balances = {}
+    for i in range(0, size):
+        balances["0x%040x" % (i + 1)] = DETFBalances(
+            [TOKEN_A, TOKEN_B],
+            {TOKEN_A: (i + 1) * 10**18, TOKEN_B: (i + 2) * 10**20},
+            {TOKEN_A: 18, TOKEN_B: 18},
+            10**17,
+        )
+    return balances
+
+
+"""
+Test DETFs are filtered by product category and dimension
+"""
+
+
+def test_list_fleet__filtered():
+    detfs = {
+        "0x1": StandInDETF("0x1", "Index", "Top 10"),
+        "0x2": StandInDETF("0x2", "Index", "Top 20"),
+        "0x3": StandInDETF("0x3", "Theme", "Top 10"),
+    }
+    factory = StandInFactory(detfs)
+
+    assert len(list_fleet(factory, detfs.get)) == 3
+    assert list_fleet(factory, detfs.get, "Index") == [detfs["0x1"], detfs["0x2"]]
+    assert list_fleet(factory, detfs.get, "Index", "Top 10") == [detfs["0x1"]]
+
+
+"""
+Test a fleet is priced once and routed by one call, with each pair looked up
+once, and plans the same orderData as rebalancing each DETF alone
+"""
+
+
+def test_plan_fleet__shared_routes(monkeypatch):
+    monkeypatch.setattr(asset_prices, "REPLAY_PRICE_SNAPSHOT", "fleet")
+    balances = fleet_balances(8)
+    detfs = [StandInDETF(address, "Index", "Top 10") for address in balances]
+    router = StandInRouter()
+    provider = StandInPriceProvider()
+
+    fleet_plan = plan_fleet(
+        router, detfs, TARGET, TARGET_WEIGHTS, provider, balances=balances
+    )
+
+    assert len(provider.requests) == 1
+    assert len(router.requests) == 1
+    assert sorted(request[0:2] for request in router.requests[0]) == sorted(
+        [[TOKEN_A, WETH_ADDRESS], [TOKEN_B, WETH_ADDRESS], [WETH_ADDRESS, TOKEN_C]]
+    )
+    assert fleet_plan.route_table.round_trips == 1
+    assert fleet_plan.detfs_per_second() > 0
+
+    account = StandInAccount()
+    for detf in detfs:
+        rebalance(
+            account,
+            detf,
+            StandInRouter(),
+            [TOKEN_A, TOKEN_B],
+            [PRICES[TOKEN_A], PRICES[TOKEN_B]],
+            TARGET,
+            TARGET_WEIGHTS,
+            [PRICES[TOKEN_B], PRICES[TOKEN_C]],
+            balances[detf.address],
+        )
+        assert account.calldata[detf.address] == encode_rebalance_detf(
+            compact_order_data(fleet_plan.order_data[detf.address])
+        )
+        assert fleet_plan.order_data[detf.address].sellOrders.factory == [FACTORY]
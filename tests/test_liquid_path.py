@@ -0,0 +1,194 @@
+import pytest
+from eth_abi import decode_abi, encode_abi
+from scripts.utils.dex import (
+    AMOUNT_TYPE_EXACT_IN,
+    AMOUNT_TYPE_EXACT_OUT,
+    BUSD_ADDRESS,
+    USDC_ADDRESS,
+    USDT_ADDRESS,
+    WETH_ADDRESS,
+    ZERO_ADDRESS,
+)
+from scripts.utils.liquid_path import (
+    LiquidPathRouter,
+    ReserveSnapshot,
+    SwapLibraryError,
+    get_amount_in,
+    get_amount_out,
+)
+from scripts.utils.order_builder import RouteTable
+from scripts.utils.order_data import get_selector
+
+FACTORY_A = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+FACTORY_B = "0xc35DADB65012eC5796536bD9864eD8773aBc74C4"
+FACTORY_C = "0x858E3312ed3A876947EA49d572A7C42DE08af7EE"
+FACTORIES = [FACTORY_A, FACTORY_B, FACTORY_C]
+TOKEN = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+OTHER = "0xBf5140A22578168FD562DCcF235E5D43A02ce9B1"
+E18 = 10**18
+
+
+class StandInPairCaller:
+    """
+    Answers getPair and getReserves eth_calls from a dict of pools.
+    """
+
+    def __init__(self, pools):
+        # Keyed by (factory, token_a, token_b) to (reserve_a, reserve_b)
+        self.pools = {}
+        self.reserves = {}
+        for i, ((factory, token_a, token_b), reserves) in enumerate(pools.items()):
+            pair = "0x%040x" % (i + 1)
+            self.pools[(factory.lower(), token_a.lower(), token_b.lower())] = pair
+            self.pools[(factory.lower(), token_b.lower(), token_a.lower())] = pair
+            if int(token_a, 16) < int(token_b, 16):
+                self.reserves[pair] = reserves
+            else:
+                self.reserves[pair] = (reserves[1], reserves[0])
+        self.calls = []
+
+    def request(self, method, params):
+        return "0x10"
+
+    def call_many(self, calls, block="latest"):
+        self.calls.append(calls)
+        results = []
+        for to, data in calls:
+            if data[:4] == get_selector("getPair(address,address)"):
+                token_a, token_b = decode_abi(["address", "address"], data[4:])
+                pair = self.pools.get(
+                    (to.lower(), token_a.lower(), token_b.lower()), ZERO_ADDRESS
+                )
+                results.append(encode_abi(["address"], [pair]))
+            else:
+                reserve0, reserve1 = self.reserves[to]
+                results.append(
+                    encode_abi(
+                        ["uint112", "uint112", "uint32"], [reserve0, reserve1, 0]
+                    )
+                )
+        return results
+
+
+def router(pools):
+    return LiquidPathRouter(batch_caller=StandInPairCaller(pools), factories=FACTORIES)
+
+
+"""
+Test the swap math matches PolybitSwapLibrary's integer rounding and reverts
+"""
+
+
+def test_get_amount_out_in():
+    assert get_amount_out(10**18, 100 * E18, 200 * E18) == 1974316068794122597
+    assert get_amount_in(1974316068794122597, 100 * E18, 200 * E18) == 10**18
+    with pytest.raises(SwapLibraryError):
+        get_amount_out(0, 100 * E18, 200 * E18)
+    with pytest.raises(SwapLibraryError):
+        get_amount_in(10**18, 0, 200 * E18)
+    with pytest.raises(SwapLibraryError):
+        get_amount_in(200 * E18, 100 * E18, 200 * E18)
+
+
+"""
+Test exact in routing takes the tri path through the second base token when
+it beats the direct pair, and never routes through the first base token
+"""
+
+
+def test_get_liquid_path__tri_path():
+    pools = {
+        (FACTORY_A, WETH_ADDRESS, TOKEN): (10 * E18, 1000 * E18),
+        (FACTORY_A, WETH_ADDRESS, USDT_ADDRESS): (1000 * E18, 300000 * E18),
+        (FACTORY_A, USDT_ADDRESS, TOKEN): (300000 * E18, 1000000 * E18),
+        (FACTORY_A, WETH_ADDRESS, BUSD_ADDRESS): (1000 * E18, 300000 * E18),
+        (FACTORY_A, BUSD_ADDRESS, TOKEN): (300000 * E18, 5000000 * E18),
+    }
+    liquid_path = router(pools)
+
+    factories, paths, amounts = liquid_path.getLiquidPaths(
+        [[[[WETH_ADDRESS, TOKEN, E18, AMOUNT_TYPE_EXACT_IN]]]]
+    )
+
+    assert factories == [FACTORY_A]
+    assert paths == [[WETH_ADDRESS, USDT_ADDRESS, TOKEN]]
+    snapshot = liquid_path.snapshot
+    assert amounts == [snapshot.get_amounts_out(FACTORY_A, E18, paths[0])[-1]]
+    assert (
+        amounts[0] > snapshot.get_amounts_out(FACTORY_A, E18, [WETH_ADDRESS, TOKEN])[-1]
+    )
+    # One batch of getPair calls and one of getReserves calls
+    assert len(liquid_path.batch_caller.calls) == 2
+
+
+"""
+Test a later factory only replaces the first when it quotes strictly better,
+and exact out only compares against a quote from the first factory
+"""
+
+
+def test_get_liquid_path__factory_order():
+    pools = {
+        (FACTORY_A, TOKEN, WETH_ADDRESS): (1000 * E18, 10 * E18),
+        (FACTORY_B, TOKEN, WETH_ADDRESS): (1000 * E18, 10 * E18),
+        (FACTORY_C, TOKEN, WETH_ADDRESS): (1000 * E18, 20 * E18),
+        (FACTORY_B, OTHER, WETH_ADDRESS): (1000 * E18, 10 * E18),
+    }
+    liquid_path = router(pools)
+
+    factory, path, amount = liquid_path.getLiquidPaths(
+        [[[[TOKEN, WETH_ADDRESS, E18, AMOUNT_TYPE_EXACT_IN]]]]
+    )
+    assert factory == [FACTORY_C]
+    assert path == [[TOKEN, WETH_ADDRESS]]
+
+    factories, paths, amounts = liquid_path.getLiquidPaths(
+        [
+            [
+                [
+                    [WETH_ADDRESS, TOKEN, E18, AMOUNT_TYPE_EXACT_OUT],
+                    [WETH_ADDRESS, OTHER, E18, AMOUNT_TYPE_EXACT_OUT],
+                    [WETH_ADDRESS, USDC_ADDRESS, E18, AMOUNT_TYPE_EXACT_IN],
+                ]
+            ]
+        ]
+    )
+    # The first and second factories tie, so the first is kept
+    assert factories[0] == FACTORY_A
+    assert amounts[0] == get_amount_in(E18, 10 * E18, 1000 * E18)
+    # No first factory quote to beat, so no path is found
+    assert (factories[1], paths[1], amounts[1]) == (FACTORY_A, [], 0)
+    assert (factories[2], paths[2], amounts[2]) == (FACTORY_A, [], 0)
+
+
+"""
+Test the off-chain router can back a RouteTable in place of the contract
+"""
+
+
+def test_route_table__off_chain_backend():
+    pools = {(FACTORY_B, TOKEN, WETH_ADDRESS): (1000 * E18, 10 * E18)}
+    route_table = RouteTable(router(pools))
+
+    route_table.route([[TOKEN, WETH_ADDRESS, E18, AMOUNT_TYPE_EXACT_IN]])
+
+    assert route_table.find_path([TOKEN, WETH_ADDRESS, E18, 0]) == (
+        FACTORY_B,
+        [TOKEN, WETH_ADDRESS],
+    )
+
+
+"""
+Test snapshot pairs are stored in token order whichever way they are added
+"""
+
+
+def test_reserve_snapshot__sorted():
+    snapshot = ReserveSnapshot()
+    snapshot.add_pair(FACTORY_A, WETH_ADDRESS, TOKEN, "0x1", 5, 7)
+
+    assert snapshot.get_reserves(FACTORY_A, WETH_ADDRESS, TOKEN) == (5, 7)
+    assert snapshot.get_reserves(FACTORY_A, TOKEN, WETH_ADDRESS) == (7, 5)
+    assert snapshot.pair_for(FACTORY_A, TOKEN, TOKEN) == ZERO_ADDRESS
+    with pytest.raises(SwapLibraryError):
+        snapshot.get_reserves(FACTORY_A, TOKEN, TOKEN)
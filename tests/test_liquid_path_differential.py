@@ -0,0 +1,98 @@
+import pytest
+from brownie import (
+    accounts,
+    MockERC20,
+    MockSwapFactory,
+    MockSwapPair,
+    PolybitLiquidPath,
+    PolybitSwapRouter,
+)
+from scripts.utils.dex import (
+    AMOUNT_TYPE_EXACT_IN,
+    AMOUNT_TYPE_EXACT_OUT,
+    BASE_TOKENS,
+    BUSD_ADDRESS,
+    USDC_ADDRESS,
+    USDT_ADDRESS,
+)
+from scripts.utils.liquid_path import LiquidPathRouter
+from scripts.utils.rpc_batch import BatchCaller
+
+OWNER = accounts[0]
+E18 = 10**18
+
+
+def create_pool(factory, token_a, token_b, reserve_a, reserve_b):
+    factory.createPair(token_a, token_b, {"from": OWNER}).wait(1)
+    pair = MockSwapPair.at(factory.getPair(token_a, token_b))
+    if pair.token0().lower() == str(token_a).lower():
+        pair.setReserves(reserve_a, reserve_b, {"from": OWNER})
+    else:
+        pair.setReserves(reserve_b, reserve_a, {"from": OWNER})
+
+
+@pytest.fixture(scope="module")
+def market():
+    """
+    Pools on three mock factories, including pools with the mainnet base token
+    addresses, which only need reserves for the router's quotes.
+    """
+    weth = MockERC20.deploy("Wrapped BNB", "WBNB", 18, {"from": OWNER})
+    tokens = [
+        MockERC20.deploy(f"Token {i}", f"T{i}", 18, {"from": OWNER}).address
+        for i in range(0, 4)
+    ]
+    factories = [MockSwapFactory.deploy({"from": OWNER}) for i in range(0, 3)]
+    swap_router = PolybitSwapRouter.deploy(weth.address, {"from": OWNER})
+    liquid_path = PolybitLiquidPath.deploy(
+        [weth.address, swap_router.address] + [f.address for f in factories],
+        {"from": OWNER},
+    )
+
+    pools = [
+        (0, tokens[0], weth.address, 1000 * E18, 10 * E18),
+        (1, tokens[0], weth.address, 1000 * E18, 12 * E18),
+        (0, weth.address, USDT_ADDRESS, 100 * E18, 30000 * E18),
+        (0, USDT_ADDRESS, tokens[0], 30000 * E18, 4000 * E18),
+        (0, weth.address, BUSD_ADDRESS, 100 * E18, 30000 * E18),
+        (0, BUSD_ADDRESS, tokens[1], 30000 * E18, 90000 * E18),
+        (2, tokens[1], weth.address, 500 * E18, 5 * E18),
+        (2, weth.address, USDC_ADDRESS, 10 * E18, 3000 * E18),
+        (2, USDC_ADDRESS, tokens[2], 3000 * E18, 700 * E18),
+        (1, tokens[3], weth.address, 0, 0),
+    ]
+    for i, token_a, token_b, reserve_a, reserve_b in pools:
+        create_pool(factories[i], token_a, token_b, reserve_a, reserve_b)
+    return weth.address, tokens, [f.address for f in factories], liquid_path
+
+
+"""
+Test the off-chain router answers getLiquidPaths exactly as the contract, for
+direct and tri paths, missing and empty pools, and both amount types
+"""
+
+
+@pytest.mark.parametrize("amount_type", [AMOUNT_TYPE_EXACT_IN, AMOUNT_TYPE_EXACT_OUT])
+def test_get_liquid_paths__matches_contract(market, amount_type):
+    weth, tokens, factories, liquid_path = market
+    orders = []
+    for token in tokens:
+        for amount in [10**15, E18, 50 * E18]:
+            orders.append([weth, token, amount, amount_type])
+            orders.append([token, weth, amount, amount_type])
+    router = LiquidPathRouter(
+        batch_caller=BatchCaller(),
+        factories=factories,
+        base_tokens=BASE_TOKENS,
+        weth_address=weth,
+    )
+
+    expected = liquid_path.getLiquidPaths([[orders]])
+    factories_found, paths, amounts = router.getLiquidPaths([[orders]])
+
+    for i in range(0, len(orders)):
+        assert factories_found[i].lower() == expected[0][i].lower(), orders[i]
+        assert [t.lower() for t in paths[i]] == [
+            t.lower() for t in expected[1][i]
+        ], orders[i]
+        assert amounts[i] == expected[2][i], orders[i]
@@ -0,0 +1,147 @@
+import pytest
+from eth_abi import decode_abi, encode_abi
+from scripts.utils.dex import WETH_ADDRESS, ZERO_ADDRESS
+from scripts.utils.liquid_path import ReserveSnapshot, load_reserves
+from scripts.utils.multicall_reserves import MulticallReserveReader
+from scripts.utils.order_data import get_selector
+from scripts.utils.rpc_batch import RpcBatchError
+
+MULTICALL = "0x69a4E26ffE2CCde086248CF581A190Fb6cF17893"
+FACTORY = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+PAIR = "0x0eD7e52944161450477ee417DE9Cd3a859b14fD0"
+TOKENS = ["0x%040x" % (0x1000 + i) for i in range(0, 10)]
+BLOCK = 16
+
+
+class StandInMulticallCaller:
+    """
+    Answers getReservesBatch for a pair of WETH with each token of TOKENS but
+    the last, failing calls of more than max_pairs pairs as a node's call gas
+    cap would. With code "0x" nothing is deployed, and every call returns no
+    data.
+    """
+
+    def __init__(self, max_pairs, code="0x6080"):
+        self.max_pairs = max_pairs
+        self.code = code
+        self.batches = []
+        self.blocks = []
+        self.code_reads = 0
+
+    def request(self, method, params):
+        if method == "eth_getCode":
+            self.code_reads += 1
+            return self.code
+        return hex(BLOCK)
+
+    def reserves(self, factory, token_a, token_b):
+        tokens = {token_a.lower(), token_b.lower()}
+        if WETH_ADDRESS.lower() not in tokens or TOKENS[-1] in tokens:
+            return (ZERO_ADDRESS, 0, 0, 0)
+        token = (tokens - {WETH_ADDRESS.lower()}).pop()
+        reserve_weth, reserve_token = 10**18, int(token, 16)
+        if token_a.lower() == token:
+            return (PAIR, reserve_token, reserve_weth, 7)
+        return (PAIR, reserve_weth, reserve_token, 7)
+
+    def call_many(self, calls, block="latest"):
+        self.batches.append(len(calls))
+        self.blocks.append(block)
+        results = []
+        for to, data in calls:
+            if self.code == "0x":
+                results.append(b"")
+                continue
+            assert data[:4] == get_selector(
+                "getReservesBatch(address[],address[],address[])"
+            )
+            factories, tokens_a, tokens_b = decode_abi(
+                ["address[]", "address[]", "address[]"], data[4:]
+            )
+            if len(factories) > self.max_pairs:
+                results.append(None)
+                continue
+            results.append(
+                encode_abi(
+                    ["(address,uint256,uint256,uint32)[]"],
+                    [
+                        [
+                            self.reserves(*lookup)
+                            for lookup in zip(factories, tokens_a, tokens_b)
+                        ]
+                    ],
+                )
+            )
+        return results
+
+
+"""
+Test reads are chunked, chunks failing on gas are split, and every lookup
+gets its reserves in tokenA order or the missing pair sentinel
+"""
+
+
+def test_get_reserves__chunks_and_splits():
+    caller = StandInMulticallCaller(max_pairs=2)
+    reader = MulticallReserveReader(MULTICALL, caller, max_pairs_per_call=4)
+    lookups = [(FACTORY, token, WETH_ADDRESS) for token in TOKENS]
+    lookups.append((FACTORY, WETH_ADDRESS, TOKENS[0]))
+
+    reserves = reader.get_reserves(lookups)
+
+    assert reserves[0] == (PAIR.lower(), int(TOKENS[0], 16), 10**18, 7)
+    assert reserves[-1] == (PAIR.lower(), 10**18, int(TOKENS[0], 16), 7)
+    assert reserves[9] == (ZERO_ADDRESS, 0, 0, 0)
+    assert len(reserves) == len(lookups)
+    # Chunks of 4, 4 and 3 pairs, then each split in two
+    assert caller.batches == [3, 6]
+    assert reader.stats() == {"calls": 9, "splits": 3}
+    assert caller.blocks == [BLOCK, BLOCK]
+    assert caller.code_reads == 1
+
+
+"""
+Test a read through an address without code fails after one batch instead of
+splitting down to single pairs
+"""
+
+
+def test_get_reserves__not_deployed():
+    caller = StandInMulticallCaller(max_pairs=100, code="0x")
+    reader = MulticallReserveReader(MULTICALL, caller, max_pairs_per_call=4)
+    lookups = [(FACTORY, token, WETH_ADDRESS) for token in TOKENS]
+
+    with pytest.raises(RpcBatchError):
+        reader.get_reserves(lookups)
+
+    assert caller.batches == [3]
+    assert caller.code_reads == 1
+    assert reader.stats() == {"calls": 3, "splits": 0}
+
+
+"""
+Test load_reserves fills a snapshot through the reader in place of getPair
+and getReserves calls
+"""
+
+
+def test_load_reserves__reserve_reader():
+    caller = StandInMulticallCaller(max_pairs=100)
+    reader = MulticallReserveReader(MULTICALL, caller)
+    snapshot = ReserveSnapshot()
+
+    load_reserves(
+        snapshot,
+        [FACTORY],
+        [(WETH_ADDRESS, TOKENS[0]), (TOKENS[-1], WETH_ADDRESS)],
+        caller,
+        reserve_reader=reader,
+    )
+
+    assert snapshot.block == BLOCK
+    assert snapshot.get_reserves(FACTORY, TOKENS[0], WETH_ADDRESS) == (
+        int(TOKENS[0], 16),
+        10**18,
+    )
+    assert snapshot.pair_for(FACTORY, TOKENS[-1], WETH_ADDRESS) == ZERO_ADDRESS
+    assert caller.batches == [1]
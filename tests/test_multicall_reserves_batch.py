@@ -0,0 +1,92 @@
+import pytest
+from brownie import accounts, MockERC20, MockSwapFactory, MockSwapPair, PolybitMulticall
+from scripts.utils.dex import ZERO_ADDRESS
+from scripts.utils.multicall_reserves import MulticallReserveReader
+from scripts.utils.rpc_batch import BatchCaller, RpcBatchError
+
+OWNER = accounts[0]
+E18 = 10**18
+
+
+@pytest.fixture(scope="module")
+def market():
+    """
+    One mock factory with a pool of WBNB and each of two tokens, and a third
+    token without a pool.
+    """
+    weth = MockERC20.deploy("Wrapped BNB", "WBNB", 18, {"from": OWNER}).address
+    tokens = [
+        MockERC20.deploy(f"Token {i}", f"T{i}", 18, {"from": OWNER}).address
+        for i in range(0, 3)
+    ]
+    factory = MockSwapFactory.deploy({"from": OWNER})
+    for i, token in enumerate(tokens[0:2]):
+        factory.createPair(token, weth, {"from": OWNER}).wait(1)
+        pair = MockSwapPair.at(factory.getPair(token, weth))
+        if pair.token0().lower() == token.lower():
+            pair.setReserves((i + 1) * 1000 * E18, 10 * E18, {"from": OWNER})
+        else:
+            pair.setReserves(10 * E18, (i + 1) * 1000 * E18, {"from": OWNER})
+    multicall = PolybitMulticall.deploy(ZERO_ADDRESS, {"from": OWNER})
+    return weth, tokens, factory.address, multicall
+
+
+"""
+Test getReservesBatch returns reserves in tokenA order for both token orders,
+and the sentinel for a missing pair and a factory without code
+"""
+
+
+def test_get_reserves_batch(market):
+    weth, tokens, factory, multicall = market
+    factories = [factory, factory, factory, OWNER.address]
+    tokens_a = [tokens[0], weth, tokens[2], tokens[0]]
+    tokens_b = [weth, tokens[1], weth, weth]
+
+    reserves = multicall.getReservesBatch(factories, tokens_a, tokens_b)
+
+    assert reserves[0][1:3] == (1000 * E18, 10 * E18)
+    assert reserves[1][1:3] == (10 * E18, 2000 * E18)
+    assert reserves[1][0] == MockSwapFactory.at(factory).getPair(weth, tokens[1])
+    assert reserves[2] == (ZERO_ADDRESS, 0, 0, 0)
+    assert reserves[3] == (ZERO_ADDRESS, 0, 0, 0)
+
+
+"""
+Test the reader answers as the contract across chunks of the batch
+"""
+
+
+def test_reader__matches_contract(market):
+    weth, tokens, factory, multicall = market
+    lookups = [(factory, token, weth) for token in tokens] * 3
+    reader = MulticallReserveReader(
+        multicall.address, BatchCaller(), max_pairs_per_call=2
+    )
+
+    reserves = reader.get_reserves(lookups)
+
+    expected = multicall.getReservesBatch(*[list(column) for column in zip(*lookups)])
+    assert [
+        (pair.lower(), reserve_a, reserve_b, timestamp)
+        for pair, reserve_a, reserve_b, timestamp in expected
+    ] == [
+        (pair.lower(), reserve_a, reserve_b, timestamp)
+        for pair, reserve_a, reserve_b, timestamp in reserves
+    ]
+    assert reader.stats()["calls"] == 5
+
+
+"""
+Test a reader pointed at an address without code raises instead of splitting
+"""
+
+
+def test_reader__not_deployed(market):
+    weth, tokens, factory, multicall = market
+    reader = MulticallReserveReader(OWNER.address, BatchCaller(), max_pairs_per_call=2)
+
+    with pytest.raises(RpcBatchError):
+        reader.get_reserves([(factory, token, weth) for token in tokens])
+
+    assert reader.stats() == {"calls": 2, "splits": 0}
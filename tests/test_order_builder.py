@@ -0,0 +1,292 @@
+from scripts.utils.dex import AMOUNT_TYPE_EXACT_IN, WETH_ADDRESS
+from scripts.utils import rebalance_planner
+from scripts.utils.order_builder import (
+    BUY_LEGS,
+    ORDER_LEGS,
+    compact_order_data,
+    count_adjust_swaps,
+    incremental_order_data,
+    order_data_from_plan,
+    report_gas_saved,
+    route_legs,
+)
+from scripts.utils.order_data import SwapOrder, encode_rebalance_detf, leg_calldata
+from scripts.utils.rebalance_planner import DETFBalances, DriftTolerance, empty_plan
+from scripts.utils.rpc_batch import RpcBatchError
+
+TOKEN_A = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+TOKEN_B = "0xBf5140A22578168FD562DCcF235E5D43A02ce9B1"
+TOKEN_C = "0x8F0528cE5eF7B51152A59745bEfDD91D97091d2F"
+ZERO = "0x0000000000000000000000000000000000000000"
+FACTORY = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+DETF = "0x69a4E26ffE2CCde086248CF581A190Fb6cF17893"
+SENDER = "0x0eD7e52944161450477ee417DE9Cd3a859b14fD0"
+
+
+class StandInRouter:
+    """
+    Answers getLiquidPaths with a direct path, or no path for unroutable tokens.
+    """
+
+    def __init__(self, unroutable=()):
+        self.unroutable = unroutable
+        self.requests = []
+
+    def getLiquidPaths(self, swap_orders):
+        requests = swap_orders[0][0]
+        self.requests.append(requests)
+        factories = []
+        paths = []
+        amounts = []
+        for token_in, token_out, amount, amount_type in requests:
+            if token_in in self.unroutable or token_out in self.unroutable:
+                factories.append(ZERO)
+                paths.append([])
+            else:
+                factories.append(FACTORY)
+                paths.append([token_in, token_out])
+            amounts.append(amount)
+        return factories, paths, amounts
+
+
+class StandInGasCaller:
+    """
+    Estimates gas per calldata, failing calls whose calldata is in reverts as
+    a node does for a call that would revert.
+    """
+
+    def __init__(self, gas, reverts=()):
+        self.gas = gas
+        self.reverts = reverts
+
+    def request(self, method, params):
+        assert method == "eth_estimateGas"
+        data = params[0]["data"]
+        if data in self.reverts:
+            raise RpcBatchError("execution reverted: SWAP_FAILED_MIN_OUT")
+        return hex(self.gas[data])
+
+
+class StandInAccount:
+    address = SENDER
+
+
+class StandInDETF:
+    address = DETF
+
+
+def rebalance_plan():
+    plan = empty_plan()
+    plan["sellList"] = [TOKEN_A, ZERO]
+    plan["sellListAmountsIn"] = [100, 0]
+    plan["sellListAmountsOut"] = [10, 0]
+    plan["adjustToSellList"] = [TOKEN_B]
+    plan["adjustToSellListAmountsIn"] = [200]
+    plan["adjustToSellListAmountsOut"] = [20]
+    plan["buyList"] = [TOKEN_C, TOKEN_C]
+    plan["buyListAmountsIn"] = [30, 30]
+    plan["buyListAmountsOut"] = [300, 300]
+    return plan
+
+
+"""
+Test every leg is routed by one getLiquidPaths call, without placeholders or
+repeated swaps
+"""
+
+
+def test_route_legs__single_call():
+    router = StandInRouter()
+    orders = route_legs(router, rebalance_plan(), ORDER_LEGS)
+
+    assert len(router.requests) == 1
+    assert router.requests[0] == [
+        [TOKEN_A, WETH_ADDRESS, 100, AMOUNT_TYPE_EXACT_IN],
+        [TOKEN_B, WETH_ADDRESS, 200, AMOUNT_TYPE_EXACT_IN],
+        [WETH_ADDRESS, TOKEN_C, 30, AMOUNT_TYPE_EXACT_IN],
+    ]
+    sell_order, routed = orders["Sell"]
+    assert routed == [0]
+    assert sell_order == SwapOrder([FACTORY], [[TOKEN_A, WETH_ADDRESS]], [100], [10])
+    assert orders["Adjust To Sell"][1] == [0]
+    assert orders["Adjust To Buy"] == (SwapOrder.empty(), [])
+    buy_order, routed = orders["Buy"]
+    assert routed == [0, 1]
+    assert buy_order.amountsIn == [30, 30]
+
+
+"""
+Test legs without a path are left out of the swap order
+"""
+
+
+def test_route_legs__unroutable():
+    router = StandInRouter(unroutable=[TOKEN_B])
+    orders = route_legs(router, rebalance_plan(), ORDER_LEGS)
+
+    assert orders["Adjust To Sell"] == (SwapOrder.empty(), [])
+    assert orders["Sell"][1] == [0]
+
+
+"""
+Test no call is made when there is nothing to route
+"""
+
+
+def test_route_legs__empty():
+    router = StandInRouter()
+    orders = route_legs(router, empty_plan(), BUY_LEGS)
+
+    assert router.requests == []
+    assert orders["Buy"] == (SwapOrder.empty(), [])
+
+
+"""
+Test an incremental rebalance drops the small adjustment, and is routed with
+the full rebalance it is compared against by one call
+"""
+
+
+def incremental_plan_args():
+    balances = DETFBalances(
+        [TOKEN_A, TOKEN_B],
+        {TOKEN_A: 51 * 10**17, TOKEN_B: 48 * 10**17},
+        {TOKEN_A: 18, TOKEN_B: 18},
+        0,
+    )
+    return (
+        rebalance_planner,
+        balances,
+        [TOKEN_A, TOKEN_B],
+        [10**18, 10**18],
+        [TOKEN_A, TOKEN_B, TOKEN_C],
+        [49000000, 49000000, 2000000],
+        [10**18, 10**18, 10**18],
+    )
+
+
+def test_incremental_order_data():
+    router = StandInRouter()
+    order_data, full_order_data = incremental_order_data(
+        router, incremental_plan_args(), DriftTolerance(150)
+    )
+
+    assert len(router.requests) == 1
+    assert count_adjust_swaps(full_order_data) == 2
+    assert order_data.adjustToSellList == [TOKEN_A]
+    assert order_data.adjustToBuyList == []
+    assert order_data.buyList == [TOKEN_C]
+
+
+"""
+Test the gas saved is reported, and a full rebalance that would revert is
+reported without stopping the incremental rebalance
+"""
+
+
+def test_report_gas_saved():
+    order_data, full_order_data = incremental_order_data(
+        StandInRouter(), incremental_plan_args(), DriftTolerance(150)
+    )
+    data = "0x" + encode_rebalance_detf(compact_order_data(order_data)).hex()
+    full_data = "0x" + encode_rebalance_detf(compact_order_data(full_order_data)).hex()
+    caller = StandInGasCaller({data: 300000, full_data: 420000})
+
+    assert (
+        report_gas_saved(
+            StandInDETF(), StandInAccount(), full_order_data, order_data, None, caller
+        )
+        == 120000
+    )
+
+    caller.reverts = [full_data]
+    assert (
+        report_gas_saved(
+            StandInDETF(), StandInAccount(), full_order_data, order_data, None, caller
+        )
+        is None
+    )
+
+
+"""
+Test compaction strips placeholders, unrouted sells, unread prices and the
+SwapOrders of empty legs, and shrinks the calldata
+"""
+
+
+def test_compact_order_data():
+    plan = rebalance_plan()
+    plan["sellList"] = [TOKEN_A, ZERO, TOKEN_B]
+    plan["sellListPrices"] = [1, 0, 2]
+    plan["sellListAmountsIn"] = [100, 0, 200]
+    plan["sellListAmountsOut"] = [10, 0, 20]
+    plan["adjustToSellList"] = []
+    plan["buyListWeights"] = [50000000, 50000000]
+    plan["buyListPrices"] = [10**16, 10**16]
+    orders = route_legs(StandInRouter(unroutable=[TOKEN_B]), plan, ORDER_LEGS)
+    order_data = order_data_from_plan(
+        plan,
+        orders["Sell"][0],
+        orders["Adjust To Sell"][0],
+        orders["Adjust To Buy"][0],
+        orders["Buy"][0],
+    )
+    compacted = compact_order_data(order_data)
+
+    assert compacted.sellList == [TOKEN_A]
+    assert compacted.sellListPrices == []
+    assert compacted.sellOrders == order_data.sellOrders
+    assert compacted.adjustToSellOrders is None
+    assert compacted.adjustToBuyOrders is None
+    assert compacted.buyList == [TOKEN_C, TOKEN_C]
+    assert compacted.buyOrders.amountsIn == [30, 30]
+
+    data = encode_rebalance_detf(order_data)
+    compacted_data = encode_rebalance_detf(compacted)
+    assert len(compacted_data) < len(data)
+    # Selector, SwapOrders[] offset and length, and the element offset
+    assert sum(size for size, gas in leg_calldata(compacted).values()) == (
+        len(compacted_data) - 4 - 3 * 32
+    )
+
+
+"""
+Test compaction drops unroutable adjust to buy and buy entries with their
+weights and prices, so each entry keeps the path at its index
+"""
+
+
+def test_compact_order_data__unroutable_buy():
+    plan = rebalance_plan()
+    plan["adjustToBuyList"] = [TOKEN_A, TOKEN_B]
+    plan["adjustToBuyWeights"] = [30000000, 20000000]
+    plan["adjustToBuyPrices"] = [1, 2]
+    plan["adjustToBuyListAmountsIn"] = [40, 50]
+    plan["adjustToBuyListAmountsOut"] = [400, 500]
+    plan["buyList"] = [TOKEN_A, ZERO, TOKEN_C]
+    plan["buyListWeights"] = [25000000, 0, 25000000]
+    plan["buyListPrices"] = [1, 0, 3]
+    plan["buyListAmountsIn"] = [30, 0, 60]
+    plan["buyListAmountsOut"] = [300, 0, 600]
+    orders = route_legs(StandInRouter(unroutable=[TOKEN_A]), plan, ORDER_LEGS)
+    order_data = order_data_from_plan(
+        plan,
+        orders["Sell"][0],
+        orders["Adjust To Sell"][0],
+        orders["Adjust To Buy"][0],
+        orders["Buy"][0],
+    )
+
+    compacted = compact_order_data(order_data)
+
+    assert compacted.adjustToBuyList == [TOKEN_B]
+    assert compacted.adjustToBuyWeights == [20000000]
+    assert compacted.adjustToBuyPrices == [2]
+    assert compacted.buyList == [TOKEN_C]
+    assert compacted.buyListWeights == [25000000]
+    assert compacted.buyListPrices == [3]
+    for tokens, swap_order in [
+        (compacted.adjustToBuyList, compacted.adjustToBuyOrders),
+        (compacted.buyList, compacted.buyOrders),
+    ]:
+        assert [path[-1] for path in swap_order.path] == tokens
@@ -0,0 +1,82 @@
+from eth_abi import decode_abi, encode_abi
+from scripts.utils.order_data import (
+    SWAP_ORDERS_TYPE,
+    SwapOrder,
+    SwapOrders,
+    encode_create_detf,
+    encode_deposit,
+    encode_rebalance_detf,
+    get_selector,
+)
+
+TOKEN_A = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+TOKEN_B = "0xBf5140A22578168FD562DCcF235E5D43A02ce9B1"
+WETH = "0xbb4CdB9CBd36B01bD1cBaEBF2De08d9173bc095c"
+FACTORY = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+
+
+def order_data():
+    return SwapOrders(
+        [TOKEN_A],
+        [2 * 10**17],
+        SwapOrder([FACTORY], [[TOKEN_A, WETH]], [10**18], [2 * 10**17]),
+        [],
+        [],
+        [],
+        [],
+        SwapOrder.empty(),
+        [],
+        [],
+        [],
+        SwapOrder.empty(),
+        [TOKEN_B],
+        [10**8],
+        [3 * 10**15],
+        SwapOrder([FACTORY], [[WETH, TOKEN_B]], [2 * 10**17], [66 * 10**18]),
+    )
+
+
+"""
+Test rebalanceDETF calldata matches a plain ABI encode of the nested orderData
+and decodes back to the same struct
+"""
+
+
+def test_encode_rebalance_detf():
+    data = encode_rebalance_detf(order_data())
+    nested = order_data().as_args()
+
+    assert data[0:4] == get_selector(f"rebalanceDETF({SWAP_ORDERS_TYPE}[])")
+    assert data[4:] == encode_abi([f"{SWAP_ORDERS_TYPE}[]"], [nested])
+    decoded = decode_abi([f"{SWAP_ORDERS_TYPE}[]"], data[4:])[0][0]
+    assert decoded[2][0][1] == ((TOKEN_A.lower(), WETH.lower()),)
+    assert decoded[13] == (10**8,)
+
+
+"""
+Test deposit and createDETF wrap the same orderData encoding
+"""
+
+
+def test_encode_deposit_and_create_detf():
+    lock = 1700000000
+    deposit = encode_deposit(lock, order_data())
+    create = encode_create_detf(TOKEN_A, 5610021000, lock, order_data())
+
+    assert deposit[4:] == encode_abi(
+        ["uint256", f"{SWAP_ORDERS_TYPE}[]"], [lock, order_data().as_args()]
+    )
+    assert decode_abi([f"(address,uint256,uint256,{SWAP_ORDERS_TYPE}[])"], create[4:])[
+        0
+    ][0:3] == (TOKEN_A.lower(), 5610021000, lock)
+
+
+"""
+Test the order model carries no per instance dict
+"""
+
+
+def test_swap_orders__slots():
+    assert not hasattr(order_data(), "__dict__")
+    assert not hasattr(SwapOrder.empty(), "__dict__")
+    assert len(order_data().sellOrders) == 1
@@ -0,0 +1,178 @@
+import pytest
+from eth_abi import encode_abi
+from scripts.utils.dex import (
+    AMOUNT_TYPE_EXACT_IN,
+    BISWAP_FACTORY,
+    BUSD_ADDRESS,
+    FACTORY_INIT_CODE_HASHES,
+    PANCAKESWAP_V2_FACTORY,
+    SUSHISWAP_V2_FACTORY,
+    USDT_ADDRESS,
+    WETH_ADDRESS,
+)
+from scripts.utils.liquid_path import LiquidPathRouter
+from scripts.utils.order_data import get_selector
+from scripts.utils.pair_index import (
+    PairIndex,
+    PairIndexError,
+    PairIndexStore,
+    pair_address,
+)
+
+CAKE = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+TOKEN = "0xBf5140A22578168FD562DCcF235E5D43A02ce9B1"
+E18 = 10**18
+# A deployed mainnet pair of each factory with an init code hash
+KNOWN_PAIRS = {
+    PANCAKESWAP_V2_FACTORY: (
+        BUSD_ADDRESS,
+        WETH_ADDRESS,
+        "0x58F876857a02D6762E0101bb5C46A8c1ED44Dc16",
+    ),
+    BISWAP_FACTORY: (
+        WETH_ADDRESS,
+        USDT_ADDRESS,
+        "0x8840C6252e2e86e545deFb6da98B2a0E26d8C1BA",
+    ),
+}
+
+
+class StandInReserveCaller:
+    """
+    Answers getReserves eth_calls from a dict of pair address to reserves,
+    with empty data for addresses without code.
+    """
+
+    def __init__(self, reserves):
+        self.reserves = {pair.lower(): value for pair, value in reserves.items()}
+        self.calls = []
+
+    def request(self, method, params):
+        return "0x10"
+
+    def call_many(self, calls, block="latest"):
+        self.calls.append(calls)
+        results = []
+        for to, data in calls:
+            assert data[:4] == get_selector("getReserves()")
+            if to.lower() not in self.reserves:
+                results.append(b"")
+                continue
+            reserve0, reserve1 = self.reserves[to.lower()]
+            results.append(
+                encode_abi(["uint112", "uint112", "uint32"], [reserve0, reserve1, 0])
+            )
+        return results
+
+
+"""
+Test computed pair addresses match the pairs the factories deployed
+"""
+
+
+def test_pair_address():
+    index = PairIndex("bsc-main")
+
+    assert (
+        index.pair_for(PANCAKESWAP_V2_FACTORY, BUSD_ADDRESS, WETH_ADDRESS)
+        == "0x58F876857a02D6762E0101bb5C46A8c1ED44Dc16"
+    )
+    assert (
+        index.pair_for(PANCAKESWAP_V2_FACTORY, WETH_ADDRESS, CAKE)
+        == "0x0eD7e52944161450477ee417DE9Cd3a859b14fD0"
+    )
+    assert (
+        index.pair_for(BISWAP_FACTORY, WETH_ADDRESS, USDT_ADDRESS)
+        == "0x8840C6252e2e86e545deFb6da98B2a0E26d8C1BA"
+    )
+    assert index.exists(BISWAP_FACTORY, USDT_ADDRESS, WETH_ADDRESS) is None
+
+
+"""
+Test every factory in the index derives a known mainnet pair, and hashes that
+are not 32 bytes are refused
+"""
+
+
+def test_init_code_hashes():
+    index = PairIndex("bsc-main")
+
+    assert set(KNOWN_PAIRS) == set(FACTORY_INIT_CODE_HASHES)
+    for factory, (token_a, token_b, pair) in KNOWN_PAIRS.items():
+        assert index.pair_for(factory, token_a, token_b) == pair
+    assert not index.covers(SUSHISWAP_V2_FACTORY)
+    with pytest.raises(PairIndexError):
+        PairIndex("bsc-main", {SUSHISWAP_V2_FACTORY: "0x" + "e1" * 32 + "c"})
+
+
+"""
+Test reserve reads mark pairs found or missing, and missing pairs are only read
+again once the recheck interval has passed
+"""
+
+
+def test_read_reserves__marks_existence():
+    index = PairIndex("bsc-main", recheck_blocks=100)
+    cake_pair = index.pair_for(PANCAKESWAP_V2_FACTORY, CAKE, WETH_ADDRESS)
+    caller = StandInReserveCaller({cake_pair: (5 * E18, 7 * E18)})
+    pairs = [
+        (PANCAKESWAP_V2_FACTORY, CAKE, WETH_ADDRESS),
+        (PANCAKESWAP_V2_FACTORY, TOKEN, WETH_ADDRESS),
+    ]
+
+    reserves = index.read_reserves(pairs, caller, 1000)
+
+    assert list(reserves.values()) == [(cake_pair, 5 * E18, 7 * E18)]
+    assert index.exists(PANCAKESWAP_V2_FACTORY, WETH_ADDRESS, CAKE) is True
+    assert index.exists(PANCAKESWAP_V2_FACTORY, WETH_ADDRESS, TOKEN) is False
+
+    index.read_reserves(pairs, caller, 1050)
+    assert len(caller.calls[1]) == 1
+    index.read_reserves(pairs, caller, 1100)
+    assert len(caller.calls[2]) == 2
+
+
+"""
+Test the index is saved and loaded per network
+"""
+
+
+def test_pair_index_store(tmp_path):
+    store = PairIndexStore(str(tmp_path / "pair_index.db"))
+    index = PairIndex("bsc-main", store=store)
+    index.mark(PANCAKESWAP_V2_FACTORY, CAKE, WETH_ADDRESS, True, 1000)
+    index.mark(PANCAKESWAP_V2_FACTORY, TOKEN, WETH_ADDRESS, False, 1000)
+    index.save()
+
+    loaded = PairIndex("bsc-main", store=store)
+    assert loaded.entries == index.entries
+    assert len(PairIndex("bsc-test", store=store)) == 0
+    store.close()
+
+
+"""
+Test the off-chain router reads reserves of indexed factories without getPair
+calls, and skips pairs the index knows are missing
+"""
+
+
+def test_liquid_path_router__no_get_pair():
+    index = PairIndex("bsc-main")
+    cake_pair = index.pair_for(PANCAKESWAP_V2_FACTORY, CAKE, WETH_ADDRESS)
+    index.mark(BISWAP_FACTORY, CAKE, WETH_ADDRESS, False, None)
+    caller = StandInReserveCaller({cake_pair: (1000 * E18, 10 * E18)})
+    router = LiquidPathRouter(
+        batch_caller=caller,
+        factories=[PANCAKESWAP_V2_FACTORY, BISWAP_FACTORY],
+        base_tokens=[],
+        pair_index=index,
+    )
+
+    factories, paths, amounts = router.getLiquidPaths(
+        [[[[CAKE, WETH_ADDRESS, E18, AMOUNT_TYPE_EXACT_IN]]]]
+    )
+
+    assert factories == [PANCAKESWAP_V2_FACTORY]
+    assert paths == [[CAKE, WETH_ADDRESS]]
+    assert amounts[0] > 0
+    assert caller.calls == [[(cake_pair, get_selector("getReserves()"))]]
@@ -0,0 +1,151 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from scripts.utils.price_cache import CachedPriceProvider, PriceCache
+
+CAKE = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+XVS = "0xBf5140A22578168FD562DCcF235E5D43A02ce9B1"
+ALPACA = "0x8F0528cE5eF7B51152A59745bEfDD91D97091d2F"
+TEST_PRICES = {CAKE: 13110000000000000, XVS: 18700000000000000, ALPACA: 682000000000}
+
+
+class CountingProvider:
+    def __init__(self):
+        self.calls = []
+
+    def get_prices(self, token_addresses, quote="bnb"):
+        self.calls.append(list(token_addresses))
+        return {address: TEST_PRICES[address] for address in token_addresses}
+
+
+class BlockingProvider(CountingProvider):
+    """
+    Holds its first call open until a second call comes in, so the two overlap.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def get_prices(self, token_addresses, quote="bnb"):
+        prices = super().get_prices(token_addresses, quote)
+        if len(self.calls) == 1:
+            self.started.set()
+            assert self.release.wait(5)
+        else:
+            self.release.set()
+        return prices
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+"""
+Test a rebalance cycle (owned, target, then both again for reporting) fetches
+each token once
+"""
+
+
+def test_cached_provider__one_fetch_per_token():
+    provider = CountingProvider()
+    cache = PriceCache()
+    cached_provider = CachedPriceProvider(provider, cache)
+
+    owned_prices = cached_provider.get_prices([CAKE, XVS])
+    target_prices = cached_provider.get_prices([XVS, ALPACA])
+    cached_provider.get_prices([CAKE, XVS])
+    cached_provider.get_prices([XVS, ALPACA])
+
+    assert provider.calls == [[CAKE, XVS], [ALPACA]]
+    assert owned_prices == {CAKE: TEST_PRICES[CAKE], XVS: TEST_PRICES[XVS]}
+    assert target_prices[ALPACA] == TEST_PRICES[ALPACA]
+    assert cache.stats() == {
+        "hits": 5,
+        "misses": 3,
+        "evictions": 0,
+        "fetches": 2,
+        "size": 3,
+    }
+
+
+"""
+Test owned and target prices fetched at the same time from two threads fetch
+a token they share once
+"""
+
+
+def test_cached_provider__overlapping_threads():
+    provider = BlockingProvider()
+    cache = PriceCache()
+    cached_provider = CachedPriceProvider(provider, cache)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        owned = executor.submit(cached_provider.get_prices, [CAKE, XVS])
+        provider.started.wait(5)
+        target = executor.submit(cached_provider.get_prices, [XVS, ALPACA])
+
+        assert owned.result(5) == {CAKE: TEST_PRICES[CAKE], XVS: TEST_PRICES[XVS]}
+        assert target.result(5) == {XVS: TEST_PRICES[XVS], ALPACA: TEST_PRICES[ALPACA]}
+
+    assert provider.calls == [[CAKE, XVS], [ALPACA]]
+    assert cache.stats()["fetches"] == 2
+
+
+"""
+Test entries expire after the TTL
+"""
+
+
+def test_price_cache__ttl():
+    clock = FakeClock()
+    cache = PriceCache(ttl=10, clock=clock)
+    cache.set(CAKE, 1)
+
+    clock.now = 9
+    assert cache.get(CAKE.lower()) == 1
+    clock.now = 10
+    assert cache.get(CAKE) is None
+    assert len(cache) == 0
+
+
+"""
+Test the least recently used entry is evicted first, and quotes are kept apart
+"""
+
+
+def test_price_cache__lru_eviction():
+    cache = PriceCache(maxsize=2)
+    cache.set(CAKE, 1)
+    cache.set(XVS, 2)
+    cache.get(CAKE)
+    cache.set(ALPACA, 3)
+
+    assert cache.get(XVS) is None
+    assert cache.get(CAKE) == 1
+    assert cache.get(CAKE, "usd") is None
+    assert cache.evictions == 1
+
+
+"""
+Test resetting the cache for a new cycle clears entries and counters
+"""
+
+
+def test_price_cache__reset():
+    cache = PriceCache()
+    cache.set(CAKE, 1)
+    cache.get(CAKE)
+    cache.reset()
+
+    assert cache.stats() == {
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+        "fetches": 0,
+        "size": 0,
+    }
@@ -0,0 +1,141 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlparse, parse_qs
+from scripts.utils.price_feed import (
+    CoinGeckoPriceProvider,
+    PriceFeedError,
+    TransientPriceFeedError,
+    is_transient,
+    prices_as_list,
+    to_wei_price,
+)
+
+CAKE = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+XVS = "0xBf5140A22578168FD562DCcF235E5D43A02ce9B1"
+ALPACA = "0x8F0528cE5eF7B51152A59745bEfDD91D97091d2F"
+UNKNOWN = "0x949D48EcA67b17269629c7194F4b727d4Ef9E5d6"
+RATE_LIMITED = "0x0eD7e52944161450477ee417DE9Cd3a859b14fD0"
+TEST_PRICES = {
+    CAKE.lower(): {"bnb": 0.01311},
+    XVS.lower(): {"bnb": 0.0187},
+    ALPACA.lower(): {"bnb": 0.000682},
+}
+
+
+class StandInCoinGecko(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        StandInCoinGecko.requests.append((url.path, query))
+        addresses = query["contract_addresses"][0].split(",")
+        currency = query["vs_currencies"][0]
+        if RATE_LIMITED.lower() in addresses:
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps({"status": {"error_code": 429}}).encode())
+            return
+        body = {
+            address: {currency: TEST_PRICES[address][currency]}
+            for address in addresses
+            if address in TEST_PRICES
+        }
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def coingecko_url():
+    server = HTTPServer(("127.0.0.1", 0), StandInCoinGecko)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/api/v3/"
+    server.shutdown()
+
+
+"""
+Test a whole basket is priced with a single request, keyed by checksum address
+"""
+
+
+def test_get_prices__single_request(coingecko_url):
+    StandInCoinGecko.requests.clear()
+    provider = CoinGeckoPriceProvider(api_base_url=coingecko_url)
+    prices = provider.get_prices([CAKE.lower(), XVS, ALPACA, CAKE])
+
+    assert len(StandInCoinGecko.requests) == 1
+    path, query = StandInCoinGecko.requests[0]
+    assert path == "/api/v3/simple/token_price/binance-smart-chain"
+    assert query["vs_currencies"] == ["bnb"]
+    assert prices == {
+        CAKE: 13110000000000000,
+        XVS: 18700000000000000,
+        ALPACA: 682000000000000,
+    }
+    assert prices_as_list([ALPACA, CAKE.lower()], prices) == [
+        682000000000000,
+        13110000000000000,
+    ]
+
+
+"""
+Test large baskets are split into batches
+"""
+
+
+def test_get_prices__batched(coingecko_url):
+    StandInCoinGecko.requests.clear()
+    provider = CoinGeckoPriceProvider(api_base_url=coingecko_url, batch_size=2)
+    prices = provider.get_prices([CAKE, XVS, ALPACA])
+
+    assert len(StandInCoinGecko.requests) == 2
+    assert len(prices) == 3
+
+
+"""
+Test a token without a price raises instead of returning a partial basket
+"""
+
+
+def test_get_prices__missing_token(coingecko_url):
+    provider = CoinGeckoPriceProvider(api_base_url=coingecko_url)
+
+    with pytest.raises(PriceFeedError):
+        provider.get_prices([CAKE, UNKNOWN])
+
+
+"""
+Test a rate limited request raises a transient error, to be retried, and a
+token without a price does not
+"""
+
+
+def test_get_prices__transient_errors(coingecko_url):
+    provider = CoinGeckoPriceProvider(api_base_url=coingecko_url)
+
+    with pytest.raises(TransientPriceFeedError):
+        provider.get_prices([CAKE, RATE_LIMITED])
+    with pytest.raises(PriceFeedError) as error:
+        provider.get_prices([CAKE, UNKNOWN])
+
+    assert not is_transient(error.value)
+    assert is_transient(ConnectionError("connection reset"))
+
+
+"""
+Test float prices are converted to wei without binary rounding error
+"""
+
+
+def test_to_wei_price():
+    assert to_wei_price(0.000682) == 682000000000000
+    assert to_wei_price(1) == 10**18
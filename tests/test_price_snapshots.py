@@ -0,0 +1,86 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from scripts.utils.price_feed import PriceFeedError
+from scripts.utils.price_snapshots import PriceSnapshotStore, SnapshotPriceProvider
+
+CAKE = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+XVS = "0xBf5140A22578168FD562DCcF235E5D43A02ce9B1"
+ALPACA = "0x8F0528cE5eF7B51152A59745bEfDD91D97091d2F"
+# Larger than SQLite's 64 bit integers
+LARGE_PRICE = 2**96 + 1
+
+
+"""
+Test a saved snapshot round trips with its block number and exact prices
+"""
+
+
+def test_save_and_load(tmp_path):
+    store = PriceSnapshotStore(str(tmp_path / "prices.db"))
+    name = store.save(
+        {CAKE.lower(): 13110000000000000, XVS: LARGE_PRICE},
+        block_number=25000000,
+        timestamp=1670000000.5,
+    )
+
+    snapshot = store.get_snapshot(name)
+    assert name == "25000000-1670000000500"
+    assert snapshot["block_number"] == 25000000
+    assert snapshot["timestamp"] == 1670000000.5
+    assert snapshot["prices"] == {CAKE: 13110000000000000, XVS: LARGE_PRICE}
+
+
+"""
+Test a store first used on one thread saves from another, as the async
+pipeline's executor threads do
+"""
+
+
+def test_save__across_threads(tmp_path):
+    store = PriceSnapshotStore(str(tmp_path / "prices.db"))
+    store.save({CAKE: 1}, block_number=1, name="main")
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(store.save, {CAKE: 2}, 2, "worker").result()
+
+    assert [snapshot["name"] for snapshot in store.list_snapshots()] == [
+        "main",
+        "worker",
+    ]
+
+
+"""
+Test snapshots persist across connections and are listed in order
+"""
+
+
+def test_list_snapshots(tmp_path):
+    path = str(tmp_path / "prices.db")
+    store = PriceSnapshotStore(path)
+    store.save({CAKE: 1}, block_number=1, name="first")
+    store.save({CAKE: 2}, block_number=2, name="second")
+    store.close()
+
+    store = PriceSnapshotStore(path)
+    assert [snapshot["name"] for snapshot in store.list_snapshots()] == [
+        "first",
+        "second",
+    ]
+    assert store.latest() == "second"
+
+
+"""
+Test a replay provider serves snapshot prices and rejects unknown tokens
+"""
+
+
+def test_snapshot_price_provider(tmp_path):
+    store = PriceSnapshotStore(str(tmp_path / "prices.db"))
+    store.save({CAKE: 1, XVS: 2}, block_number=1, name="ci")
+    provider = SnapshotPriceProvider(store, "ci")
+
+    assert provider.get_prices([XVS, CAKE.lower()]) == {XVS: 2, CAKE: 1}
+    with pytest.raises(PriceFeedError):
+        provider.get_prices([ALPACA])
+    with pytest.raises(PriceFeedError):
+        SnapshotPriceProvider(store, "missing").get_prices([CAKE])
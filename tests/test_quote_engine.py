@@ -0,0 +1,182 @@
+import random
+from scripts.utils.dex import (
+    AMOUNT_TYPE_EXACT_IN,
+    AMOUNT_TYPE_EXACT_OUT,
+    BUSD_ADDRESS,
+    USDT_ADDRESS,
+    WETH_ADDRESS,
+    ZERO_ADDRESS,
+)
+from scripts.utils.liquid_path import ReserveSnapshot, SwapLibraryError
+from scripts.utils.quote_engine import (
+    MatrixRouter,
+    best_routes,
+    candidate_paths,
+    quote_exact_in,
+    quote_exact_out,
+)
+
+SEED = 23
+FACTORY_A = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+FACTORY_B = "0xc35DADB65012eC5796536bD9864eD8773aBc74C4"
+TOKEN = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+UINT112_MAX = 2**112 - 1
+
+
+def random_snapshot(rng, reserve_max=10**24):
+    """
+    @return snapshot with random reserves, including empty, missing and
+    uint112 sized pairs.
+    """
+    snapshot = ReserveSnapshot(1)
+    tokens = [WETH_ADDRESS, TOKEN, USDT_ADDRESS, BUSD_ADDRESS]
+    for i, factory in enumerate([FACTORY_A, FACTORY_B]):
+        for a in range(0, len(tokens)):
+            for b in range(a + 1, len(tokens)):
+                kind = rng.random()
+                if kind < 0.1:
+                    snapshot.add_pair(factory, tokens[a], tokens[b], ZERO_ADDRESS)
+                    continue
+                if kind < 0.2:
+                    reserves = (0, rng.randint(0, reserve_max))
+                elif kind < 0.3:
+                    reserves = (UINT112_MAX, rng.randint(1, UINT112_MAX))
+                else:
+                    reserves = (
+                        rng.randint(1, reserve_max),
+                        rng.randint(1, reserve_max),
+                    )
+                pair = "0x%040x" % (i * 100 + a * 10 + b + 1)
+                snapshot.add_pair(factory, tokens[a], tokens[b], pair, *reserves)
+    return snapshot, tokens
+
+
+def scalar_amount_in(snapshot, factory, path, amount_out):
+    try:
+        return snapshot.get_amounts_in(factory, amount_out, path)[0]
+    except SwapLibraryError:
+        return None
+
+
+def scalar_amount_out(snapshot, factory, path, amount_in):
+    try:
+        return snapshot.get_amounts_out(factory, amount_in, path)[-1]
+    except SwapLibraryError:
+        return None
+
+
+"""
+Test vectorised exact out quotes match getAmountsIn rounding and reverts on
+direct and tri paths across factories
+"""
+
+
+def test_quote_exact_out__matches_library():
+    rng = random.Random(SEED)
+    for round in range(0, 20):
+        snapshot, tokens = random_snapshot(rng)
+        candidates = []
+        amounts_out = []
+        for i in range(0, 50):
+            path = rng.sample(tokens, rng.choice([2, 3]))
+            if rng.random() < 0.05:
+                path[-1] = path[0]
+            candidates.append((rng.choice([FACTORY_A, FACTORY_B]), path))
+            amounts_out.append(rng.choice([0, 1, rng.randint(1, 10**24), 2**200]))
+
+        amounts_in = quote_exact_out(snapshot, candidates, amounts_out)
+
+        assert amounts_in == [
+            scalar_amount_in(snapshot, factory, path, amount_out)
+            for (factory, path), amount_out in zip(candidates, amounts_out)
+        ]
+        assert any(amount is None for amount in amounts_in)
+        assert any(amount is not None for amount in amounts_in)
+
+
+"""
+Test vectorised exact in quotes match getAmountsOut, both where every product
+fits in int64 and where uint112 reserves need Python ints
+"""
+
+
+def test_quote_exact_in__matches_library():
+    rng = random.Random(SEED)
+    for round in range(0, 20):
+        snapshot, tokens = random_snapshot(rng, rng.choice([10**6, 10**24]))
+        candidates = []
+        amounts_in = []
+        for i in range(0, 50):
+            path = rng.sample(tokens, rng.choice([2, 3]))
+            candidates.append((rng.choice([FACTORY_A, FACTORY_B]), path))
+            amounts_in.append(rng.choice([0, 1, rng.randint(1, 10**3)]))
+
+        amounts_out = quote_exact_in(snapshot, candidates, amounts_in)
+
+        assert amounts_out == [
+            scalar_amount_out(snapshot, factory, path, amount_in)
+            for (factory, path), amount_in in zip(candidates, amounts_in)
+        ]
+        assert any(amount is None for amount in amounts_out)
+
+
+"""
+Test best_routes takes the best quote of the direct and base token paths on
+every factory for each order of a batch
+"""
+
+
+def test_best_routes__best_of_candidates():
+    rng = random.Random(SEED)
+    factories = [FACTORY_A, FACTORY_B]
+    base_tokens = [USDT_ADDRESS, BUSD_ADDRESS]
+    for round in range(0, 10):
+        snapshot, tokens = random_snapshot(rng)
+        orders = [
+            [WETH_ADDRESS, TOKEN, rng.randint(1, 10**22), AMOUNT_TYPE_EXACT_IN],
+            [TOKEN, WETH_ADDRESS, rng.randint(1, 10**22), AMOUNT_TYPE_EXACT_OUT],
+            [TOKEN, USDT_ADDRESS, rng.randint(1, 10**22), AMOUNT_TYPE_EXACT_IN],
+        ]
+
+        routes = best_routes(snapshot, orders, factories, base_tokens)
+
+        for order, factory, path, amount in zip(orders, *routes):
+            token_in, token_out, token_amount, amount_type = order
+            quote = (
+                scalar_amount_out
+                if amount_type == AMOUNT_TYPE_EXACT_IN
+                else scalar_amount_in
+            )
+            quotes = [
+                quote(snapshot, f, p, token_amount)
+                for f in factories
+                for p in candidate_paths(token_in, token_out, base_tokens)
+            ]
+            quotes = [q for q in quotes if q is not None and q > 0]
+            if len(quotes) == 0:
+                assert (factory, path, amount) == (FACTORY_A, [], 0)
+                continue
+            best = max(quotes) if amount_type == AMOUNT_TYPE_EXACT_IN else min(quotes)
+            assert amount == best
+            assert quote(snapshot, factory, path, token_amount) == best
+
+
+"""
+Test the matrix router answers getLiquidPaths for a batch with best_routes,
+and an empty batch with nothing
+"""
+
+
+def test_matrix_router__get_liquid_paths():
+    rng = random.Random(SEED)
+    snapshot, tokens = random_snapshot(rng)
+    router = MatrixRouter(
+        snapshot, factories=[FACTORY_A, FACTORY_B], base_tokens=[USDT_ADDRESS]
+    )
+    router.load = lambda orders: None
+    orders = [[WETH_ADDRESS, TOKEN, 10**18, AMOUNT_TYPE_EXACT_IN]]
+
+    assert router.getLiquidPaths([[orders]]) == best_routes(
+        snapshot, orders, [FACTORY_A, FACTORY_B], [USDT_ADDRESS]
+    )
+    assert router.getLiquidPaths([[[]]]) == ([], [], [])
@@ -0,0 +1,129 @@
+import asyncio
+import time
+from scripts.utils import asset_prices
+from scripts.utils.order_builder import rebalance
+from scripts.utils.rebalance_pipeline import StageTimer, rebalance_async
+from scripts.utils.rebalance_planner import DETFBalances
+from tests.test_fleet_rebalancer import (
+    PRICES,
+    TARGET,
+    TARGET_WEIGHTS,
+    TOKEN_A,
+    TOKEN_B,
+    StandInAccount,
+)
+from tests.test_order_builder import StandInRouter
+from tests.test_rebalance_planner import StandInBatchCaller
+
+DETF = "0x949D48Eca67B17269629c7194F4B727D4eF9e5D7"
+MULTICALL = "0x6C9f36A5a36f4f4d8f4Ba6ba7E7f0A6Ee8Ab5b2e"
+OWNED = [TOKEN_A, TOKEN_B]
+BALANCES = [3 * 10**18, 250 * 10**18]
+WETH_BALANCE = 10**17
+# Seconds each stand-in waits, as a round trip would
+LATENCY = 0.05
+
+
+class StandInDETF:
+    address = DETF
+
+    def getTotalDeposited(self):
+        return 10**18
+
+
+class StandInMulticall:
+    address = MULTICALL
+
+
+class SlowPriceProvider:
+    def get_prices(self, token_addresses):
+        time.sleep(LATENCY)
+        return {token: PRICES[token] for token in token_addresses}
+
+
+class SlowRouter(StandInRouter):
+    def getLiquidPaths(self, swap_orders):
+        time.sleep(LATENCY)
+        return super().getLiquidPaths(swap_orders)
+
+
+def overlaps(timer, first, second):
+    stages = {
+        name: (offset, offset + duration) for name, offset, duration in timer.stages
+    }
+    return stages[first][0] < stages[second][1] and stages[second][0] < stages[first][1]
+
+
+"""
+Test the pipeline fetches the target prices alongside the balance snapshot,
+saves the price snapshot before sending, and sends the same calldata as the
+serial rebalance
+"""
+
+
+def test_rebalance_async__overlapped_stages(monkeypatch):
+    monkeypatch.setattr(asset_prices, "REPLAY_PRICE_SNAPSHOT", "pipeline")
+    batch_caller = StandInBatchCaller(
+        (OWNED, OWNED, BALANCES, [18, 18], WETH_BALANCE, 0)
+    )
+    account = StandInAccount()
+
+    timer = asyncio.run(
+        rebalance_async(
+            account,
+            StandInDETF(),
+            SlowRouter(),
+            TARGET,
+            TARGET_WEIGHTS,
+            SlowPriceProvider(),
+            StandInMulticall(),
+            batch_caller=batch_caller,
+        )
+    )
+
+    assert overlaps(timer, "target prices", "owned prices")
+    assert timer.elapsed() < timer.serial_seconds()
+    names = [name for name, offset, duration in timer.stages]
+    assert names.count("route sells") == 1 and names.count("route buys") == 1
+    assert "balance snapshot after" in names
+    stages = {name: (offset, duration) for name, offset, duration in timer.stages}
+    assert sum(stages["price snapshot"]) <= stages["send"][0]
+
+    serial_account = StandInAccount()
+    rebalance(
+        serial_account,
+        StandInDETF(),
+        StandInRouter(),
+        OWNED,
+        [PRICES[token] for token in OWNED],
+        TARGET,
+        TARGET_WEIGHTS,
+        [PRICES[token] for token in TARGET],
+        DETFBalances(
+            OWNED,
+            dict(zip(OWNED, BALANCES)),
+            {TOKEN_A: 18, TOKEN_B: 18},
+            WETH_BALANCE,
+        ),
+    )
+    assert account.calldata[DETF] == serial_account.calldata[DETF]
+
+
+"""
+Test stage timings are offsets from the start of the run
+"""
+
+
+def test_stage_timer__offsets():
+    now = [10.0]
+    timer = StageTimer(lambda: now[0])
+
+    def stage():
+        now[0] += 2.0
+
+    timer.run_inline("first", stage)
+    timer.run_inline("second", stage)
+
+    assert timer.stages == [("first", 0.0, 2.0), ("second", 2.0, 2.0)]
+    assert timer.serial_seconds() == 4.0
+    assert timer.elapsed() == 4.0
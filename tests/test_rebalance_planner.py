@@ -0,0 +1,228 @@
+import pytest
+from scripts.utils.rebalance_planner import (
+    DETFBalances,
+    DriftTolerance,
+    RebalancerError,
+    create_adjust_to_sell_order,
+    create_buy_list,
+    create_buy_order,
+    create_sell_list,
+    plan_first_deposit,
+    plan_rebalance,
+    read_multicall_balances,
+)
+
+TOKEN_A = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+TOKEN_B = "0xBf5140A22578168FD562DCcF235E5D43A02ce9B1"
+TOKEN_C = "0x8F0528cE5eF7B51152A59745bEfDD91D97091d2F"
+TOKEN_D = "0x949D48EcA67b17269629c7194F4b727d4Ef9E5d6"
+
+OWNED = [TOKEN_A, TOKEN_B, TOKEN_C]
+OWNED_PRICES = [2 * 10**17, 3 * 10**15, 5 * 10**16]
+TARGET = [TOKEN_B, TOKEN_C, TOKEN_D]
+TARGET_WEIGHTS = [50000000, 20000000, 30000000]
+TARGET_PRICES = [3 * 10**15, 5 * 10**16, 10**16]
+DETF = "0x949D48Eca67B17269629c7194F4B727D4eF9e5D7"
+MULTICALL = "0x6C9f36A5a36f4f4d8f4Ba6ba7E7f0A6Ee8Ab5b2e"
+
+
+def snapshot():
+    return DETFBalances(
+        OWNED,
+        {TOKEN_A: 3 * 10**18, TOKEN_B: 250 * 10**6, TOKEN_C: 12 * 10**18},
+        {TOKEN_A: 18, TOKEN_B: 6, TOKEN_C: 18},
+        7 * 10**17,
+    )
+
+
+class StandInBatchCaller:
+    """
+    Answers eth_calls with the ABI encoded getDETFBalanceSnapshot result.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.calls = []
+
+    def call_many(self, calls, block="latest"):
+        from eth_abi import encode_abi
+
+        self.calls.append(calls)
+        return [
+            encode_abi(
+                ["(address[],address[],uint256[],uint8[],uint256,uint256)"],
+                [self.snapshot],
+            )
+        ]
+
+
+"""
+Test balances are scaled by token decimals as PolybitDETF.getTokenBalance
+"""
+
+
+def test_get_token_balance__decimals():
+    balances = snapshot()
+
+    assert balances.get_token_balance(TOKEN_B, 3 * 10**15) == (
+        250 * 10**6,
+        750 * 10**15,
+    )
+    assert balances.get_token_balance(TOKEN_A.lower(), 2 * 10**17) == (
+        3 * 10**18,
+        6 * 10**17,
+    )
+    assert balances.get_total_balance_in_weth(OWNED_PRICES) == 265 * 10**16
+
+
+"""
+Test the sell and buy lists split owned and target assets
+"""
+
+
+def test_create_lists():
+    assert create_sell_list(OWNED, OWNED_PRICES, TARGET) == (
+        [TOKEN_A],
+        [2 * 10**17],
+    )
+    assert create_sell_list(OWNED, OWNED_PRICES, []) == (OWNED, OWNED_PRICES)
+    assert create_buy_list(OWNED, TARGET, TARGET_WEIGHTS, TARGET_PRICES) == (
+        [TOKEN_D],
+        [30000000],
+        [10**16],
+    )
+    assert create_buy_list([], TARGET, TARGET_WEIGHTS, TARGET_PRICES) == (
+        TARGET,
+        TARGET_WEIGHTS,
+        TARGET_PRICES,
+    )
+    with pytest.raises(RebalancerError):
+        create_sell_list(OWNED, OWNED_PRICES[0:2], TARGET)
+
+
+"""
+Test buy amounts share the WETH balance by weight with floor division
+"""
+
+
+def test_create_buy_order():
+    amounts_in, amounts_out = create_buy_order(
+        [TOKEN_B, TOKEN_D],
+        [25000000, 75000000],
+        [3 * 10**15, 7 * 10**15],
+        10**18,
+        10**8,
+    )
+
+    assert amounts_in == [25 * 10**16, 75 * 10**16]
+    assert amounts_out == [
+        (10**18 * 25 * 10**16) // (3 * 10**15),
+        (10**18 * 75 * 10**16) // (7 * 10**15),
+    ]
+
+
+"""
+Test an overweight token is sold down to its target share
+"""
+
+
+def test_create_adjust_to_sell_order():
+    amounts_in, amounts_out = create_adjust_to_sell_order(
+        snapshot(), OWNED_PRICES, [TOKEN_C], [20000000], [5 * 10**16]
+    )
+
+    # 6 of 26.5 WETH is 22641509 of 10**8, sold down to 20000000
+    assert amounts_in == [12 * 10**18 - (12 * 10**18 * 20000000) // 22641509]
+    assert amounts_out == [6 * 10**17 - (6 * 10**17 * 20000000) // 22641509]
+
+
+"""
+Test a full plan sizes buys from the WETH raised by the sells
+"""
+
+
+def test_plan_rebalance():
+    plan = plan_rebalance(
+        snapshot(), OWNED, OWNED_PRICES, TARGET, TARGET_WEIGHTS, TARGET_PRICES
+    )
+
+    assert plan["sellList"] == [TOKEN_A]
+    assert plan["adjustToSellList"] == [TOKEN_C]
+    assert plan["adjustToBuyList"] == [TOKEN_B]
+    assert plan["buyList"] == [TOKEN_D]
+    assert plan["wethBalance"] == (
+        7 * 10**17 + 6 * 10**17 + plan["adjustToSellListAmountsOut"][0]
+    )
+    assert (
+        sum(plan["adjustToBuyListAmountsIn"]) + sum(plan["buyListAmountsIn"])
+        <= plan["wethBalance"]
+    )
+
+
+"""
+Test an incremental plan leaves out adjustments within the drift tolerance
+"""
+
+
+def test_plan_rebalance__drift_tolerance():
+    args = (snapshot(), OWNED, OWNED_PRICES, TARGET, TARGET_WEIGHTS, TARGET_PRICES)
+
+    # TOKEN_C is 264 bps, or 0.07 WETH, over its target
+    for tolerance in [DriftTolerance(300), DriftTolerance(0, 10**17)]:
+        plan = plan_rebalance(*args, tolerance)
+        assert plan["adjustToSellList"] == []
+        assert plan["adjustToBuyList"] == [TOKEN_B]
+        assert plan["wethBalance"] == 7 * 10**17 + 6 * 10**17
+
+    assert plan_rebalance(*args, DriftTolerance(250)) == plan_rebalance(*args)
+    assert plan_rebalance(*args, DriftTolerance()) == plan_rebalance(*args)
+
+
+"""
+Test a first deposit buys every target asset by weight
+"""
+
+
+def test_plan_first_deposit():
+    plan = plan_first_deposit([], TARGET, TARGET_WEIGHTS, TARGET_PRICES, 10**18)
+
+    assert plan["buyList"] == TARGET
+    assert plan["totalTargetPercentage"] == 10**8
+    assert plan["buyListAmountsIn"] == [5 * 10**17, 2 * 10**17, 3 * 10**17]
+
+
+"""
+Test reverting contract arithmetic raises
+"""
+
+
+def test_plan__reverts():
+    with pytest.raises(RebalancerError):
+        create_buy_order([TOKEN_D], [10**8], [10**16], 10**18, 0)
+    with pytest.raises(RebalancerError):
+        snapshot().get_token_balance(TOKEN_D, 10**16)
+
+
+"""
+Test the multicall snapshot is read with one eth_call and answers the DETF views
+"""
+
+
+def test_read_multicall_balances():
+    batch_caller = StandInBatchCaller(
+        (
+            OWNED,
+            OWNED + [TOKEN_D],
+            [3 * 10**18, 250 * 10**6, 12 * 10**18, 0],
+            [18, 6, 18, 18],
+            7 * 10**17,
+            10**15,
+        )
+    )
+    balances = read_multicall_balances(MULTICALL, DETF, [TOKEN_D], batch_caller)
+
+    assert len(batch_caller.calls) == 1
+    assert batch_caller.calls[0][0][0] == MULTICALL
+    assert balances.owned_assets == OWNED
+    assert balances.get_token_balance(TOKEN_D, 10**16) == (0, 0)
+    assert balances.get_total_balance_in_weth(OWNED_PRICES) == 265 * 10**16 + 10**15
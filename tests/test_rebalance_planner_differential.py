@@ -0,0 +1,189 @@
+import pytest
+from brownie import accounts, MockDETF, MockERC20, PolybitRebalancer
+from scripts.utils.rebalance_planner import (
+    DriftTolerance,
+    calc_total_target_buy_percentage,
+    create_adjust_list,
+    create_adjust_to_buy_list,
+    create_adjust_to_buy_order,
+    create_adjust_to_sell_list,
+    create_adjust_to_sell_order,
+    create_buy_list,
+    create_buy_order,
+    create_sell_list,
+    create_sell_order,
+    read_detf_balances,
+)
+from scripts.utils.rpc_batch import BatchCaller
+
+OWNER = accounts[0]
+
+
+@pytest.fixture(scope="module")
+def basket():
+    rebalancer = PolybitRebalancer.deploy({"from": OWNER})
+    weth = MockERC20.deploy("Wrapped BNB", "WBNB", 18, {"from": OWNER})
+    detf = MockDETF.deploy(weth.address, {"from": OWNER})
+    tokens = [
+        MockERC20.deploy("Token A", "A", 18, {"from": OWNER}),
+        MockERC20.deploy("Token B", "B", 6, {"from": OWNER}),
+        MockERC20.deploy("Token C", "C", 18, {"from": OWNER}),
+        MockERC20.deploy("Token D", "D", 9, {"from": OWNER}),
+    ]
+    balances = [3 * 10**18, 250 * 10**6, 12 * 10**18, 0]
+    for token, balance in zip(tokens, balances):
+        token.mint(detf.address, balance, {"from": OWNER})
+    weth.mint(detf.address, 7 * 10**17, {"from": OWNER})
+
+    owned = [token.address for token in tokens[0:3]]
+    detf.setOwnedAssets(owned, {"from": OWNER})
+    owned_prices = [2 * 10**17, 3 * 10**15, 5 * 10**16]
+    target = [tokens[1].address, tokens[2].address, tokens[3].address]
+    target_weights = [50000000, 20000000, 30000000]
+    target_prices = [3 * 10**15, 5 * 10**16, 10**16]
+    snapshot = read_detf_balances(
+        detf.address,
+        owned,
+        target,
+        weth_address=weth.address,
+        batch_caller=BatchCaller(),
+    )
+    return (
+        rebalancer,
+        detf,
+        snapshot,
+        owned,
+        owned_prices,
+        target,
+        target_weights,
+        target_prices,
+    )
+
+
+"""
+Test every list and order function matches the deployed PolybitRebalancer
+"""
+
+
+def test_planner__matches_rebalancer(basket):
+    (
+        rebalancer,
+        detf,
+        snapshot,
+        owned,
+        owned_prices,
+        target,
+        target_weights,
+        target_prices,
+    ) = basket
+
+    sell = create_sell_list(owned, owned_prices, target)
+    assert [list(x) for x in sell] == [
+        list(x) for x in rebalancer.createSellList(owned, owned_prices, target)
+    ]
+
+    adjust = create_adjust_list(owned, owned_prices, target, target_weights)
+    assert [list(x) for x in adjust] == [
+        list(x)
+        for x in rebalancer.createAdjustList(
+            owned, owned_prices, target, target_weights
+        )
+    ]
+
+    total_balance = detf.getTotalBalanceInWeth(owned_prices)
+    assert snapshot.get_total_balance_in_weth(owned_prices) == total_balance
+
+    adjust_to_sell = create_adjust_to_sell_list(snapshot, total_balance, *adjust)
+    assert [list(x) for x in adjust_to_sell] == [
+        list(x)
+        for x in rebalancer.createAdjustToSellList(detf.address, total_balance, *adjust)
+    ]
+    adjust_to_buy = create_adjust_to_buy_list(snapshot, total_balance, *adjust)
+    assert [list(x) for x in adjust_to_buy] == [
+        list(x)
+        for x in rebalancer.createAdjustToBuyList(detf.address, total_balance, *adjust)
+    ]
+
+    for bps, min_weth_notional in [(50, 0), (500, 0), (0, 10**17)]:
+        tolerance = DriftTolerance(bps, min_weth_notional)
+        assert [
+            list(x)
+            for x in create_adjust_to_sell_list(
+                snapshot, total_balance, *adjust, tolerance
+            )
+        ] == [
+            list(x)
+            for x in rebalancer.createAdjustToSellListWithTolerance(
+                detf.address, total_balance, *adjust, bps, min_weth_notional
+            )
+        ]
+        assert [
+            list(x)
+            for x in create_adjust_to_buy_list(
+                snapshot, total_balance, *adjust, tolerance
+            )
+        ] == [
+            list(x)
+            for x in rebalancer.createAdjustToBuyListWithTolerance(
+                detf.address, total_balance, *adjust, bps, min_weth_notional
+            )
+        ]
+
+    buy = create_buy_list(owned, target, target_weights, target_prices)
+    assert [list(x) for x in buy] == [
+        list(x)
+        for x in rebalancer.createBuyList(owned, target, target_weights, target_prices)
+    ]
+
+    total_target_percentage = calc_total_target_buy_percentage(
+        snapshot, owned_prices, *adjust_to_buy, buy[0], buy[1]
+    )
+    assert total_target_percentage == rebalancer.calcTotalTargetBuyPercentage(
+        owned_prices, *adjust_to_buy, buy[0], buy[1], detf.address
+    )
+
+    assert [list(x) for x in create_sell_order(snapshot, *sell)] == [
+        list(x) for x in rebalancer.createSellOrder(*sell, detf.address)
+    ]
+    assert [
+        list(x)
+        for x in create_adjust_to_sell_order(snapshot, owned_prices, *adjust_to_sell)
+    ] == [
+        list(x)
+        for x in rebalancer.createAdjustToSellOrder(
+            owned_prices, *adjust_to_sell, detf.address
+        )
+    ]
+
+    # Token A is sold, C is adjusted down, B adjusted up and D bought
+    assert sell[0] == [owned[0]]
+    assert adjust_to_sell[0] == [owned[2]]
+    assert adjust_to_buy[0] == [owned[1]]
+    assert buy[0] == [target[2]]
+
+    weth_balance = snapshot.weth_balance
+    assert [
+        list(x)
+        for x in create_adjust_to_buy_order(
+            snapshot,
+            total_balance,
+            weth_balance,
+            *adjust_to_buy,
+            total_target_percentage
+        )
+    ] == [
+        list(x)
+        for x in rebalancer.createAdjustToBuyOrder(
+            total_balance,
+            weth_balance,
+            *adjust_to_buy,
+            total_target_percentage,
+            detf.address
+        )
+    ]
+    assert [
+        list(x) for x in create_buy_order(*buy, weth_balance, total_target_percentage)
+    ] == [
+        list(x)
+        for x in rebalancer.createBuyOrder(*buy, weth_balance, total_target_percentage)
+    ]
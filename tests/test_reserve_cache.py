@@ -0,0 +1,118 @@
+from eth_abi import encode_abi
+from scripts.utils.order_data import get_selector
+from scripts.utils.reserve_cache import SYNC_EVENT, ReserveCache
+from scripts.utils.simulation import event_topic
+
+PAIR_A = "0x0eD7e52944161450477ee417DE9Cd3a859b14fD0"
+PAIR_B = "0x58F876857a02D6762E0101bb5C46A8c1ED44Dc16"
+PAIR_C = "0x8840C6252e2e86e545deFb6da98B2a0E26d8C1BA"
+E18 = 10**18
+
+
+def sync_log(pair, block, log_index, reserve0, reserve1):
+    return {
+        "address": pair.lower(),
+        "topics": [event_topic(SYNC_EVENT)],
+        "data": "0x" + encode_abi(["uint112", "uint112"], [reserve0, reserve1]).hex(),
+        "blockNumber": hex(block),
+        "logIndex": hex(log_index),
+    }
+
+
+class StandInNode:
+    """
+    Answers getReserves from a dict of pair reserves, and eth_getLogs from a
+    list of Sync logs.
+    """
+
+    def __init__(self, block, reserves, logs=()):
+        self.block = block
+        self.reserves = {pair.lower(): value for pair, value in reserves.items()}
+        self.logs = list(logs)
+        self.reads = []
+        self.log_requests = []
+
+    def request(self, method, params):
+        if method == "eth_blockNumber":
+            return hex(self.block)
+        if method == "eth_getLogs":
+            query = params[0]
+            self.log_requests.append(query)
+            return [
+                log
+                for log in self.logs
+                if log["address"] in query["address"]
+                and int(query["fromBlock"], 16)
+                <= int(log["blockNumber"], 16)
+                <= int(query["toBlock"], 16)
+            ]
+
+    def call_many(self, calls, block="latest"):
+        self.reads.append([to for to, data in calls])
+        results = []
+        for to, data in calls:
+            assert data[:4] == get_selector("getReserves()")
+            if to.lower() not in self.reserves:
+                results.append(b"")
+                continue
+            reserve0, reserve1 = self.reserves[to.lower()]
+            results.append(
+                encode_abi(["uint112", "uint112", "uint32"], [reserve0, reserve1, 0])
+            )
+        return results
+
+
+"""
+Test pairs are read once, then kept current from Sync logs in block and log
+order without being read again
+"""
+
+
+def test_reserve_cache__sync():
+    node = StandInNode(100, {PAIR_A: (5 * E18, 7 * E18), PAIR_B: (E18, 2 * E18)})
+    cache = ReserveCache(node)
+
+    assert cache.get_reserves([PAIR_A, PAIR_B, PAIR_C]) == [
+        (5 * E18, 7 * E18),
+        (E18, 2 * E18),
+        None,
+    ]
+    assert node.reads == [[PAIR_A.lower(), PAIR_B.lower(), PAIR_C.lower()]]
+
+    node.block = 103
+    node.logs = [
+        sync_log(PAIR_A, 102, 1, 9 * E18, 3 * E18),
+        sync_log(PAIR_A, 101, 4, 6 * E18, 6 * E18),
+        sync_log(PAIR_A, 102, 0, 8 * E18, 4 * E18),
+    ]
+    assert cache.get_reserves([PAIR_A, PAIR_B]) == [
+        (9 * E18, 3 * E18),
+        (E18, 2 * E18),
+    ]
+    assert len(node.reads) == 1
+    assert node.log_requests[0]["fromBlock"] == hex(101)
+    assert cache.syncs == 3
+
+
+"""
+Test entries not refreshed within the age limit are evicted and read again,
+and a gap too wide to replay from logs starts the cache over
+"""
+
+
+def test_reserve_cache__eviction():
+    node = StandInNode(100, {PAIR_A: (5 * E18, 7 * E18), PAIR_B: (E18, 2 * E18)})
+    cache = ReserveCache(node, max_age_blocks=10, max_log_blocks=50)
+    cache.get_reserves([PAIR_A, PAIR_B])
+
+    node.logs = [sync_log(PAIR_A, 105, 0, 6 * E18, 6 * E18)]
+    cache.get_reserves([PAIR_A], 112)
+    assert list(cache.entries.keys()) == [PAIR_A.lower()]
+    assert cache.evictions == 1
+
+    assert cache.get_reserves([PAIR_B], 112) == [(E18, 2 * E18)]
+    assert node.reads[-1] == [PAIR_B.lower()]
+
+    cache.get_reserves([PAIR_A], 200)
+    assert len(node.log_requests) == 1
+    assert node.reads[-1] == [PAIR_A.lower()]
@@ -0,0 +1,47 @@
+from brownie import accounts, chain, MockERC20, MockSwapFactory, MockSwapPair
+from scripts.utils.reserve_cache import ReserveCache
+from scripts.utils.rpc_batch import BatchCaller
+
+OWNER = accounts[0]
+E18 = 10**18
+
+
+def deploy_pairs(count):
+    factory = MockSwapFactory.deploy({"from": OWNER})
+    weth = MockERC20.deploy("Wrapped BNB", "WBNB", 18, {"from": OWNER})
+    pairs = []
+    for i in range(0, count):
+        token = MockERC20.deploy(f"Token {i}", f"T{i}", 18, {"from": OWNER})
+        factory.createPair(token.address, weth.address, {"from": OWNER}).wait(1)
+        pair = MockSwapPair.at(factory.getPair(token.address, weth.address))
+        pair.setReserves((i + 1) * E18, (i + 2) * E18, {"from": OWNER})
+        pairs.append(pair)
+    return pairs
+
+
+"""
+Test the cache follows the Sync events of mock pairs on a local chain, reading
+each pair's reserves once
+"""
+
+
+def test_reserve_cache__local_chain_sync():
+    pairs = deploy_pairs(3)
+    batch_caller = BatchCaller()
+    cache = ReserveCache(batch_caller)
+    addresses = [pair.address for pair in pairs]
+
+    assert cache.get_reserves(addresses) == [
+        ((i + 1) * E18, (i + 2) * E18) for i in range(0, 3)
+    ]
+    assert cache.reads == 3
+
+    pairs[0].setReserves(10 * E18, 11 * E18, {"from": OWNER})
+    pairs[2].setReserves(12 * E18, 13 * E18, {"from": OWNER})
+    pairs[2].setReserves(14 * E18, 15 * E18, {"from": OWNER})
+    chain.mine()
+
+    assert cache.get_reserves(addresses) == [pair.getReserves()[0:2] for pair in pairs]
+    assert cache.get_reserves(addresses)[2] == (14 * E18, 15 * E18)
+    assert cache.reads == 3
+    assert cache.syncs == 3
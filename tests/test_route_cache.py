@@ -0,0 +1,165 @@
+from eth_abi import decode_abi, encode_abi
+from scripts.utils.dex import (
+    AMOUNT_TYPE_EXACT_IN,
+    AMOUNT_TYPE_EXACT_OUT,
+    WETH_ADDRESS,
+    ZERO_ADDRESS,
+)
+from scripts.utils.liquid_path import get_amount_in, get_amount_out
+from scripts.utils.order_data import get_selector
+from scripts.utils.route_cache import (
+    CachedRouter,
+    ReserveQuoter,
+    RouteCache,
+    amount_bucket,
+)
+
+FACTORY = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+TOKEN = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+PAIR = "0x0eD7e52944161450477ee417DE9Cd3a859b14fD0"
+E18 = 10**18
+
+
+class StandInRouter:
+    """
+    Answers getLiquidPaths with the direct path, quoting one TOKEN per WETH.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def getLiquidPaths(self, swap_orders):
+        orders = swap_orders[0][0]
+        self.calls.append(orders)
+        return (
+            [FACTORY for order in orders],
+            [[order[0], order[1]] for order in orders],
+            [order[2] for order in orders],
+        )
+
+
+class StandInQuoter:
+    """
+    Quotes every path at a settable rate, at a settable block.
+    """
+
+    def __init__(self, block=100, rate=1.0):
+        self.block = block
+        self.rate = rate
+        self.quotes = []
+
+    def latest_block(self):
+        return self.block
+
+    def quote_paths(self, quotes, block):
+        self.quotes += quotes
+        return [int(token_amount * self.rate) for f, p, token_amount, t in quotes]
+
+
+class StandInPairCaller:
+    """
+    Answers getPair and getReserves eth_calls for one WETH/TOKEN pair.
+    """
+
+    def __init__(self, reserve_weth, reserve_token):
+        self.reserves = (
+            (reserve_weth, reserve_token)
+            if int(WETH_ADDRESS, 16) < int(TOKEN, 16)
+            else (reserve_token, reserve_weth)
+        )
+
+    def request(self, method, params):
+        return "0x10"
+
+    def call_many(self, calls, block="latest"):
+        results = []
+        for to, data in calls:
+            if data[:4] == get_selector("getPair(address,address)"):
+                tokens = {
+                    t.lower() for t in decode_abi(["address", "address"], data[4:])
+                }
+                found = tokens == {WETH_ADDRESS.lower(), TOKEN.lower()}
+                results.append(
+                    encode_abi(["address"], [PAIR if found else ZERO_ADDRESS])
+                )
+            else:
+                results.append(
+                    encode_abi(["uint112", "uint112", "uint32"], [*self.reserves, 0])
+                )
+        return results
+
+
+def order(amount, amount_type=AMOUNT_TYPE_EXACT_IN):
+    return [WETH_ADDRESS, TOKEN, amount, amount_type]
+
+
+"""
+Test a young route in the same amount bucket is re-quoted instead of routed,
+while other buckets, old routes and moved quotes are routed again
+"""
+
+
+def test_cached_router():
+    router = StandInRouter()
+    quoter = StandInQuoter()
+    cache = RouteCache(max_age_blocks=10, deviation_bps=50)
+    cached_router = CachedRouter(router, cache, quoter)
+
+    cached_router.getLiquidPaths([[[order(E18)]]])
+    factories, paths, amounts = cached_router.getLiquidPaths(
+        [[[order(E18 + E18 // 10), order(10 * E18)]]]
+    )
+    assert len(router.calls) == 2
+    assert router.calls[1] == [order(10 * E18)]
+    assert paths == [[WETH_ADDRESS, TOKEN], [WETH_ADDRESS, TOKEN]]
+    assert amounts[0] == E18 + E18 // 10
+    assert cache.hits == 1
+
+    quoter.rate = 1.004
+    cached_router.getLiquidPaths([[[order(E18)]]])
+    assert len(router.calls) == 2
+    quoter.rate = 1.006
+    cached_router.getLiquidPaths([[[order(E18)]]])
+    assert len(router.calls) == 3
+    assert cache.deviations == 1
+
+    quoter.block = 111
+    cached_router.getLiquidPaths([[[order(E18)]]])
+    assert len(router.calls) == 4
+    assert cache.stats()["fetches"] == 4
+
+
+"""
+Test amount buckets split each decade into quarters
+"""
+
+
+def test_amount_bucket():
+    assert amount_bucket(E18) == amount_bucket(17 * E18 // 10) == 72
+    assert amount_bucket(18 * E18 // 10) == 73
+    assert amount_bucket(0) == -1
+
+
+"""
+Test the reserve quoter matches the swap math for both amount types
+"""
+
+
+def test_reserve_quoter():
+    quoter = ReserveQuoter(StandInPairCaller(10 * E18, 1000 * E18))
+    path = [WETH_ADDRESS, TOKEN]
+
+    amounts = quoter.quote_paths(
+        [
+            (FACTORY, path, E18, AMOUNT_TYPE_EXACT_IN),
+            (FACTORY, path, E18, AMOUNT_TYPE_EXACT_OUT),
+            (FACTORY, path, 2000 * E18, AMOUNT_TYPE_EXACT_OUT),
+        ],
+        100,
+    )
+
+    assert amounts == [
+        get_amount_out(E18, 10 * E18, 1000 * E18),
+        get_amount_in(E18, 10 * E18, 1000 * E18),
+        None,
+    ]
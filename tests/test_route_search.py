@@ -0,0 +1,115 @@
+from eth_abi import decode_abi, encode_abi
+from scripts.utils.dex import (
+    AMOUNT_TYPE_EXACT_IN,
+    AMOUNT_TYPE_EXACT_OUT,
+    BUSD_ADDRESS,
+    USDT_ADDRESS,
+    WETH_ADDRESS,
+    ZERO_ADDRESS,
+)
+from scripts.utils.liquid_path import LiquidPathRouter
+from scripts.utils.order_data import get_selector
+from scripts.utils.route_search import RouteSearch
+
+FACTORY_A = "0xcA143Ce32Fe78f1f7019d7d551a6402fC5350c73"
+FACTORY_B = "0xc35DADB65012eC5796536bD9864eD8773aBc74C4"
+TOKEN = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+E18 = 10**18
+
+
+class StandInPairCaller:
+    """
+    Answers getPair and getReserves eth_calls from a dict of pools.
+    """
+
+    def __init__(self, pools):
+        self.pairs = {}
+        self.reserves = {}
+        for i, ((factory, token_a, token_b), reserves) in enumerate(pools.items()):
+            pair = "0x%040x" % (i + 1)
+            self.pairs[(factory.lower(), token_a.lower(), token_b.lower())] = pair
+            self.pairs[(factory.lower(), token_b.lower(), token_a.lower())] = pair
+            if int(token_a, 16) < int(token_b, 16):
+                self.reserves[pair] = reserves
+            else:
+                self.reserves[pair] = (reserves[1], reserves[0])
+
+    def request(self, method, params):
+        return "0x10"
+
+    def call_many(self, calls, block="latest"):
+        results = []
+        for to, data in calls:
+            if data[:4] == get_selector("getPair(address,address)"):
+                token_a, token_b = decode_abi(["address", "address"], data[4:])
+                pair = self.pairs.get(
+                    (to.lower(), token_a.lower(), token_b.lower()), ZERO_ADDRESS
+                )
+                results.append(encode_abi(["address"], [pair]))
+            else:
+                reserve0, reserve1 = self.reserves[to]
+                results.append(
+                    encode_abi(
+                        ["uint112", "uint112", "uint32"], [reserve0, reserve1, 0]
+                    )
+                )
+        return results
+
+
+def get_liquid_paths(pools, orders, route_search=None):
+    router = LiquidPathRouter(
+        batch_caller=StandInPairCaller(pools),
+        factories=[FACTORY_A, FACTORY_B],
+        route_search=route_search,
+    )
+    return router.getLiquidPaths([[orders]])
+
+
+"""
+Test the search routes through BUSD, which the contract never tries, and
+through two intermediates when max_hops allows
+"""
+
+
+def test_route_search__hops():
+    pools = {
+        (FACTORY_A, WETH_ADDRESS, BUSD_ADDRESS): (1000 * E18, 300000 * E18),
+        (FACTORY_A, BUSD_ADDRESS, TOKEN): (300000 * E18, 1000000 * E18),
+        (FACTORY_B, WETH_ADDRESS, USDT_ADDRESS): (1000 * E18, 300000 * E18),
+        (FACTORY_B, USDT_ADDRESS, BUSD_ADDRESS): (500000 * E18, 500000 * E18),
+        (FACTORY_B, BUSD_ADDRESS, TOKEN): (500000 * E18, 2000000 * E18),
+    }
+    orders = [[WETH_ADDRESS, TOKEN, E18, AMOUNT_TYPE_EXACT_IN]]
+
+    assert get_liquid_paths(pools, orders) == ([FACTORY_A], [[]], [0])
+
+    factories, paths, amounts = get_liquid_paths(pools, orders, RouteSearch(max_hops=2))
+    assert (factories, paths) == ([FACTORY_A], [[WETH_ADDRESS, BUSD_ADDRESS, TOKEN]])
+
+    factories, paths, amounts = get_liquid_paths(pools, orders, RouteSearch(max_hops=3))
+    assert factories == [FACTORY_B]
+    assert paths == [[WETH_ADDRESS, USDT_ADDRESS, BUSD_ADDRESS, TOKEN]]
+
+
+"""
+Test pairs below the minimum hop token reserve are pruned, leaving the direct
+pair, and exact out takes the least amount in
+"""
+
+
+def test_route_search__min_reserve():
+    pools = {
+        (FACTORY_A, WETH_ADDRESS, TOKEN): (10 * E18, 1000 * E18),
+        (FACTORY_A, WETH_ADDRESS, USDT_ADDRESS): (1000 * E18, 300000 * E18),
+        (FACTORY_A, USDT_ADDRESS, TOKEN): (2000 * E18, 100000 * E18),
+    }
+    for amount_type in [AMOUNT_TYPE_EXACT_IN, AMOUNT_TYPE_EXACT_OUT]:
+        orders = [[WETH_ADDRESS, TOKEN, E18, amount_type]]
+
+        factories, paths, amounts = get_liquid_paths(pools, orders, RouteSearch())
+        assert paths == [[WETH_ADDRESS, TOKEN]]
+
+        factories, paths, amounts = get_liquid_paths(
+            pools, orders, RouteSearch(min_hop_reserves={})
+        )
+        assert paths == [[WETH_ADDRESS, USDT_ADDRESS, TOKEN]]
@@ -0,0 +1,82 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from scripts.utils.rpc_batch import BatchCaller, decode_result, encode_call
+
+PAIR = "0x0eD7e52944161450477ee417DE9Cd3a859b14fD0"
+REVERTING = "0x000000000000000000000000000000000000dEaD"
+
+
+class StandInNode(BaseHTTPRequestHandler):
+    batch_sizes = []
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StandInNode.batch_sizes.append(len(payload))
+        responses = []
+        # Nodes may answer a batch in any order
+        for request in reversed(payload):
+            call = request["params"][0]
+            if call["to"] == REVERTING:
+                responses.append(
+                    {"jsonrpc": "2.0", "id": request["id"], "error": {"code": 3}}
+                )
+            else:
+                # Echo the calldata back as the return data
+                responses.append(
+                    {"jsonrpc": "2.0", "id": request["id"], "result": call["data"]}
+                )
+        body = json.dumps(responses).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def node_url():
+    server = HTTPServer(("127.0.0.1", 0), StandInNode)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+"""
+Test results are returned in call order, with None for reverted calls
+"""
+
+
+def test_call_many__ordering_and_reverts(node_url):
+    batch_caller = BatchCaller(node_url)
+    calls = [
+        (PAIR, encode_call("getReserves()")),
+        (REVERTING, encode_call("getReserves()")),
+        (PAIR, encode_call("balanceOf(address)", ["address"], [PAIR])),
+    ]
+    results = batch_caller.call_many(calls)
+
+    assert results[0] == bytes.fromhex("0902f1ac")
+    assert results[1] is None
+    assert results[2] == calls[2][1]
+    assert decode_result(["address"], results[2][4:])[0] == PAIR.lower()
+    assert batch_caller.round_trips == 1
+
+
+"""
+Test large batches are split to stay under node batch limits
+"""
+
+
+def test_call_many__chunked(node_url):
+    StandInNode.batch_sizes.clear()
+    batch_caller = BatchCaller(node_url, max_batch_size=2)
+    results = batch_caller.call_many([(PAIR, encode_call("token0()"))] * 5)
+
+    assert len(results) == 5
+    assert StandInNode.batch_sizes == [2, 2, 1]
+    assert batch_caller.round_trips == 3
@@ -0,0 +1,190 @@
+import pytest
+from eth_abi import encode_abi
+from scripts.utils.dex import WETH_ADDRESS
+from scripts.utils.order_data import EncodedCall, get_selector
+from scripts.utils.rebalance_planner import DETFBalances
+from scripts.utils.rpc_batch import RpcBatchError
+from scripts.utils.simulation import (
+    DEFAULT_FAILURE_PREDICATE,
+    METHOD_NOT_FOUND,
+    SimulationError,
+    check_simulation,
+    error_revert_reason,
+    event_topic,
+    gas_above,
+    simulate_call,
+)
+
+DETF = "0x949D48Eca67B17269629c7194F4B727D4eF9e5D7"
+SENDER = "0x0000000000000000000000000000000000000001"
+PAIR_A = "0x0eD7e52944161450477ee417DE9Cd3a859b14fD0"
+PAIR_C = "0x6C9f36A5a36f4f4d8f4Ba6ba7E7f0A6Ee8Ab5b2e"
+TOKEN_A = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+TOKEN_C = "0x8F0528cE5eF7B51152A59745bEfDD91D97091d2F"
+NO_PATH = "PolybitRouter: CANNOT_GET_PATH_FOR_TOKEN"
+
+
+def transfer_log(token, sender, recipient, amount, position="0x0"):
+    return {
+        "address": token.lower(),
+        "topics": [
+            event_topic("Transfer(address,address,uint256)"),
+            "0x" + sender[2:].lower().rjust(64, "0"),
+            "0x" + recipient[2:].lower().rjust(64, "0"),
+        ],
+        "data": "0x%064x" % amount,
+        "position": position,
+    }
+
+
+def liquidity_test_log(position):
+    return {
+        "address": DETF.lower(),
+        "topics": [event_topic("LiquidityTest(string)")],
+        "data": "0x" + encode_abi(["string"], [NO_PATH]).hex(),
+        "position": position,
+    }
+
+
+def swap_trace():
+    """
+    @return trace is a callTracer trace of a rebalance selling TOKEN_A for
+    WETH and buying TOKEN_C, with a reverted call whose logs were discarded.
+    """
+    return {
+        "type": "CALL",
+        "from": SENDER,
+        "to": DETF,
+        "gasUsed": "0x3d090",
+        "calls": [
+            {
+                "type": "CALL",
+                "to": PAIR_A,
+                "logs": [
+                    transfer_log(TOKEN_A, DETF, PAIR_A, 3 * 10**18),
+                    transfer_log(WETH_ADDRESS, PAIR_A, DETF, 6 * 10**17),
+                ],
+            },
+            {
+                "type": "CALL",
+                "to": PAIR_C,
+                "error": "execution reverted",
+                "logs": [transfer_log(WETH_ADDRESS, DETF, PAIR_C, 10**18)],
+            },
+            {
+                "type": "CALL",
+                "to": PAIR_C,
+                "logs": [
+                    transfer_log(WETH_ADDRESS, DETF, PAIR_C, 4 * 10**17),
+                    transfer_log(TOKEN_C, PAIR_C, DETF, 8 * 10**18),
+                ],
+            },
+        ],
+        "logs": [liquidity_test_log("0x1")],
+    }
+
+
+class StandInTracer:
+    """
+    Answers debug_traceCall with a fixed trace, or as a node without it.
+    """
+
+    def __init__(self, trace=None, gas=None):
+        self.trace = trace
+        self.gas = gas
+        self.methods = []
+
+    def request(self, method, params):
+        self.methods.append(method)
+        if method == "debug_traceCall":
+            if self.trace is None:
+                error = {"code": METHOD_NOT_FOUND, "message": "method not found"}
+                raise RpcBatchError("debug_traceCall failed", error)
+            return self.trace
+        if method == "eth_estimateGas":
+            if self.gas is None:
+                data = get_selector("Error(string)") + encode_abi(
+                    ["string"], ["PolybitDETF: SWAP_FAILED_MIN_OUT"]
+                )
+                error = {"code": 3, "message": "reverted", "data": "0x" + data.hex()}
+                raise RpcBatchError("eth_estimateGas failed", error)
+            return hex(self.gas)
+
+
+def balances():
+    return DETFBalances(
+        [TOKEN_A],
+        {TOKEN_A: 3 * 10**18, TOKEN_C: 0},
+        {TOKEN_A: 18, TOKEN_C: 18},
+        10**17,
+    )
+
+
+"""
+Test a traced dry run decodes the DETF events, sums the gas used and applies
+the Transfers to and from the DETF to its balances
+"""
+
+
+def test_simulate_call__traced():
+    call = EncodedCall(DETF, b"\x01\x02")
+    tracer = StandInTracer(swap_trace())
+
+    result = simulate_call(call, SENDER, balances(), tracer)
+
+    assert tracer.methods == ["debug_traceCall"]
+    assert not result.reverted
+    assert result.gas_used == 250000
+    assert result.events == [("LiquidityTest", (NO_PATH,))]
+    assert result.balances.owned_assets == [TOKEN_C]
+    assert result.balances.weth_balance == 10**17 + 6 * 10**17 - 4 * 10**17
+    assert result.balances.get_token_balance(TOKEN_C, 10**17) == (
+        8 * 10**18,
+        8 * 10**17,
+    )
+    with pytest.raises(SimulationError, match="1 swaps unrouted"):
+        check_simulation(result)
+    assert check_simulation(result, gas_above(300000)) is result
+    with pytest.raises(SimulationError, match="above 200000"):
+        check_simulation(result, gas_above(200000))
+
+
+"""
+Test a reverted trace blocks the call with its revert reason
+"""
+
+
+def test_simulate_call__reverted():
+    trace = {
+        "gasUsed": "0x100",
+        "error": "execution reverted",
+        "revertReason": "PolybitDETF: SWAP_FAILED_MIN_OUT",
+    }
+
+    result = simulate_call(
+        EncodedCall(DETF, b""), SENDER, balances(), StandInTracer(trace)
+    )
+
+    assert result.reverted
+    assert result.balances is None
+    with pytest.raises(SimulationError, match="SWAP_FAILED_MIN_OUT"):
+        check_simulation(result, DEFAULT_FAILURE_PREDICATE)
+
+
+"""
+Test nodes without debug_traceCall fall back to eth_estimateGas, decoding the
+revert reason from the error data
+"""
+
+
+def test_simulate_call__estimate_fallback():
+    call = EncodedCall(DETF, b"")
+
+    result = simulate_call(call, SENDER, balances(), StandInTracer(gas=21000))
+    assert not result.traced and not result.reverted
+    assert result.gas_used == 21000
+
+    result = simulate_call(call, SENDER, balances(), StandInTracer())
+    assert result.reverted
+    assert result.revert_reason == "PolybitDETF: SWAP_FAILED_MIN_OUT"
+    assert error_revert_reason({"message": "out of gas"}) == "out of gas"
@@ -0,0 +1,13 @@
+import pytest
+from scripts.bench_startup import MODULES, time_import
+
+"""
+Test the shared helpers import without brownie, web3 or the network
+"""
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_import__no_heavy_modules(module):
+    _, heavy = time_import(module)
+
+    assert heavy == []
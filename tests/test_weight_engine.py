@@ -0,0 +1,157 @@
+import random
+import numpy as np
+import pytest
+from scripts.utils import rebalance_planner, weight_engine
+from scripts.utils.rebalance_planner import (
+    DETFBalances,
+    DriftTolerance,
+    RebalancerError,
+)
+
+SEED = 8
+# As scripts/bsc_test_deploy.py, which weights its baskets with floats
+TEST_TWO_WEIGHTS = [10**8 * (1 / 3), 10**8 * (1 / 3), 10**8 * (1 / 3)]
+
+
+def random_basket(rng, size):
+    tokens = ["0x%040x" % rng.getrandbits(160) for i in range(0, size * 2)]
+    owned = tokens[0:size]
+    target = tokens[size // 2 : size // 2 + size]
+    weights = [rng.randint(1, 10**6) for i in range(0, size)]
+    scale = sum(weights)
+    target_weights = [10**8 * weight // scale for weight in weights]
+    decimals = {token: rng.choice([6, 8, 9, 18]) for token in tokens}
+    token_balances = {
+        token: rng.randint(1, 10**6) * 10 ** decimals[token] for token in tokens
+    }
+    owned_prices = [rng.randint(10**12, 10**18) for token in owned]
+    target_prices = [rng.randint(10**12, 10**18) for token in target]
+    balances = DETFBalances(
+        owned, token_balances, decimals, rng.randint(0, 10**20), rng.randint(0, 10)
+    )
+    return balances, owned, owned_prices, target, target_weights, target_prices
+
+
+"""
+Test the vectorised plan matches the scalar planner on large random baskets
+"""
+
+
+@pytest.mark.parametrize("size", [1, 5, 40, 150])
+def test_plan_rebalance__matches_planner(size):
+    rng = random.Random(SEED + size)
+    basket = random_basket(rng, size)
+
+    assert weight_engine.plan_rebalance(*basket) == rebalance_planner.plan_rebalance(
+        *basket
+    )
+
+
+"""
+Test incremental plans match the scalar planner
+"""
+
+
+@pytest.mark.parametrize("bps", [0, 10, 100, 1000])
+def test_plan_rebalance__drift_tolerance(bps):
+    rng = random.Random(SEED + bps)
+    basket = random_basket(rng, 60)
+    tolerance = DriftTolerance(bps, rng.randint(0, 10**18))
+
+    assert weight_engine.plan_rebalance(
+        *basket, tolerance
+    ) == rebalance_planner.plan_rebalance(*basket, tolerance)
+
+
+"""
+Test first deposits, with nothing owned, match the scalar planner
+"""
+
+
+def test_plan_rebalance__nothing_owned():
+    rng = random.Random(SEED)
+    balances, owned, owned_prices, target, target_weights, target_prices = (
+        random_basket(rng, 20)
+    )
+    balances.owned_assets = []
+
+    assert weight_engine.plan_rebalance(
+        balances, [], [], target, target_weights, target_prices
+    ) == rebalance_planner.plan_rebalance(
+        balances, [], [], target, target_weights, target_prices
+    )
+
+
+"""
+Test amounts beyond uint256 raise in both planners as the contract would
+revert
+"""
+
+
+@pytest.mark.parametrize("planner", [weight_engine, rebalance_planner])
+def test_plan_rebalance__uint256_overflow(planner):
+    token = "0x0E09FaBB73Bd3Ade0a17ECC321fD13a19e81cE82"
+    balances = DETFBalances([token], {token: 2**200}, {token: 18}, 0)
+
+    with pytest.raises(RebalancerError):
+        planner.plan_rebalance(balances, [token], [2**100], [], [], [])
+
+
+"""
+Test a drift notional beyond uint256 raises in both tolerance checks, and is
+not reached for legs within the bps
+"""
+
+
+def test_is_within__notional_overflow():
+    tolerance = DriftTolerance(10, 1)
+    total_balance = 2**250
+    percentages = np.array([0, 10**7], dtype=object)
+    weights = np.array([10**3, 0], dtype=object)
+
+    assert tolerance.is_within(total_balance, 0, 10**3)
+    assert list(
+        weight_engine.is_within_tolerance(
+            tolerance, total_balance, percentages[0:1], weights[0:1]
+        )
+    ) == [True]
+    with pytest.raises(RebalancerError):
+        tolerance.is_within(total_balance, 10**7, 0)
+    with pytest.raises(RebalancerError):
+        weight_engine.is_within_tolerance(
+            tolerance, total_balance, percentages, weights
+        )
+
+
+"""
+Test float weights and prices are truncated to int as the contract sees them,
+so both planners agree and plan int amounts
+"""
+
+
+def test_plan_rebalance__float_weights():
+    tokens = ["0x%040x" % (0x1000 + i) for i in range(0, 4)]
+    balances = DETFBalances(
+        tokens[0:3],
+        {token: (i + 1) * 10**18 for i, token in enumerate(tokens)},
+        {token: 18 for token in tokens},
+        10**17,
+    )
+    owned_prices = [1.3e16, 1.87e16, 6.82e14 + 0.5]
+    target_prices = [1.3e16, 1.87e16, 9.1e15]
+    basket = (
+        balances,
+        tokens[0:3],
+        owned_prices,
+        tokens[0:2] + tokens[3:4],
+        TEST_TWO_WEIGHTS,
+        target_prices,
+    )
+
+    plan = rebalance_planner.plan_rebalance(*basket)
+
+    assert plan == weight_engine.plan_rebalance(*basket)
+    assert plan["adjustListWeights"] == [33333333, 33333333]
+    for key in ["adjustToBuyListAmountsIn", "buyListAmountsIn", "buyListAmountsOut"]:
+        assert all(type(amount) is int for amount in plan[key])
+    assert len(plan["buyListAmountsIn"]) == 1